@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+# the following are .py files
+import fileRelated as flr
+import model_framework
+import modifyDf as mod_df
+
+def agentDfOfSize(agent_df, agentCount):
+    """return a dataframe with agentCount rows made by repeating the rows of agent_df, with the index 0, 1, ..., agentCount-1"""
+    rows = np.resize(np.arange(len(agent_df)), agentCount)
+    return agent_df.iloc[rows].reset_index(drop=True)
+
+def iterrowsFactory(df, objectClass):
+    """the way the factories made the objects before objectsFromDf, kept as the baseline of factoryBenchmark"""
+    tempDict = dict()
+    for index, row in df.iterrows():
+        tempDict[index] = objectClass(row.values.tolist())
+    return tempDict
+
+def bestTime(func, repeat=3):
+    """return the shortest wall time of repeat calls of func, in seconds"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def factoryBenchmark(agentCounts=(2000, 50000, 500000), baselineLimit=500000, repeat=3):
+    """
+        time the creation of the agents from the agent dataframe with agentFactory (slotted objects), agentStoreFactory (columnar)
+        and the old iterrows construction, print a table and return a list of dictionaries (one per agent count)
+
+        Parameters:
+        - agentCounts: the numbers of agents, the agents of newAgent.csv are repeated to get there
+        - baselineLimit: the iterrows baseline is only timed up to this number of agents (about 20 seconds for 500k agents)
+        - repeat: the number of runs per measure, the shortest is kept
+    """
+    model = model_framework.AgentBasedModel()
+    model.loadAgent("newAgent.csv")
+    model.generateAgentDfFromDf()
+    stateNames = ["susceptible", "exposed", "infected Asymptomatic", "infected Asymptomatic Fixed", "infected Symptomatic Mild",
+        "infected Symptomatic Severe", "recovered", "quarantined"]
+    results = []
+    print(f"{'agents':>8} {'iterrows (s)':>13} {'agentFactory (s)':>17} {'agentStoreFactory (s)':>22} {'speedup':>8}")
+    for agentCount in agentCounts:
+        agent_df = agentDfOfSize(model.agent_df, agentCount)
+        slotVal = agent_df.columns.values.tolist()
+        # the class made by agentFactory, taken from the one agent dataframe so the baseline builds the same objects
+        agentClass = type(next(iter(model_framework.agentFactory(agent_df.iloc[:1], slotVal).values())))
+        result = {"agents": agentCount}
+        result["agentFactory"] = bestTime(lambda: model_framework.agentFactory(agent_df, slotVal), repeat)
+        result["agentStoreFactory"] = bestTime(lambda: model_framework.agentStoreFactory(agent_df, slotVal, stateNames), repeat)
+        result["iterrows"] = bestTime(lambda: iterrowsFactory(agent_df, agentClass), 1) if agentCount <= baselineLimit else None
+        speedup = f"{result['iterrows']/result['agentFactory']:.1f}x" if result["iterrows"] else "-"
+        iterrowsTime = f"{result['iterrows']:.3f}" if result["iterrows"] else "skipped"
+        print(f"{agentCount:>8} {iterrowsTime:>13} {result['agentFactory']:>17.3f} {result['agentStoreFactory']:>22.3f} {speedup:>8}")
+        results.append(result)
+    return results
+
+def expansionBenchmark(scales=(1, 10, 50), repeat=3):
+    """
+        time the expansion of newBuilding.csv into the building and room dataframes (the steps of mod_df.mod_building after reading the csv),
+        with the rows of the csv repeated scale times, print a table and return a list of dictionaries (one per scale)
+
+        Parameters:
+        - scales: the number of copies of the rows of newBuilding.csv
+        - repeat: the number of runs per measure, the shortest is kept
+    """
+    original_df = flr.make_df("configuration", "newBuilding.csv", debug=False)
+    def expand(df):
+        building_df = mod_df.assignUniqueName(mod_df.createSuperStruc(df), "building_name")
+        building_df.index += 1
+        room_df = mod_df.assignUniqueName(mod_df.createPartitions(building_df), "room_name")
+        return building_df, room_df
+    results = []
+    print(f"{'scale':>6} {'buildings':>10} {'rooms':>8} {'expansion (s)':>14}")
+    for scale in scales:
+        df = pd.concat([original_df]*scale, ignore_index=True)
+        building_df, room_df = expand(df.copy())
+        result = {"scale": scale, "buildings": len(building_df), "rooms": len(room_df)}
+        result["expansion"] = bestTime(lambda: expand(df.copy()), repeat)
+        print(f"{scale:>6} {result['buildings']:>10} {result['rooms']:>8} {result['expansion']:>14.3f}")
+        results.append(result)
+    return results
+
+# the modules that importing model_framework must not load, they are only used to plot and to profile
+PLOTTING_MODULES = ("matplotlib", "networkx", "cProfile")
+
+def importBenchmark(moduleName="model_framework", repeat=5, limit=None):
+    """
+        time the import of the module in new python processes (the cost every worker of a process pool pays before it starts simulating)
+        and check that it doesn't load PLOTTING_MODULES, print the shortest time and return it in seconds.
+        raises a RuntimeError if a plotting module was loaded or, with limit, if the shortest import took longer than limit seconds
+
+        Parameters:
+        - moduleName: the module to import
+        - repeat: the number of processes, the shortest import is kept
+        - limit: the longest accepted import time in seconds, None doesn't check the time
+    """
+    code = (f"import sys, time, json; startTime = time.perf_counter(); import {moduleName}; importTime = time.perf_counter() - startTime; "
+        f"print(json.dumps([importTime, [name for name in {PLOTTING_MODULES!r} if name in sys.modules]]))")
+    times, loaded = [], set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        importTime, loadedModules = json.loads(output.strip().split("\n")[-1])
+        times.append(importTime)
+        loaded.update(loadedModules)
+    print(f"import {moduleName}: {min(times):.3f}s (shortest of {repeat} processes)")
+    if loaded:
+        raise RuntimeError(f"importing {moduleName} loads {sorted(loaded)}, import them inside the functions that use them")
+    if limit is not None and min(times) > limit:
+        raise RuntimeError(f"importing {moduleName} took {min(times):.3f}s, more than the limit of {limit}s")
+    return min(times)
+
+def main():
+    importBenchmark()
+    factoryBenchmark()
+    expansionBenchmark()
+
+if __name__ == "__main__":
+    main()
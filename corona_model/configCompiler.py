@@ -0,0 +1,247 @@
+import dataclasses
+import difflib
+import hashlib
+import json
+import warnings
+import numpy as np
+# this file checks the config dictionary used by model_framework and compiles it into a frozen object with lookup tables
+
+# every key that the model reads, per section
+# the value tells when the key is required:
+# - "required": always
+# - "optional": never, the model has a default or doesn't need it
+# - "unused": the model never reads it, reported as unused
+# - any other string: the key is required when that intervention or permitted action is turned on
+CONFIG_SCHEMA = {
+    "Agents": {
+        "PossibleStates": "required",
+        "ExtraParameters": "optional",
+        "ExtraZipParameters": "optional",
+        "booleanAssignment": "required",
+    },
+    "Rooms": {
+        "ExtraParameters": "optional",
+        "ExtraZipParameters": "optional",
+    },
+    "Buildings": {
+        "ExtraParameters": "optional",
+        "ExtraZipParameters": "optional",
+    },
+    "Infection": {
+        "baseP": "required",
+        "SeedNumber": "required",
+        "SeedState": "required",
+        "Contribution": "required",
+        "TransitionTime": "required",
+        "TransitionProbability": "required",
+    },
+    "World": {
+        "UnitTime": "unused",
+        "InferedSimulatedDays": "required",
+        "TurnedOnInterventions": "required",
+        "permittedAction": "required",
+        "transitName": "required",
+        "offCampusInfectionProbability": "required",
+        "massInfectionRatio": "optional",
+        "complianceRatio": "required",
+        "stateCounterInterval": "required",
+        "socialInteraction": "required",
+        "LazySunday": "required",
+        "LargeGathering": "required",
+    },
+    "FaceMasks": {
+        "MaskInfectivity": "required",
+        "MaskBlock": "required",
+        "NonCompliantLeaf": "required",
+        "CompliantHub": "required",
+        "NonCompliantBuilding": "required",
+    },
+    "Quarantine": {
+        "RandomSampling": "required",
+        "RandomSampleSize": "quarantine",
+        "SamplingProbability": "unused",
+        "ResultLatency": "quarantine",
+        "walkinProbability": "walkin",
+        "BatchSize": "required",
+        "ShowingUpForScreening": "quarantine",
+        "offset": "required",
+        "checkupFrequency": "required",
+        "falsePositive": "quarantine",
+        "falseNegative": "quarantine",
+    },
+    "ClosingBuildings": {
+        "ClosedBuildingOpenHub": "closingbuildings",
+        "ClosedBuilding_ByType": "closingbuildings",
+        "GoingHomeP": "closingbuildings",
+        "Exception_SemiClosedBuilding": "closingbuildings",
+        "Exception_GoingHomeP": "closingbuildings",
+    },
+    "HybridClass": {
+        "RemoteStudentCount": "hybridclasses",
+        "RemoteFacultyCount": "hybridclasses",
+        "RemovedDoubleCount": "hybridclasses",
+        "OffCampusCount": "hybridclasses",
+        "TurnOffLargeGathering": "hybridclasses",
+        "ChangedSeedNumber": "hybridclasses",
+    },
+    "LessSocializing": {
+        "SocializingProbability": "lesssocial",
+    },
+    "Engine": {
+        "ColumnarAgents": "optional",
+        "InfectionKernel": "optional",
+        "TransitionScheduler": "optional",
+        "BitGenerator": "optional",
+        "CommonRandomNumbers": "optional",
+        "WorldCache": "optional",
+    },
+}
+
+def validateConfig(config):
+    """
+        check the config against CONFIG_SCHEMA and the values that have to agree with each other (Ex: state names),
+        misspelled and unused keys are reported with a warning (only once per message), missing keys and invalid values raise a ValueError listing every problem
+
+        Parameters:
+        - config: the config dictionary passed to createModel
+    """
+    errors, notes = [], []
+    world = config.get("World", dict())
+    switchedOn = set(name.lower() for name in world.get("TurnedOnInterventions", []) + world.get("permittedAction", []))
+    for sectionName in config.keys():
+        if sectionName not in CONFIG_SCHEMA:
+            notes.append(f"unknown section {sectionName!r}{suggestion(sectionName, CONFIG_SCHEMA.keys())}")
+    for sectionName, schema in CONFIG_SCHEMA.items():
+        section = config.get(sectionName)
+        needed = [key for key, requirement in schema.items() if requirement == "required" or requirement in switchedOn]
+        if section is None:
+            if needed:
+                errors.append(f"missing section {sectionName!r}")
+            continue
+        for key in section.keys():
+            if key not in schema:
+                notes.append(f"unknown key {sectionName}.{key} is ignored{suggestion(key, schema.keys())}")
+            elif schema[key] == "unused":
+                notes.append(f"{sectionName}.{key} is not used by the model")
+        for key in needed:
+            if key not in section:
+                errors.append(f"missing key {sectionName}.{key}")
+    # the state names can only be checked when the keys they are in are there
+    if all(key in config.get(sectionName, dict()) for sectionName in ["Agents", "Infection"] for key in CONFIG_SCHEMA[sectionName] if CONFIG_SCHEMA[sectionName][key] == "required"):
+        errors += infectionErrors(config)
+    for note in notes:
+        warnings.warn("config: " + note, stacklevel=3)
+    if errors:
+        raise ValueError("invalid config:\n - " + "\n - ".join(errors))
+
+def configHash(config):
+    """return the sha256 hex digest of the config, two configs with the same keys and values have the same hash"""
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def suggestion(name, knownNames):
+    """return ', did you mean ...?' with the closest known name, or an empty string if nothing is close"""
+    knownNames = list(knownNames)
+    sameCase = [knownName for knownName in knownNames if knownName.lower() == name.lower()]
+    matches = sameCase or difflib.get_close_matches(name, knownNames, n=1, cutoff=0.6)
+    return f", did you mean {matches[0]!r}?" if matches else ""
+
+def infectionErrors(config):
+    """return a list of problems with the state names and the transition tables of the "Infection" section"""
+    errors = []
+    infection = config["Infection"]
+    stateNames = set(stateName for stateList in config["Agents"]["PossibleStates"].values() for stateName in stateList)
+    if infection["SeedState"] not in stateNames:
+        errors.append(f"Infection.SeedState {infection['SeedState']!r} is not in Agents.PossibleStates")
+    for tableName in ["Contribution", "TransitionTime", "TransitionProbability"]:
+        for stateName in infection[tableName].keys():
+            if stateName not in stateNames:
+                errors.append(f"Infection.{tableName} has the state {stateName!r} which is not in Agents.PossibleStates{suggestion(stateName, stateNames)}")
+    for stateName, table in infection["TransitionProbability"].items():
+        cdf = [probability for _, probability in table]
+        if not cdf or any(nextCdf < previousCdf for previousCdf, nextCdf in zip(cdf, cdf[1:])) or cdf[-1] != 1:
+            errors.append(f"Infection.TransitionProbability[{stateName!r}] must be cumulative (non decreasing and ending with 1), got {cdf}")
+        for nextState, _ in table:
+            if nextState not in stateNames:
+                errors.append(f"Infection.TransitionProbability[{stateName!r}] goes to {nextState!r} which is not in Agents.PossibleStates")
+    for stateName, duration in infection["TransitionTime"].items():
+        if duration > 0 and stateName != "quarantined" and stateName not in infection["TransitionProbability"]:
+            errors.append(f"Infection.TransitionTime[{stateName!r}] is positive but the state has no Infection.TransitionProbability")
+    return errors
+
+@dataclasses.dataclass(frozen=True)
+class CompiledConfig:
+    """
+        the values of the config that are used in the hot loops, resolved once when the world is created.
+        the arrays are read only, the arrays "by state code" follow the state codes of CompiledWorld and the arrays "by room id" are indexed like CompiledWorld's arrays
+    """
+    stateNames: tuple
+    # contribution to the infectiousness of a room, by state code and by state name
+    contribution: np.ndarray
+    contributionByState: dict
+    # time spent in a state before changing state, negative means the state doesn't change by itself, by state code
+    transitionTime: np.ndarray
+    # key: state name, value: (tuple of next state names, tuple of cumulative probabilities)
+    transitionTables: dict
+    # the same tables by state code, the next states are state codes
+    transitionCdf: tuple
+    transitionNextCode: tuple
+    baseP: float
+    transitId: int
+    offCampusHubId: int
+    offCampusInfectionProbability: float
+    maskInfectivity: float
+    maskBlock: float
+    # the factor applied to the contribution of compliant and non compliant agents, by room id
+    maskFactorCompliant: np.ndarray
+    maskFactorOther: np.ndarray
+    quarantineOffset: int
+    checkupFrequency: int
+
+def readOnly(array):
+    array.setflags(write=False)
+    return array
+
+def compileConfig(config, roomNameId, world):
+    """
+        return the CompiledConfig of a validated config
+
+        Parameters:
+        - config: the config dictionary, checked by validateConfig
+        - roomNameId: dictionary, key: room name --> value: room Id
+        - world: the CompiledWorld of the model
+    """
+    infection = config["Infection"]
+    stateNames = tuple(world.stateNames)
+    contribution = readOnly(np.array([infection["Contribution"].get(stateName, 0) for stateName in stateNames], dtype=float))
+    transitionTime = readOnly(np.array([infection["TransitionTime"].get(stateName, -1) for stateName in stateNames], dtype=np.int64))
+    transitionTables = dict((stateName, (tuple(nextState for nextState, _ in table), tuple(float(p) for _, p in table)))
+                            for stateName, table in infection["TransitionProbability"].items())
+    emptyTable = ((), ())
+    transitionCdf = tuple(readOnly(np.array(transitionTables.get(stateName, emptyTable)[1])) for stateName in stateNames)
+    transitionNextCode = tuple(readOnly(np.array([world.stateCode[nextState] for nextState in transitionTables.get(stateName, emptyTable)[0]], dtype=np.int64))
+                            for stateName in stateNames)
+    transitName = config["World"]["transitName"]
+    missingRooms = [roomName for roomName in [transitName, "offCampus_hub"] if roomName not in roomNameId]
+    if missingRooms:
+        raise ValueError(f"the rooms {missingRooms} are not in the world")
+    maskP = config["FaceMasks"]["MaskInfectivity"]
+    return CompiledConfig(
+        stateNames=stateNames,
+        contribution=contribution,
+        contributionByState=dict(infection["Contribution"]),
+        transitionTime=transitionTime,
+        transitionTables=transitionTables,
+        transitionCdf=transitionCdf,
+        transitionNextCode=transitionNextCode,
+        baseP=infection["baseP"],
+        transitId=roomNameId[transitName],
+        offCampusHubId=roomNameId["offCampus_hub"],
+        offCampusInfectionProbability=config["World"]["offCampusInfectionProbability"],
+        maskInfectivity=maskP,
+        maskBlock=config["FaceMasks"]["MaskBlock"],
+        maskFactorCompliant=readOnly(np.where(world.mask_always | world.mask_required_for_compliant, maskP, 1.0)),
+        maskFactorOther=readOnly(np.where(world.mask_always, maskP, 1.0)),
+        quarantineOffset=config["Quarantine"]["offset"],
+        checkupFrequency=config["Quarantine"]["checkupFrequency"],
+    )
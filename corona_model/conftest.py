@@ -0,0 +1,38 @@
+import contextlib
+import copy
+import io
+
+import pytest
+
+import model_framework
+import start_here
+
+
+class _ConfigCaptured(Exception):
+    pass
+
+
+@pytest.fixture(scope="session")
+def defaultConfig():
+    """the config of start_here.main, taken from its call to R0_simulation instead of running the simulations"""
+    captured = dict()
+    def capture(modelConfig, *args, **kwargs):
+        captured.update(copy.deepcopy(modelConfig))
+        raise _ConfigCaptured
+    R0_simulation = model_framework.R0_simulation
+    model_framework.R0_simulation = capture
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_here.main()
+    except _ConfigCaptured:
+        pass
+    finally:
+        model_framework.R0_simulation = R0_simulation
+    return captured
+
+
+@pytest.fixture
+def modelConfig(defaultConfig):
+    """a copy of the default config that the test can change"""
+    return copy.deepcopy(defaultConfig)
+
@@ -0,0 +1,473 @@
+import time
+import numpy as np
+import model_framework
+import statfile
+# this file runs many replicates of one model at the same time, each agent attribute that changes during a simulation
+# is an array of shape (replicates, agents) and every step is done for all the replicates with numpy operations
+
+class EnsembleModel:
+    """
+        R replicates of an AgentBasedModel simulated together, the world, the schedules, the routes and the config are shared,
+        the agents' states, timers, locations and paths have one row per replicate.
+        it follows updateSteps of the model (movement, hub and room infection, state transitions, walk ins, testing and quarantine, large gatherings),
+        but only keeps the number of agents in each state, the room logs and per room counters are not kept.
+        the random values come from one np.random.Generator, so a replicate doesn't give the same result as the scalar engine with the same seed,
+        only the distribution of the results is the same (see compareWithScalar).
+        the rooms have the capacity of the model's rooms in every replicate, an agent that walks into a full room isn't in any room 
+        until it moves again, like in the scalar engine (see moveBetweenRooms)
+    """
+    def __init__(self, model, replicates, rng=None):
+        """
+            Parameters:
+            - model: an AgentBasedModel made by createModel (with R0=True for R0 simulations) that hasn't been run yet
+            - replicates: the number of replicates, R
+            - rng: np.random.Generator used for every random value, None makes one from a stream spawned from the model's seedSequence
+        """
+        self.model = model
+        self.replicates = replicates
+        self.rng = model_framework.makeGenerator(model.seedSequence.spawn(1)[0], model.bitGenerator) if rng is None else rng
+        world, compiled = model.world, model.compiledConfig
+        self.world, self.compiledConfig = world, compiled
+        self.stateNames = world.stateNames
+        self.stateCode = world.stateCode
+        self.agentCount = len(model.agents)
+        self.roomCount = len(model.roomKv)
+
+        # starting point of every replicate, taken from the model
+        snapshot = model.snapshot()
+        arrays, values = snapshot["arrays"], snapshot["values"]
+        shape = (replicates, self.agentCount)
+        self.state = np.tile(arrays["agentState"], (replicates, 1))
+        self.lastUpdate = np.tile(arrays["agent_lastUpdate"], (replicates, 1))
+        self.infected = np.tile(arrays["agent_infected"], (replicates, 1))
+        self.falsePositive = np.zeros(shape, dtype=bool)
+        self.falsePositive[:, list(model.state2IdDict["falsePositive"])] = True
+        self.location = np.tile(arrays["agent_currLocation"].astype(np.int32), (replicates, 1))
+        self.destination = np.tile(arrays["agentDestination"].astype(np.int32), (replicates, 1))
+        self.moving = np.tile(arrays["agentMoving"], (replicates, 1))
+        # the rooms left on the path, the next room is path[pathLength-1] like the list popped by AgentBehavior.move
+        path = np.zeros((self.agentCount, 3), dtype=np.int32)
+        pathLength = np.diff(arrays["agentPathOffsets"]).astype(np.int8)
+        for agentId in np.flatnonzero(pathLength).tolist():
+            start, end = arrays["agentPathOffsets"][agentId], arrays["agentPathOffsets"][agentId+1]
+            path[agentId, :end-start] = arrays["agentPath"][start:end]
+        self.path = np.tile(path, (replicates, 1))
+        self.pathLength = np.tile(pathLength, (replicates, 1))
+        # False for the agents that aren't in a room because the room was full (agentRoom is -1 in the model), 
+        # occupancy and capacity are by room of each replicate, room roomId of replicate r is at r*roomCount + roomId
+        self.inRoom = np.tile(arrays["agentRoom"] >= 0, (replicates, 1))
+        capacity = np.zeros(self.roomCount, dtype=np.int64)
+        capacity[list(model.rooms.keys())] = [int(room.capacity) for room in model.rooms.values()]
+        self.capacity = np.tile(capacity, replicates)
+        self.occupancy = np.tile(np.bincount(arrays["agentRoom"][arrays["agentRoom"] >= 0], minlength=self.roomCount), replicates)
+
+        # shared agent attributes
+        self.home = np.asarray(model.homeLocations, dtype=np.int32)
+        agents = [model.agents[agentId] for agentId in range(self.agentCount)]
+        self.compliance = arrays["agent_compliance"]
+        self.gatheringIds = np.array([agentId for agentId, agent in enumerate(agents) if agent.gathering], dtype=np.int64)
+        self.contributes = np.ones(self.agentCount, dtype=bool)
+        if model.R0Calculation:
+            self.contributes = np.isin(np.arange(self.agentCount), model.R0_agentIds)
+
+        # shared world and config arrays
+        self.scheduleTensor = model.scheduleTensor
+        self.hubOf, self.transit = model.routes.hubOf, model.routes.transit
+        self.routes = model.routes
+        self.contribution = np.concatenate((compiled.contribution, np.zeros(len(self.stateNames) - len(compiled.contribution))))
+        self.infectedCodes = np.isin(np.arange(len(self.stateNames)), [self.stateCode[stateName] for stateName in model_framework.AgentBehavior.infectedStates if stateName in self.stateCode])
+        self.infectiousCodes = np.isin(np.arange(len(self.stateNames)), [self.stateCode[stateName] for stateName in model.config["Agents"]["PossibleStates"]["infected"]])
+        self.roomKv, self.roomLimit = model.roomKv, model.roomLimit
+        self.baseP = model.baseP
+        if model.faceMask_intervention:
+            self.maskFactorCompliant, self.maskFactorOther = compiled.maskFactorCompliant, compiled.maskFactorOther
+
+        # clock and quarantine queue, shared by every replicate
+        self.time, self.date, self.dateDescriptor = values["time"], values["date"], values["dateDescriptor"]
+        self.quarantineGroupIndex = values["quarantineGroupIndex"]
+        # list of (screening time, (R, n) boolean array of the agents to quarantine, (R, n) boolean array of the false positives)
+        self.screeningQueue = []
+        self.timeIncrement = model.config["World"]["stateCounterInterval"]
+        # key: time//timeIncrement --> value: (R, number of states) array of the number of agents in each state, same index as model.parameters
+        self.stateCounts = dict()
+
+    def updateSteps(self, step=1):
+        """same as AgentBasedModel.updateSteps for every replicate"""
+        model = self.model
+        if self.time == 0:
+            self.storeInformation()
+        for _ in range(step):
+            self.time+=1
+            modTime = self.time%24
+            # the model stops moving agents once every agent recovered, that doesn't change the state counts so the ensemble keeps going
+            if 23 > modTime > 6:
+                if not (model.lazySunday and self.dateDescriptor == "LS"):
+                    for _ in range(4):
+                        self.updateAgent()
+                        self.infection(hubs=True)
+                self.infection()
+                self.transitionAgents()
+            if self.dateDescriptor != "W" and self.dateDescriptor != "LS":
+                if modTime == 8:
+                    self.checkForWalkIn()
+                if model.quarantine_intervention and self.time%model.quarantineInterval == self.compiledConfig.quarantineOffset:
+                    self.testForDisease()
+                self.delayedQuarantine()
+            if (self.dateDescriptor == "LS" or self.dateDescriptor == "W") and self.time%(24*7) == 0:
+                self.bigGathering()
+            if self.time%self.timeIncrement == 0:
+                self.storeInformation()
+            if modTime == 0:
+                self.date+=1
+                if model.lazySunday and self.date%7 == 6:
+                    self.dateDescriptor = "LS"
+                elif self.date%7 > 3:
+                    self.dateDescriptor = "W"
+                elif self.date&1:
+                    self.dateDescriptor = "E"
+                else:
+                    self.dateDescriptor = "O"
+
+    def changeState(self, changed, stateName):
+        """
+            change the state of the agents where changed is True, like AgentBasedModel.changeStateDict
+
+            Parameters:
+            - changed: (R, n) boolean array
+            - stateName: the new state
+        """
+        code = self.stateCode[stateName]
+        leavingQuarantine = changed & (self.state == self.stateCode["quarantined"]) & ~self.infected
+        self.falsePositive &= ~leavingQuarantine
+        self.state[changed] = code
+        self.lastUpdate[changed] = self.time
+        if self.infectedCodes[code]:
+            self.infected |= changed
+
+    def updateAgent(self):
+        """move every agent one room, same rules as AgentBehavior.updateLoc"""
+        currTime = self.time
+        scheduled = self.scheduleTensor[:, self.model.scheduleColumn(currTime), currTime%24]
+        # quarantined and severely sick agents stay in their initial location, see checkschedule
+        atHome = (self.state == self.stateCode["quarantined"]) | ((self.state == self.stateCode["infected Symptomatic Severe"]) & (currTime > self.lastUpdate+120))
+        wanted = np.where(atHome, self.home, scheduled)
+        # the stationary agents that are already where they want to be don't move
+        starting = ~self.moving & (wanted != self.location)
+        location, destination, moving = self.location.reshape(-1), self.destination.reshape(-1), self.moving.reshape(-1)
+        path, pathLength = self.path.reshape(-1, 3), self.pathLength.reshape(-1)
+
+        index = np.flatnonzero(starting)
+        source, target = location[index], wanted.reshape(-1)[index]
+        destination[index] = target
+        nextNode, lastNode = self.hubOf[source], self.hubOf[target]
+        sameHub = nextNode == lastNode
+        pathLength[index] = np.where(sameHub, 1, 3)
+        path[index, 0] = np.where(sameHub, nextNode, lastNode)
+        path[index, 1] = self.transit
+        path[index, 2] = nextNode
+
+        index = np.flatnonzero(self.moving | starting)
+        current, target, length = location[index], destination[index], pathLength[index]
+        arrived = self.routes.areAdjacent(current, target)
+        stepping = ~arrived & (length > 0)
+        arrivedIndex, steppingIndex = index[arrived], index[stepping]
+        location[arrivedIndex] = target[arrived]
+        destination[arrivedIndex] = -1
+        pathLength[arrivedIndex] = 0
+        moving[arrivedIndex] = False
+        location[steppingIndex] = path[steppingIndex, length[stepping]-1]
+        pathLength[steppingIndex] -= 1
+        moving[steppingIndex] = True
+        changed = location[index] != current
+        self.moveBetweenRooms(index[changed], current[changed], location[index[changed]])
+
+    def moveBetweenRooms(self, agentIndex, previousRooms, rooms):
+        """
+            update inRoom and occupancy for the agents that changed room, same as AgentBasedModel.updateAgent calling Partitions.leave 
+            and Partitions.enter for each agent in agentId order: an agent only gets in if the room has space left when its turn comes.
+            the agents of the rooms that can't be full (space for every agent coming in) get in at once, 
+            the others are taken one by one in order with the agents leaving these rooms
+
+            Parameters:
+            - agentIndex: increasing array of flat indices of the (R, n) arrays, replicate*n + agentId
+            - previousRooms, rooms: the rooms the agents were in and are in now
+        """
+        inRoom, occupancy = self.inRoom.reshape(-1), self.occupancy
+        size = self.replicates*self.roomCount
+        offsets = agentIndex//self.agentCount*self.roomCount
+        leaving, entering = previousRooms + offsets, rooms + offsets
+        wasIn = inRoom[agentIndex]
+        comingIn = np.bincount(entering, minlength=size)
+        crowded = occupancy + comingIn > self.capacity
+        if not crowded.any():
+            occupancy += comingIn - np.bincount(leaving[wasIn], minlength=size)
+            inRoom[agentIndex] = True
+            return
+        leavingCrowded, enteringCrowded = crowded[leaving], crowded[entering]
+        occupancy -= np.bincount(leaving[wasIn & ~leavingCrowded], minlength=size)
+        occupancy += np.bincount(entering[~enteringCrowded], minlength=size)
+        inRoom[agentIndex[~enteringCrowded]] = True
+        for position in np.flatnonzero((wasIn & leavingCrowded) | enteringCrowded).tolist():
+            if wasIn[position] and leavingCrowded[position]:
+                occupancy[leaving[position]] -= 1
+            if enteringCrowded[position]:
+                room = entering[position]
+                hasSpace = occupancy[room] < self.capacity[room]
+                occupancy[room] += hasSpace
+                inRoom[agentIndex[position]] = hasSpace
+
+    def infection(self, hubs=False):
+        """
+            infect the susceptible agents of every room of every replicate, same as vectorizedInfection,
+            the rooms of replicate r are counted at r*roomCount + roomId so one bincount covers every replicate
+
+            Parameters:
+            - hubs: boolean, only infect in the hubs like hub_infection
+        """
+        world = self.world
+        offsets = (np.arange(self.replicates, dtype=np.int64)*self.roomCount)[:, None]
+        weights = self.contribution[self.state] * self.contributes * self.inRoom
+        infectious = np.flatnonzero(weights)
+        if len(infectious) == 0:
+            return
+        flatRooms = (self.location + offsets).reshape(-1)
+        weights = weights.reshape(-1)[infectious]
+        if self.model.faceMask_intervention:
+            rooms = self.location.reshape(-1)[infectious]
+            compliance = self.compliance[infectious%self.agentCount]
+            weights = weights * np.where(compliance, self.maskFactorCompliant[rooms], self.maskFactorOther[rooms])
+        total = np.bincount(flatRooms[infectious], weights=weights, minlength=self.replicates*self.roomCount).reshape(self.replicates, self.roomCount)
+        occupancy = self.occupancy.reshape(self.replicates, self.roomCount)
+        roomInfection = np.where(world.is_social & ~world.is_hub, (self.baseP*2*total)/(5*(occupancy//5+1)), (self.baseP*self.roomKv*total)/self.roomLimit)
+        roomInfection[:, world.is_offcampus | (~world.is_hub if hubs else False)] = 0
+
+        threshold = np.take_along_axis(roomInfection, self.location, axis=1)
+        candidates = np.flatnonzero((self.state == self.stateCode["susceptible"]) & self.inRoom & (threshold > 0))
+        threshold = threshold.reshape(-1)[candidates]
+        if self.model.faceMask_intervention:
+            rooms = self.location.reshape(-1)[candidates]
+            maskBlock = (~world.is_social if hubs else world.mask_blocks)[rooms]
+            blocked = self.compliance[candidates%self.agentCount] & maskBlock
+            threshold = np.where(blocked, self.model.maskB*threshold, threshold)
+        # the candidates of each replicate are checked room by room like the loop of the model, see sequentialInfections
+        replicate, rooms = candidates//self.agentCount, self.location.reshape(-1)[candidates]
+        order = np.lexsort((candidates, rooms, replicate))
+        candidates, threshold = candidates[order], threshold[order]
+        bounds = np.searchsorted(replicate[order], np.arange(self.replicates+1))
+        infected = np.zeros(self.state.size, dtype=bool)
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            infected[candidates[start:end][model_framework.sequentialInfections(self.rng.random(end-start), threshold[start:end])]] = True
+        self.changeState(infected.reshape(self.state.shape), "exposed")
+
+    def transitionAgents(self):
+        """move the agents whose state persisted long enough to their next state, same as AgentBasedModel.transitionAgents"""
+        compiled = self.compiledConfig
+        transitionTime = compiled.transitionTime
+        codes = np.arange(len(transitionTime))
+        due = self.lastUpdate + transitionTime[self.state] < self.time
+        quarantined = due & (self.state == self.stateCode["quarantined"])
+        exitState = (self.infected & quarantined, ~self.infected & quarantined)
+        changing = due & np.isin(self.state, codes[transitionTime > 0]) & (self.state != self.stateCode["susceptible"]) & ~quarantined
+        changes = []
+        for code in np.unique(self.state[changing]).tolist():
+            fromState = changing & (self.state == code)
+            nextCodes, cdf = compiled.transitionNextCode[code], compiled.transitionCdf[code]
+            if len(nextCodes) > 1:
+                index = np.flatnonzero(fromState)
+                nextCode = nextCodes[np.searchsorted(cdf, self.rng.random(len(index)), side="right")]
+                for nextState in np.unique(nextCode).tolist():
+                    changed = np.zeros(self.state.size, dtype=bool)
+                    changed[index[nextCode == nextState]] = True
+                    changes.append((changed.reshape(self.state.shape), self.stateNames[nextState]))
+            else:
+                changes.append((fromState, self.stateNames[nextCodes[0]]))
+        # every change is decided before any agent changes state, like the model where an agent is checked once per call
+        self.changeState(exitState[0], "recovered")
+        self.changeState(exitState[1], "susceptible")
+        for changed, stateName in changes:
+            self.changeState(changed, stateName)
+
+    def checkForWalkIn(self):
+        """the agents with symptoms walk in for a check up, same as AgentBasedModel.checkForWalkIn"""
+        model = self.model
+        if not model.walkIn:
+            return
+        quarantine = np.zeros(self.state.shape, dtype=bool)
+        for stateName in ["infected Symptomatic Mild", "infected Symptomatic Severe"]:
+            symptomatic = (self.state == self.stateCode[stateName]) & (self.lastUpdate+23 > self.time)
+            index = np.flatnonzero(symptomatic)
+            draws = self.rng.random((len(index), 2))
+            walkIn = (draws[:, 0] < model.config["Quarantine"]["walkinProbability"].get(stateName, 0)) & (draws[:, 1] > model.config["Quarantine"]["falseNegative"])
+            quarantine.reshape(-1)[index[walkIn]] = True
+        self.changeState(quarantine, "quarantined")
+
+    def testForDisease(self):
+        """test a group of agents in every replicate and queue the results, same as AgentBasedModel.testForDisease"""
+        model = self.model
+        quarantineConfig = model.config["Quarantine"]
+        tested = np.zeros(self.state.shape, dtype=bool)
+        if quarantineConfig["RandomSampling"]:
+            for replicate in range(self.replicates):
+                tested[replicate, self.rng.choice(model.groupIds, size=quarantineConfig["RandomSampleSize"], replace=False)] = True
+        else:
+            tested[:, model.groupIds[self.quarantineGroupIndex]] = True
+            self.quarantineGroupIndex = (self.quarantineGroupIndex+1)%model.quarantineGroupNumber
+        if quarantineConfig["ShowingUpForScreening"] != 1:
+            symptomatic = (self.state == self.stateCode["infected Symptomatic Mild"]) | (self.state == self.stateCode["infected Symptomatic Severe"])
+            tested &= symptomatic | (self.rng.random(self.state.shape) <= quarantineConfig["ShowingUpForScreening"])
+        draws = self.rng.random(self.state.shape)
+        falsePositive = tested & (draws < quarantineConfig["falsePositive"]) & (self.state == self.stateCode["susceptible"])
+        # double the difficulty to catch Asymptomatic compared to symptomatic
+        coeff = np.where(self.state == self.stateCode["infected Asymptomatic Fixed"], 2, 1)
+        caught = tested & ~falsePositive & self.infectiousCodes[self.state] & (self.rng.random(self.state.shape) > coeff*quarantineConfig["falseNegative"])
+        self.screeningQueue.append((self.time, caught, falsePositive))
+
+    def delayedQuarantine(self):
+        """quarantine the agents of the oldest screening once its result is in, same as AgentBasedModel.delayed_quarantine"""
+        if self.model.quarantine_intervention and self.screeningQueue:
+            if self.time-self.model.config["Quarantine"]["ResultLatency"] == self.screeningQueue[0][0]:
+                _, caught, falsePositive = self.screeningQueue.pop(0)
+                self.changeState(caught | falsePositive, "quarantined")
+                self.falsePositive |= falsePositive
+
+    def bigGathering(self):
+        """three groups of agents gather in every replicate, same as AgentBasedModel.big_gathering"""
+        model = self.model
+        if not model.largeGathering or len(self.gatheringIds) < 50:
+            return
+        susceptible = self.stateCode["susceptible"]
+        for replicate in range(self.replicates):
+            state = self.state[replicate]
+            infected = np.zeros(self.agentCount, dtype=bool)
+            for _ in range(3):
+                subset = self.rng.choice(self.gatheringIds, size=self.rng.integers(20, 60, endpoint=True), replace=False)
+                contribution = self.contribution[state[subset]] * self.contributes[subset]
+                if model.faceMask_intervention: # only the compliant agents wear a mask
+                    contribution = contribution * np.where(self.compliance[subset], model.maskP, 1)
+                totalInfection = (self.baseP*3*contribution.sum())/(40*(len(subset)//40+1))
+                caught = subset[(state[subset] == susceptible) & ~infected[subset] & (self.rng.random(len(subset)) < totalInfection)]
+                infected[caught] = True
+            changed = np.zeros(self.state.shape, dtype=bool)
+            changed[replicate] = infected
+            self.changeState(changed, "exposed")
+
+    def countStates(self):
+        """return a (R, number of states) array with the number of agents in each state of each replicate"""
+        stateNumber = len(self.stateNames)
+        offsets = (np.arange(self.replicates)*stateNumber)[:, None]
+        counts = np.bincount((self.state + offsets).reshape(-1), minlength=self.replicates*stateNumber).reshape(self.replicates, stateNumber)
+        counts[:, self.stateCode["falsePositive"]] = self.falsePositive.sum(axis=1)
+        return counts
+
+    def storeInformation(self):
+        self.stateCounts[self.time//self.timeIncrement] = self.countStates()
+
+    def parameters(self, replicate):
+        """return the time series of the replicate in the same format as AgentBasedModel.parameters"""
+        times = sorted(self.stateCounts.keys())
+        return dict((stateName, [int(self.stateCounts[t][replicate, code]) for t in times]) for code, stateName in enumerate(self.stateNames))
+
+    def returnR0(self):
+        """return an array with the R0 of each replicate, same as AgentBasedModel.returnR0"""
+        counts = self.stateCounts[self.time//self.timeIncrement]
+        excluded = [self.stateCode["susceptible"], self.stateCode["falsePositive"]]
+        counter = counts.sum(axis=1) - counts[:, excluded].sum(axis=1)
+        seedNumber = self.model.config["Infection"]["SeedNumber"]
+        return (counter - seedNumber)/seedNumber
+
+def R0_ensemble(modelConfig, R0Control, simulationN=100, days=40, seed=None, modelName="default"):
+    """
+        same as R0_simulation but the simulations run together in an EnsembleModel, returns (R0 values, statistics)
+
+        Parameters:
+        - modelConfig: the config dictionary
+        - R0Control: list of (config key, value) that replace the config's values
+        - simulationN: the number of replicates
+        - days: the number of days simulated
+        - seed: the seed of the np.random.SeedSequence used to create the model and run the replicates, None uses a new random seed
+    """
+    configCopy = dict(modelConfig)
+    for variableTup in R0Control:
+        configCopy[variableTup[0]] = variableTup[1]
+    seedSequence = np.random.SeedSequence(seed)
+    print(f"R0_ensemble seed: {seedSequence.entropy}")
+    worldSeed, ensembleSeed = seedSequence.spawn(2)
+    model = model_framework.createModel(configCopy, R0=True, seed=worldSeed)
+    t1 = time.time()
+    ensemble = EnsembleModel(model, simulationN, model_framework.makeGenerator(ensembleSeed, model.bitGenerator))
+    for _ in range(days):
+        ensemble.updateSteps(24)
+    R0Values = ensemble.returnR0().tolist()
+    print("R0 is", R0Values)
+    print("time:", time.time()-t1)
+    data = statfile.analyzeData(R0Values)
+    print(data)
+    print("(npMean, stdev, rangeVal, median)")
+    return (R0Values, ("(npMean, stdev, rangeVal, median)", data))
+
+def compareWithScalar(modelConfig, replicates=20, days=40, seed=None, zLimit=4):
+    """
+        run the same R0 model with the scalar engine (one replicate at a time, see R0_simulation) and with the ensemble,
+        print the mean and standard deviation of the final number of agents in each state and of R0 for both engines,
+        and check that the engines agree: for each value the difference of the means and the log ratio of the variances
+        are turned into z scores, an AssertionError listing every value above zLimit is raised.
+        returns a dictionary (key: state name or "R0" --> value: (scalar mean, ensemble mean, z score of the means, z score of the variances))
+
+        Parameters:
+        - modelConfig: the config dictionary
+        - replicates: the number of replicates run by each engine
+        - days: the number of days simulated
+        - seed: the seed of the np.random.SeedSequence, None uses a new random seed
+        - zLimit: the largest z score accepted
+    """
+    seedSequence = np.random.SeedSequence(seed)
+    print(f"compareWithScalar seed: {seedSequence.entropy}")
+    worldSeed, ensembleSeed, *replicateSeeds = seedSequence.spawn(replicates+2)
+    model = model_framework.createModel(modelConfig, R0=True, seed=worldSeed)
+    snapshot = model.snapshot()
+    ensemble = EnsembleModel(model, replicates, model_framework.makeGenerator(ensembleSeed, model.bitGenerator))
+    t1 = time.time()
+    for _ in range(days):
+        ensemble.updateSteps(24)
+    ensembleTime = time.time()-t1
+    ensembleFinal = ensemble.stateCounts[ensemble.time//ensemble.timeIncrement]
+    ensembleR0 = ensemble.returnR0()
+
+    scalarFinal, scalarR0 = [], []
+    t1 = time.time()
+    for replicateSeed in replicateSeeds:
+        model.restore(snapshot)
+        model.seedRandom(replicateSeed)
+        R0, _ = model_framework.runR0Replicate(model, days)
+        scalarFinal.append([len(model.state2IdDict[stateName]) for stateName in ensemble.stateNames])
+        scalarR0.append(R0)
+    scalarTime = time.time()-t1
+    scalarFinal = np.array(scalarFinal)
+
+    def meanZScore(first, second):
+        standardError = np.sqrt(np.var(first, ddof=1)/len(first) + np.var(second, ddof=1)/len(second))
+        difference = np.mean(first) - np.mean(second)
+        if standardError == 0:
+            return 0.0 if difference == 0 else np.inf
+        return abs(difference)/standardError
+
+    def varianceZScore(first, second, floor):
+        # the log of a sample variance has a standard error of about sqrt(2/(n-1)),
+        # floor is added to both variances so a value that is (almost) always the same doesn't give log(0)
+        logRatio = np.log((np.var(first, ddof=1) + floor)/(np.var(second, ddof=1) + floor))
+        return abs(logRatio)/np.sqrt(2/(len(first)-1) + 2/(len(second)-1))
+
+    comparison, failures = dict(), []
+    print(f"{'':30} {'scalar':>18} {'ensemble':>18} {'z mean':>7} {'z var':>6}")
+    # the state counts are integers, a quarter is the variance of a count that is off by one half of the time
+    columns = [(stateName, scalarFinal[:, code], ensembleFinal[:, code], 0.25) for code, stateName in enumerate(ensemble.stateNames)]
+    seedNumber = model.config["Infection"]["SeedNumber"]
+    for name, first, second, floor in columns + [("R0", np.array(scalarR0), ensembleR0, 0.25/seedNumber**2)]:
+        comparison[name] = (float(np.mean(first)), float(np.mean(second)), meanZScore(first, second), varianceZScore(first, second, floor))
+        print(f"{name:30} {np.mean(first):9.2f} ±{np.std(first):7.2f} {np.mean(second):9.2f} ±{np.std(second):7.2f} {comparison[name][2]:7.2f} {comparison[name][3]:6.2f}")
+        if comparison[name][2] > zLimit or comparison[name][3] > zLimit:
+            failures.append(f"{name} (z mean {comparison[name][2]:.2f}, z variance {comparison[name][3]:.2f})")
+    print(f"time: scalar {scalarTime:.1f}s, ensemble {ensembleTime:.1f}s for {replicates} replicates")
+    if failures:
+        raise AssertionError(f"the ensemble doesn't match the scalar engine (z limit {zLimit}): {', '.join(failures)}")
+    return comparison
@@ -1,5 +1,10 @@
 import os
 import platform
+import json
+import time
+import urllib.parse
+import warnings
+import numpy as np
 import pandas as pd
 import pickle
 import dill
@@ -87,44 +92,75 @@ def loadConfig(folder, fileName):
         content = [line.strip() for line in f.readlines()]
     return content
 
-def openCsv(filePath, default = ["new df here"]):
+# the types of the columns of the csv files read by make_df, "str" for names, "category" for strings with a few distinct values, or a numpy type.
+# every column of the schema has to be in the file without empty cells, the other columns of the file are kept as strings,
+# the columns of a file without a schema get the types pandas infers
+CSV_SCHEMAS = {
+    "newBuilding.csv": dict([("building_name", "str"), ("room_name", "str"), ("building_type", "category"), ("building_size", "category"), ("count", "int32")] 
+        + [(prefix+size, "int32") for prefix in ["leaf_", "cap_", "enroll_"] for size in "SML"]
+        + [("connected_to", "str"), ("Kv", "float64"), ("hubKv", "float64"), ("hubCapacity", "int32")]),
+    "newAgent.csv": {"Agent_type": "category", "totalCount": "int32", "state": "category", "archetype": "category", "initial_location": "str"},
+}
+
+def readCsv(filePath, schema=None):
     """
-        returns the content of the csv file if it exists.
-    
+        return the content of the csv file as a dataframe, the white spaces around the column names and the strings are removed.
+        with a schema, every column is read as strings and then converted to the type given by the schema, 
+        raises a ValueError that lists every column that is missing, has empty cells or values that can't be converted.
+        a missing file or a line with too many cells raises an error, nothing is asked
+
         Parameters:
         - filePath: the absolute or relative path to the .csv file
-        - default: default value to load if the file is not located
+        - schema: dictionary, key: column name --> value: "str", "category" or a numpy type name (Ex: "int32"), None lets pandas infer the types
     """
     try:
-        content = pd.read_csv(filePath, error_bad_lines=False)
-    except Exception:
-        print(f"exception, the filename {filePath} you requested to open was not found.")
-        if (int(input("do you want to make a new file? 1 for yes, 0 for no")) == 1):
-            content = pd.dataframe(default)
-            content.toCsv(filePath, index=False, header=False)
-    return content
-    
+        # without index_col=False pandas reads a file where every line has one cell too many with the first column as the index,
+        # with it the extra cells are dropped with a ParserWarning, which is raised as an error
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", pd.errors.ParserWarning)
+            df = pd.read_csv(filePath, dtype=None if schema is None else str, on_bad_lines="error", index_col=False)
+    except (pd.errors.ParserError, pd.errors.ParserWarning) as error:
+        raise ValueError(f"can't read {filePath}: {error}") from error
+    df.columns = df.columns.str.strip()
+    for column in df.columns:
+        if pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].str.strip()
+    if schema is None:
+        return df
+    problems = [f"missing column {column!r}" for column in schema.keys() if column not in df.columns]
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        # the line numbers in the file, the header is line 1
+        emptyLines = (np.flatnonzero(values.isna() | (values == "")) + 2).tolist()
+        if emptyLines:
+            problems.append(f"column {column!r} has empty cells on the lines {emptyLines}")
+        elif dtype == "category":
+            df[column] = values.astype("category")
+        elif dtype != "str":
+            numbers = pd.to_numeric(values, errors="coerce")
+            invalid = numbers.isna() | ((numbers % 1 != 0) if np.issubdtype(np.dtype(dtype), np.integer) else False)
+            if invalid.any():
+                problems.append(f"column {column!r} has values that are not {dtype}: {values[invalid].unique().tolist()}")
+            else:
+                df[column] = numbers.astype(dtype)
+    if problems:
+        raise ValueError(f"invalid csv file {filePath}:\n - " + "\n - ".join(problems))
+    return df
 
 def formatData(folder, fileName):
     """
-        get the relevant data from the file with the corresponding filename, then make a dictionary out of it
+        return the content of the csv file as a dataframe (see readCsv), the columns get the types of CSV_SCHEMAS if the file name is in it,
+        the rows are numbered from 1
 
         Parameters:
         - folder: the folder where the file is located, use empty string, "", if the file isnt nested
         - fileName: the name of the file    
     """
-    fullName = fullPath(fileName, folder)
-    # get the content of the file and convert it to a panda dataframe
-    content = openCsv(fullName, [])
-    df_list = [content.columns.values.tolist()]+content.values.tolist()
-    # remove white spaces in font and back of all entries
-    df_list = [[txt.strip() if type(txt) == str else txt for txt in lst] for lst in df_list]
-    # make a new dataframe from the list, also use the first line in the dataframe as the new header
-    new_df = pd.DataFrame(df_list)
-    header = new_df.iloc[0]
-    new_df = new_df[1:]
-    new_df.columns = header
-    return new_df
+    df = readCsv(fullPath(fileName, folder), CSV_SCHEMAS.get(fileName))
+    df.index += 1
+    return df
 
 def make_df(folder, fileName, debug=True):
     """
@@ -135,7 +171,8 @@ def make_df(folder, fileName, debug=True):
         - fileName: the name of the file     
     """
     a = formatData(folder, fileName)
-    a.fillna(0, inplace =True)
+    if fileName not in CSV_SCHEMAS: # the schema columns don't have empty cells
+        a.fillna(0, inplace =True)
     if debug:
         print("this is a preview of the data that you're loading:")
         print(a.head(3))
@@ -144,6 +181,139 @@ def make_df(folder, fileName, debug=True):
 def save_df_to_csv(filepath, content):
     content.to_csv(filepath)
 
+class ResultStore:
+    """
+        append only store for the results of many simulations, a folder of chunks with one .npy file per column.
+        the rows are kept in memory and written as a new chunk every chunkSize rows, so adding rows never rewrites what's already saved.
+        manifest.json lists the saved chunks and the metadata of each run that wrote to the store, 
+        a chunk that isn't in the manifest (the run stopped while writing it) is ignored by loadResults
+    """
+    def __init__(self, folder, metadata=None, chunkSize=100):
+        """
+            Parameters:
+            - folder: the folder of the store, made if it doesn't exist, if it already holds a store the new chunks are added after the old ones
+            - metadata: dictionary of values that can be saved as json (Ex: config hash, seed), saved in the manifest with the time the run started
+            - chunkSize: the number of rows per chunk
+        """
+        self.folder = folder
+        self.chunkSize = chunkSize
+        self.rows = []
+        self.startTime = time.time()
+        os.makedirs(folder, exist_ok=True)
+        self.manifest = readManifest(folder) if os.path.exists(os.path.join(folder, "manifest.json")) else {"runs": [], "chunks": []}
+        self.run = len(self.manifest["runs"])
+        self.manifest["runs"].append(dict(metadata or dict(), started=self.startTime, wallTime=0, rows=0))
+        self.writeManifest()
+
+    def append(self, values, timeSeries=None):
+        """
+            add one row, the row is saved with the next chunk
+
+            Parameters:
+            - values: dictionary, key: column name --> value: number
+            - timeSeries: dictionary, key: column name --> value: list or 1d array, saved as one row of a 2d column
+        """
+        timeSeries = timeSeries or dict()
+        invalid = [name for name in list(values.keys()) + list(timeSeries.keys()) if not isinstance(name, str) or not name]
+        if invalid:
+            raise ValueError(f"the column names {invalid} are not non empty strings")
+        repeated = values.keys() & timeSeries.keys()
+        if repeated:
+            raise ValueError(f"the columns {sorted(repeated)} are both values and time series")
+        self.rows.append((values, timeSeries))
+        if len(self.rows) >= self.chunkSize:
+            self.flush()
+
+    def flush(self):
+        """write the rows in memory as a new chunk and add it to the manifest"""
+        if not self.rows:
+            return
+        chunkName = f"chunk_{len(self.manifest['chunks']):05d}"
+        os.makedirs(os.path.join(self.folder, chunkName), exist_ok=True)
+        columns = dict()
+        for values, timeSeries in self.rows:
+            for name in list(values.keys()) + list(timeSeries.keys()):
+                columns.setdefault(name, None)
+        for name in columns.keys():
+            entries = [values.get(name, timeSeries.get(name)) for values, timeSeries in self.rows]
+            np.save(os.path.join(self.folder, chunkName, columnFileName(name)), stackEntries(entries))
+        self.manifest["chunks"].append({"name": chunkName, "rows": len(self.rows), "run": self.run, "columns": list(columns.keys())})
+        run = self.manifest["runs"][self.run]
+        run["rows"] += len(self.rows)
+        run["wallTime"] = time.time() - self.startTime
+        self.rows = []
+        self.writeManifest()
+
+    def close(self):
+        """write the remaining rows"""
+        self.flush()
+
+    def writeManifest(self):
+        # written next to the manifest and renamed, so the manifest on disk is never half written
+        temporaryName = os.path.join(self.folder, "manifest.json.tmp")
+        with open(temporaryName, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(temporaryName, os.path.join(self.folder, "manifest.json"))
+
+def columnFileName(name):
+    """return the name of the .npy file of a column, the characters that can't be in a file name (Ex: "/") are %-escaped"""
+    return urllib.parse.quote(name, safe=" ") + ".npy"
+
+def stackEntries(entries):
+    """
+        return an array with one entry per row: a 1d array if the entries are numbers, a 2d array if they are lists or arrays,
+        missing entries (None) and the end of shorter lists are nan
+    """
+    if all(entry is None or np.ndim(entry) == 0 for entry in entries):
+        if any(entry is None for entry in entries):
+            return np.array([np.nan if entry is None else entry for entry in entries], dtype=float)
+        return np.array(entries)
+    entries = [np.asarray(entry) if entry is not None else np.zeros(0) for entry in entries]
+    width = max(len(entry) for entry in entries)
+    if all(len(entry) == width for entry in entries):
+        return np.stack(entries)
+    stacked = np.full((len(entries), width), np.nan)
+    for row, entry in enumerate(entries):
+        stacked[row, :len(entry)] = entry
+    return stacked
+
+def readManifest(folder):
+    """return the manifest of the ResultStore in the folder"""
+    with open(os.path.join(folder, "manifest.json")) as f:
+        return json.load(f)
+
+def loadResults(folder, concatenate=False):
+    """
+        return (manifest, columns) of the ResultStore in the folder, columns is a dictionary, key: column name --> value: 
+        a list with one memory mapped array per chunk (only the parts that are used are read from the disk) or, with concatenate, one array with every row.
+        a chunk without the column has None in the list, or nan rows when concatenated,
+        and the time series of the chunks that are shorter than the longest one are padded with nan when concatenated
+
+        Parameters:
+        - folder: the folder of the store
+        - concatenate: if True, the chunks of each column are copied into one array
+    """
+    manifest = readManifest(folder)
+    names = list(dict.fromkeys(name for chunk in manifest["chunks"] for name in chunk["columns"]))
+    columns = dict((name, []) for name in names)
+    for chunk in manifest["chunks"]:
+        for name in names:
+            filePath = os.path.join(folder, chunk["name"], columnFileName(name))
+            columns[name].append(np.load(filePath, mmap_mode="r") if name in chunk["columns"] else None)
+    if concatenate:
+        for name, arrays in columns.items():
+            shape = max(array.shape[1:] for array in arrays if array is not None)
+            if all(array is not None and array.shape[1:] == shape for array in arrays):
+                columns[name] = np.concatenate(arrays)
+                continue
+            stacked, row = np.full((sum(chunk["rows"] for chunk in manifest["chunks"]),)+shape, np.nan), 0
+            for chunk, array in zip(manifest["chunks"], arrays):
+                if array is not None:
+                    stacked[(slice(row, row+chunk["rows"]),)+tuple(slice(0, width) for width in array.shape[1:])] = array
+                row += chunk["rows"]
+            columns[name] = stacked
+    return manifest, columns
+
 def get_cd():
     """
     uses the os.path function to get the filename and the absolute path to the current directory
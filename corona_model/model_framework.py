@@ -1,13 +1,24 @@
 import os
-import random
 import pandas as pd
 import pickle
 import numpy as np
 import time
 import copy
 import itertools
+import heapq
+import bisect
+import collections.abc
+import concurrent.futures
+import multiprocessing
+import multiprocessing.connection
+import gc
+import traceback
+import json
+import hashlib
+import shutil
 # the following are .py files
 import fileRelated as flr
+import configCompiler
 import statfile
 import visualize as vs
 import modifyDf as mod_df
@@ -15,7 +26,6 @@ import schedule_students
 import schedule_faculty
 # for speed tests/debug and memoization
 import functools
-import cProfile
 
 def clock(func): # from version 2, page 203 - 205 of Fluent Python by Luciano Ramalho
     @functools.wraps(func)
@@ -34,51 +44,269 @@ def clock(func): # from version 2, page 203 - 205 of Fluent Python by Luciano Ra
         return result
     return clocked
 
-def multiSimulation(simulationCount, modelConfig, days, debug, modelName):
+def multiSimulation(simulationCount, modelConfig, days, debug, modelName, workers=1, seed=None, shareWorld=False, checkpointDays=None, resume_from=None, chunkSize=100):
     """
-        run multiple simulations and return the location where the infection occured, the total number infected, and the max infected 
+        run multiple simulations and return the location where the infection occured, the total number infected, and the max infected,
+        each simulation's results and time series are added to the ResultStore modelName+"_results" as soon as the simulation is done 
+        (read it with fileRelated.loadResults), the csv modelName+".csv" is written once at the end
+
+        Parameters:
+        - workers: the number of processes running simulations at the same time, 1 runs them one after the other in this process, None uses every cpu
+        - seed: the seed of the np.random.SeedSequence that gives each simulation its own random stream, 
+            with a seed the results are the same for any number of workers. 
+            None with 1 worker gives each simulation a new random seed, None with more workers uses a new random seed (printed to reproduce the run)
+        - shareWorld: if True, the model is created once and every simulation starts from it (in a forked process, see forkReplicates),
+            so the simulations have the same world and schedules and only differ in the infection,
+            if False, each simulation creates its own model
+        - checkpointDays: if given, each simulation saves a checkpoint (see simpleCheck) every checkpointDays days and when it's done,
+            the checkpoints are named after modelName+"_"+the simulation's index, they are not saved with shareWorld
+        - resume_from: the modelName of an interrupted run, the simulations that saved a checkpoint continue from it 
+            (finished simulations only return their result), the others start over
+        - chunkSize: the number of simulations per chunk of the ResultStore
     """
+    if shareWorld and (checkpointDays or resume_from):
+        raise ValueError("checkpoints are not saved or resumed with shareWorld=True")
     multiResults = {} # dictionary that will be converted to a dataframe
     infectionData = [] # list that will contain multiple time series dictionary 
-    totalInfected = []
-    for i in range(simulationCount):
-        result = simpleCheck(modelConfig, days=days, visuals=False, debug=debug, modelName=modelName+"_"+str(i))
+    results = [None]*simulationCount
+    seedSequence = None if workers == 1 and seed is None and not shareWorld else np.random.SeedSequence(seed)
+    metadata = {"configHash": configCompiler.configHash(modelConfig), "seed": None if seedSequence is None else seedSequence.entropy,
+        "simulationCount": simulationCount, "days": days, "shareWorld": shareWorld}
+    store = flr.ResultStore(modelName+"_results", metadata, chunkSize)
+    def addResult(index, timedResult):
+        result, wallTime = timedResult
+        results[index] = result
+        store.append(resultRow(index, wallTime, result), result[2])
+    resumeNames = [None]*simulationCount
+    if resume_from is not None:
+        resumeNames = [checkpointPath(resume_from+"_"+str(i)) for i in range(simulationCount)]
+        resumeNames = [fileName if os.path.exists(fileName) else None for fileName in resumeNames]
+        print(f"resuming {simulationCount-resumeNames.count(None)}/{simulationCount} simulations from their checkpoint")
+    if seedSequence is None:
+        for i in range(simulationCount):
+            addResult(i, timed(simpleCheck, modelConfig, days=days, visuals=False, debug=debug, modelName=modelName+"_"+str(i), 
+                                 checkpointDays=checkpointDays, resume_from=resumeNames[i]))
+    else:
+        print(f"multiSimulation seed: {seedSequence.entropy}")
+        replicateSeeds = seedSequence.spawn(simulationCount)
+        replicateKwargs = [dict(days=days, visuals=False, debug=debug, modelName=modelName+"_"+str(i), seed=replicateSeed, checkpointDays=checkpointDays, resume_from=resumeNames[i]) 
+                            for i, replicateSeed in enumerate(replicateSeeds)]
+        if shareWorld:
+            # the simulations use the same streams as without shareWorld, the model is created with the next one
+            model = createModel(modelConfig, debug=debug, seed=seedSequence.spawn(1)[0])
+            for i, timedResult in enumerate(forkReplicates(model, functools.partial(timed, runModel, days=days, debug=debug), replicateSeeds, workers)):
+                addResult(i, timedResult)
+        elif workers == 1:
+            for i, kwargs in enumerate(replicateKwargs):
+                addResult(i, timed(simpleCheck, modelConfig, **kwargs))
+                print(f"finished {i+1}/{simulationCount} simulations")
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = dict((executor.submit(timed, simpleCheck, modelConfig, **kwargs), i) for i, kwargs in enumerate(replicateKwargs))
+                # the results come back as soon as a worker is done, in any order
+                for finished, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                    addResult(futures[future], future.result())
+                    print(f"finished {finished}/{simulationCount} simulations ({finished/simulationCount*100:.0f}%)")
+    store.close()
+    # the csv is written once, in the order of the simulations
+    for result in results:
         for individualResult in result[:2]:
             for (k, v) in individualResult.items():
-                multiResults[k] = multiResults.get(k, []) + [v]
-            dfobj = pd.DataFrame.from_dict(multiResults, orient="index")
-            flr.save_df_to_csv(modelName+".csv", dfobj)
+                multiResults.setdefault(k, []).append(v)
         infectionData.append(result[3])
+    flr.save_df_to_csv(modelName+".csv", pd.DataFrame.from_dict(multiResults, orient="index"))
     print(infectionData)   
     return infectionData
 
-def simpleCheck(modelConfig, days=100, visuals=True, debug=False, modelName="default"):
+def resultRow(index, wallTime, result):
     """
-        runs one simulatons with the given config and showcase the number of infection and the graph
+        return the row of a simulation in the ResultStore of multiSimulation, the columns simulation and wallTime followed by the two summaries of simpleCheck,
+        raises a ValueError if a column is in more than one of them, a building type named like a state would otherwise replace the state's value
+
+        Parameters:
+        - index: the index of the simulation
+        - wallTime: the time the simulation took in seconds
+        - result: the value returned by simpleCheck
     """
-    loadDill, saveDill = False, False
-    pickleName = flr.fullPath("coronaModel.pkl", "picklefile")
-    if not loadDill:
-        model = createModel(modelConfig, debug=debug)
-        if saveDill:
-            flr.saveUsingDill(pickleName, model)
-            # save an instance for faster loading
-            return 0
-    else:
-        model = flr.loadUsingDill(pickleName)
-        print("loaded pickled object successfully")
-    
-    model.initializeStoringParameter(
-        ["susceptible","exposed", "infected Asymptomatic", 
-        "infected Asymptomatic Fixed" ,"infected Symptomatic Mild", 
-        "infected Symptomatic Severe", "recovered", "quarantined"])
+    row = dict(simulation=index, wallTime=wallTime)
+    for summary in result[:2]:
+        repeated = row.keys() & summary.keys()
+        if repeated:
+            raise ValueError(f"the columns {sorted(repeated)} of simulation {index} are in more than one summary")
+        row.update(summary)
+    return row
+
+def timed(func, *args, **kwargs):
+    """return (func(*args, **kwargs), the wall time of the call in seconds)"""
+    t0 = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - t0
+
+def forkReplicates(model, replicate, seedSequences, workers=None):
+    """
+        run replicate(model) once per seed and return the results in the order of the seeds.
+        each replicate runs in a child process forked from this one, the child starts with the model's memory pages (shared copy on write),
+        so the model is never copied or pickled, the child seeds the model's generator and only sends back the result of replicate through a pipe.
+        where fork isn't available (windows), the replicates run in this process and the model is restored from a snapshot before each one
+
+        Parameters:
+        - model: the AgentBasedModel, created once and not run yet
+        - replicate: function that takes the model, runs it and returns a (small) picklable result, or a list of such functions, one per seed
+        - seedSequences: list of np.random.SeedSequence, one per replicate
+        - workers: the number of children running at the same time, None uses every cpu
+    """
+    results = [None]*len(seedSequences)
+    replicates = replicate if isinstance(replicate, list) else [replicate]*len(seedSequences)
+    # restoring rebuilds the sets of agents, which can change the order they are iterated in,
+    # the model is restored once here so the replicates run the same as the ones that restore a snapshot (R0_simulation with 1 worker)
+    snapshot = model.snapshot()
+    model.restore(snapshot)
+    if "fork" not in multiprocessing.get_all_start_methods():
+        for index, seedSequence in enumerate(seedSequences):
+            model.restore(snapshot)
+            model.seedRandom(seedSequence)
+            results[index] = replicates[index](model)
+            print(f"finished {index+1}/{len(seedSequences)} replicates")
+        return results
+    context = multiprocessing.get_context("fork")
+    workers = workers or os.cpu_count()
+    pending = list(enumerate(seedSequences))[::-1]
+    running = dict() # key: receiving end of the pipe --> value: (replicate index, process)
+    finished = 0
+    # objects that exist before the fork are moved out of the garbage collector's reach, 
+    # otherwise a collection in a child writes to (and copies) every page holding the model
+    gc.freeze()
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                index, seedSequence = pending.pop()
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=runForkedReplicate, args=(model, replicates[index], seedSequence, sender), daemon=True)
+                process.start()
+                sender.close()
+                running[receiver] = (index, process)
+            for receiver in multiprocessing.connection.wait(list(running.keys())):
+                index, process = running.pop(receiver)
+                try:
+                    succeeded, value = receiver.recv()
+                except EOFError:
+                    succeeded, value = False, f"the process ended with exit code {process.exitcode} without sending a result"
+                receiver.close()
+                process.join()
+                if not succeeded:
+                    raise RuntimeError(f"replicate {index} failed:\n{value}")
+                results[index] = value
+                finished += 1
+                print(f"finished {finished}/{len(seedSequences)} replicates")
+    finally:
+        for receiver, (_, process) in running.items():
+            process.terminate()
+            receiver.close()
+        gc.unfreeze()
+    return results
+
+def runForkedReplicate(model, replicate, seedSequence, sender):
+    """the code run in the child process made by forkReplicates, sends (True, result) or (False, traceback) through the pipe"""
+    try:
+        model.seedRandom(seedSequence)
+        sender.send((True, replicate(model)))
+    except BaseException:
+        sender.send((False, traceback.format_exc()))
+    finally:
+        sender.close()
+
+def runModel(model, days, debug=False, checkpointDays=None, checkpointName=None):
+    """
+        run the model until the given day and return model.outputs(), the simulation part of simpleCheck,
+        a model that was loaded from a checkpoint continues from the day it was saved
+
+        Parameters:
+        - checkpointDays: if given, the model is saved to checkpointName (see saveCheckpoint) every checkpointDays days and on the last day
+    """
+    if model.time == 0:
+        model.initializeStoringParameter(
+            ["susceptible","exposed", "infected Asymptomatic", 
+            "infected Asymptomatic Fixed" ,"infected Symptomatic Mild", 
+            "infected Symptomatic Severe", "recovered", "quarantined"])
     model.printRelevantInfo()
-    for _ in range(days):
+    for day in range(model.time//24, days):
         model.updateSteps(24)
         if debug:
             model.printRelevantInfo()
+        if checkpointDays and ((day+1)%checkpointDays == 0 or day+1 == days):
+            model.saveCheckpoint(checkpointName)
     model.final_check()
     model.printRoomLog()
+    return model.outputs()
+
+def runBranch(model, interventionNames, days, debug=False):
+    """turn on the interventions and run the model until the given day, return model.outputs(), one branch of branchSimulation"""
+    model.turnOnInterventions(interventionNames)
+    return runModel(model, days, debug)
+
+def branchSimulation(modelConfig, branches, branchDay, days=100, replicates=1, debug=False, workers=1, seed=None):
+    """
+        simulate the days before branchDay once per replicate, then continue the replicate with each branch from that day,
+        return a dictionary, key: branch name --> value: list of model.outputs(), one per replicate.
+        the branches of a replicate start from the same state and use the same random stream, 
+        so the difference between two branches comes from their interventions (paired comparison)
+
+        Parameters:
+        - modelConfig: the config of the shared days, the interventions it turns on are on in every branch from day 0
+        - branches: dictionary, key: branch name --> value: list of the interventions turned on at branchDay (see AgentBasedModel.turnOnInterventions), 
+            Ex: {"noIntervention": [], "masks": ["FaceMasks"], "masksAndTesting": ["FaceMasks", "Quarantine"]}
+        - branchDay: the first day of the branches
+        - days: the day every branch ends on
+        - replicates: the number of times the shared days are simulated, each one with its own random stream
+        - workers: 1 runs the branches one after the other in this process, more runs them in processes forked from this one (see forkReplicates), None uses every cpu
+        - seed: the seed of the np.random.SeedSequence of the model and the replicates, None uses a new random seed (printed to reproduce the run)
+    """
+    seedSequence = np.random.SeedSequence(seed)
+    print(f"branchSimulation seed: {seedSequence.entropy}")
+    model = createModel(modelConfig, debug=debug, seed=seedSequence.spawn(1)[0])
+    model.initializeStoringParameter(
+        ["susceptible","exposed", "infected Asymptomatic", 
+        "infected Asymptomatic Fixed" ,"infected Symptomatic Mild", 
+        "infected Symptomatic Severe", "recovered", "quarantined"])
+    initialSnapshot = model.snapshot()
+    branchRuns = [functools.partial(runBranch, interventionNames=interventionNames, days=days, debug=debug) for interventionNames in branches.values()]
+    results = dict((branchName, []) for branchName in branches.keys())
+    for replicate in range(replicates):
+        sharedSeed, branchSeed = seedSequence.spawn(2)
+        model.restore(initialSnapshot)
+        model.seedRandom(sharedSeed)
+        for _ in range(branchDay):
+            model.updateSteps(24)
+        print(f"replicate {replicate+1}/{replicates}: simulated the first {branchDay} days")
+        if workers == 1:
+            branchSnapshot = model.snapshot()
+            branchResults = []
+            for branchRun in branchRuns:
+                model.restore(branchSnapshot)
+                model.seedRandom(branchSeed)
+                branchResults.append(branchRun(model))
+        else:
+            branchResults = forkReplicates(model, branchRuns, [branchSeed]*len(branchRuns), workers)
+        for branchName, outputs in zip(branches.keys(), branchResults):
+            results[branchName].append(outputs)
+    return results
+
+def simpleCheck(modelConfig, days=100, visuals=True, debug=False, modelName="default", seed=None, checkpointDays=None, resume_from=None):
+    """
+        runs one simulatons with the given config and showcase the number of infection and the graph
+
+        Parameters:
+        - seed: an int or a np.random.SeedSequence for the model's random generator, None uses a new random seed (printed by createModel)
+        - checkpointDays: if given, the model is saved every checkpointDays days and at the end to checkpointPath(modelName), 
+            if the run is stopped it can continue from there with resume_from
+        - resume_from: the path of a checkpoint saved with the same config, the model continues from it (seed is ignored), 
+            the results are the same as the run that saved the checkpoint
+    """
+    if resume_from is None:
+        model = createModel(modelConfig, debug=debug, seed=seed)
+    else:
+        model = resumeModel(modelConfig, resume_from, debug=debug)
+    outputs = runModel(model, days, debug, checkpointDays, checkpointPath(modelName))
     #tup = model.findDoubleTime()
     #for description, tupVal in zip(("doublingTime", "doublingInterval", "doublingValue"), tup):
     #    print(description, tupVal)
@@ -89,43 +317,92 @@ def simpleCheck(modelConfig, days=100, visuals=True, debug=False, modelName="def
         model.visualOverTime(True, True, modelName+fileformat)
     #model.visualizeBuildings()
     # return (newdata, otherData, data, totalExposed)
-    return model.outputs()
+    return outputs
+
+def runR0Replicate(model, days=40, debug=False):
+    """run one R0 simulation on the model and return (R0, the room log if debug else None)"""
+    model.initializeR0()
+    model.initializeStoringParameter(
+        ["susceptible","exposed", "infected Asymptomatic", 
+    "infected Asymptomatic Fixed" ,"infected Symptomatic Mild", 
+    "infected Symptomatic Severe", "recovered", "quarantined"])
+    for _ in range(days):
+        if debug:
+            model.printRelevantInfo()
+        model.updateSteps(24)
+    logDataDict = model.printRoomLog() if debug else None
+    return (model.returnR0(), logDataDict)
+
+def R0_simulation(modelConfig, R0Control, simulationN=100, debug=False, timeSeriesVisual=False, R0Visuals=False, modelName="default", workers=1, seed=None,
+                  tolerance=None, batchSize=10, confidence=0.95):
+    """
+        run simulationN R0 simulations from the same model and return (R0 values, statistics)
 
-def R0_simulation(modelConfig, R0Control, simulationN=100, debug=False, timeSeriesVisual=False, R0Visuals=False, modelName="default"):
+        Parameters:
+        - workers: 1 runs the simulations one after the other in this process, 
+            more runs them in processes forked from this one (see forkReplicates), None uses every cpu
+        - seed: the seed of the np.random.SeedSequence that gives the model and each simulation their own random stream,
+            None uses a new random seed (printed to reproduce the run)
+        - tolerance: if given, the simulations run in batches of batchSize and stop once the half-width of the confidence interval 
+            of the mean R0 is at most tolerance (after at least 2 batches), simulationN is then the maximum number of simulations
+        - batchSize: the number of simulations run between two checks of the confidence interval, rounded up to a multiple of workers
+        - confidence: the confidence level of the interval, Ex: 0.95
+    """
     R0Values = []
     configCopy = dict(modelConfig)
     for variableTup in R0Control:
         configCopy[variableTup[0]] = variableTup[1]
+    seedSequence = np.random.SeedSequence(seed)
+    print(f"R0_simulation seed: {seedSequence.entropy}")
+    # the first stream creates the model, the others are used by the simulations (in the same order however they are batched)
+    worldSeed = seedSequence.spawn(1)[0]
     # base model
-    model = createModel(configCopy, debug=debug, R0=True)
+    model = createModel(configCopy, debug=debug, R0=True, seed=worldSeed)
     if debug:
         max_limits = dict()
     days=40
     t1 = time.time()
-    for i in range(simulationN):
-        print("*"*20, "starting model")
-        new_model = copy.deepcopy(model)    
-        new_model.initializeR0()
-        new_model.initializeStoringParameter(
-            ["susceptible","exposed", "infected Asymptomatic", 
-        "infected Asymptomatic Fixed" ,"infected Symptomatic Mild", 
-        "infected Symptomatic Severe", "recovered", "quarantined"])
-        for _ in range(days):
+    if workers == 1:
+        # every simulation starts from this state, restoring it is much faster than copying the model
+        snapshot = model.snapshot()
+    if tolerance is None:
+        batchSize = simulationN
+    else:
+        workerCount = workers or os.cpu_count()
+        batchSize = -(-max(batchSize, 1)//workerCount)*workerCount
+    runningR0 = statfile.RunningMeanVariance()
+    while len(R0Values) < simulationN:
+        replicateSeeds = seedSequence.spawn(min(batchSize, simulationN-len(R0Values)))
+        if workers == 1:
+            replicateResults = []
+            for replicateSeed in replicateSeeds:
+                print("*"*20, "starting model")
+                model.restore(snapshot)
+                model.seedRandom(replicateSeed)
+                replicateResults.append(runR0Replicate(model, days, debug))
+                print(f"finished {len(R0Values)+len(replicateResults)}/{simulationN} cases")
+        else:
+            replicateResults = forkReplicates(model, functools.partial(runR0Replicate, days=days, debug=debug), replicateSeeds, workers)
+        for R0, logDataDict in replicateResults:
             if debug:
-                new_model.printRelevantInfo()
-            new_model.updateSteps(24)
-        if debug:
-            logDataDict = new_model.printRoomLog()
-            for key, value in logDataDict.items():
-                max_limits[key] = max_limits.get(key, []) + [value]
-        R0Values.append(new_model.returnR0())
-        print(f"finished {(i+1)/simulationN*100}% of cases")
+                for key, value in logDataDict.items():
+                    max_limits[key] = max_limits.get(key, []) + [value]
+            R0Values.append(R0)
+            runningR0.add(R0)
+        if tolerance is not None:
+            print(f"{runningR0.count} simulations, mean R0 {runningR0.mean:.3f} ± {runningR0.halfWidth(confidence):.3f} ({confidence:.0%} confidence)")
+            if runningR0.count >= 2*batchSize and runningR0.halfWidth(confidence) <= tolerance:
+                break
+    print(f"used {len(R0Values)} simulations, mean R0 {runningR0.mean:.3f} ± {runningR0.halfWidth(confidence):.3f} ({confidence:.0%} confidence)")
     if debug:
         for key, value in max_limits.items():
             print(key, "max is the following:", value)
     print("R0 is", R0Values)
     if timeSeriesVisual:
-        new_model.visualOverTime()
+        if workers == 1:
+            model.visualOverTime()
+        else:
+            print("timeSeriesVisual needs workers=1, the simulations ran in other processes")
     print("time:", time.time()-t1)
     data = statfile.analyzeData(R0Values)
     pickleName = flr.fullPath(modelName+"R0Data.pkl", "picklefile")
@@ -140,33 +417,211 @@ def R0_simulation(modelConfig, R0Control, simulationN=100, debug=False, timeSeri
             ylabel="Infected Agents (R0", labels=[modelName], savePlt=True, saveName=modelName)
     return (R0Values, ("(npMean, stdev, rangeVal, median)", data))
 
-def createModel(modelConfig, debug=False, R0=False):
+def checkpointPath(modelName):
+    """return the path of the checkpoint file saved by simpleCheck for the model name"""
+    return flr.fullPath(modelName+"_checkpoint.npz", "picklefile")
+
+def readCheckpoint(fileName):
+    """return (snapshot, values) saved in the checkpoint file by AgentBasedModel.saveCheckpoint"""
+    with np.load(fileName, allow_pickle=False) as checkpoint:
+        values = json.loads(str(checkpoint["values"]))
+        arrays = dict((name, checkpoint[name]) for name in checkpoint.files if name != "values")
+    snapshot = {"arrays": arrays, "values": values.pop("snapshot")}
+    return snapshot, values
+
+def resumeModel(modelConfig, fileName, debug=False):
+    """
+        create the model that saved the checkpoint file and return it in the state it was saved,
+        the world is made again by createModel with the seed used by the saved model, so the config has to be the one it was created with
+    """
+    snapshot, values = readCheckpoint(fileName)
+    worldSeed = np.random.SeedSequence(values["worldSeed"][0], spawn_key=values["worldSeed"][1])
+    model = createModel(modelConfig, debug=debug, R0=snapshot["values"]["R0Calculation"], seed=worldSeed)
+    model.loadCheckpoint(fileName)
+    print(f"resumed from {fileName} at day {model.time//24}")
+    return model
+
+# the csv files the world is made from, in the "configuration" folder
+WORLD_FILES = ("newBuilding.csv", "newAgent.csv")
+# the config sections read while the world is made (createWorld and AgentBasedModel.buildWorld)
+WORLD_CONFIG_SECTIONS = ("Agents", "Rooms", "Buildings", "World", "ClosingBuildings", "HybridClass", "LessSocializing")
+# part of the key of the world cache, change it when the code that makes the world changes so the worlds saved by the old code are not used
+WORLD_CACHE_VERSION = 2
+
+def worldCachePath(modelConfig, seedSequence, folderName="configuration"):
+    """
+        return the folder of the world cache (see AgentBasedModel.saveWorld) for the config and the seed, 
+        the name is a hash of the content of the csv files, the config sections in WORLD_CONFIG_SECTIONS, the bit generator and the seed,
+        so changing any of them gives another folder and a stale world is never loaded
+
+        Parameters:
+        - modelConfig: the config dictionary passed to createModel
+        - seedSequence: the np.random.SeedSequence the world is made with
+        - folderName: the folder of the csv files
+    """
+    fileHashes = []
+    for fileName in WORLD_FILES:
+        with open(flr.fullPath(fileName, folderName), "rb") as f:
+            fileHashes.append(hashlib.sha256(f.read()).hexdigest())
+    key = {"version": WORLD_CACHE_VERSION, "files": fileHashes, "config": dict((sectionName, modelConfig.get(sectionName)) for sectionName in WORLD_CONFIG_SECTIONS),
+        "bitGenerator": modelConfig.get("Engine", dict()).get("BitGenerator", "PCG64"), "seed": [seedSequence.entropy, list(seedSequence.spawn_key)]}
+    return flr.fullPath("world_"+configCompiler.configHash(key)[:24], "picklefile")
+
+def createModel(modelConfig, debug=False, R0=False, seed=None):
     """
         calls the required function(s) to properly initialize the model and returns it
 
         Parameters:
         - modelConfig: a dictionary with  the attribute/property name and the value associated with it
+        - seed: an int or a np.random.SeedSequence for the model's random generator (see seedRandom), None uses a new random seed
+        
+        with the engine option WorldCache and a seed, the world is saved in the folder given by worldCachePath the first time
+        and loaded from there by the next models made with the same csv files, world config and seed
     """
+    # fail before loading anything if the config is missing keys or has wrong values
+    configCompiler.validateConfig(modelConfig)
     model = AgentBasedModel()
     # loading data
     model.addKeys(modelConfig)
     model.configureDebug(debug)
+    model.configureEngine()
+    model.seedRandom(seed)
+    # kept to make the same world again when resuming from a checkpoint
+    model.worldSeed = model.seedSequence
+    if seed is None:
+        print(f"createModel seed: {model.seedSequence.entropy}")
     if R0:
         model.initializeR0()
     model.initializeInterventionsAndPermittedActions()
-    model.loadBuilder("newBuilding.csv")
-    model.loadAgent("newAgent.csv")
-    model.generateAgentDfFromDf()
-    # object creation
-    
-    model.createWorld()
+    cacheFolder = worldCachePath(modelConfig, model.worldSeed) if model.worldCache and seed is not None else None
+    if cacheFolder is not None and os.path.exists(cacheFolder):
+        model.loadWorld(cacheFolder)
+    else:
+        model.loadBuilder(WORLD_FILES[0])
+        model.loadAgent(WORLD_FILES[1])
+        model.generateAgentDfFromDf()
+        # object creation
+        
+        model.createWorld()
+        model.buildWorld()
+        if cacheFolder is not None:
+            model.saveWorld(cacheFolder)
     # start initialization and configuration
-    model.intializeAndConfigureObjects()
+    model.initializeStates()
     
     model.startRoomLog()
     
     return model
    
+class AgentBehavior:
+    """
+        the behaviors shared by every agent representation, the slotted Agents objects made by agentFactory and
+        the AgentView objects made by agentStoreFactory both inherit from this class,
+        the subclass only decides where the attributes are stored
+    """
+    __slots__ = ()
+    # entering one of these states sets infected to True
+    infectedStates = ("exposed", "infected Asymptomatic", "infected Asymptomatic Fixed", "infected Symptomatic Mild", "infected Symptomatic Severe")
+
+    def updateLoc(self, currTime, routes):
+        """
+            change agent's state, either moving or stationary,
+            look at adjacent rooms and move to one of the connected rooms
+
+            Parameters:
+            - currTime: the current time
+            - routes: the RouteTable of the model, used to look up the path and the adjacent rooms
+        """
+        curr_room = self.currLocation
+        
+        if self.motion == "stationary" and currTime >= self.arrivalTime:
+            if True: #purly deterministic 
+                self.destination = self.checkschedule(currTime)
+                self.path = routes.path(curr_room, self.destination)
+                self.move(routes)
+        elif self.motion == "moving" and currTime >= self.arrivalTime:
+            # the agent is still moving across
+            self.move(routes)
+            self.arrivalTime = currTime
+        else: # the agent doesnt need to move
+            return (self.currLocation, self.currLocation)
+        return (curr_room, self.currLocation)
+
+    def checkschedule(self, currTime):
+        """
+            check the current time and return the value stored in the shcedule
+
+            Parameters:
+            - currTime: current time, used to find the schedule item
+        
+        """
+        # there are 24*7 hours in a week
+        # currTime%24*7 will give you the time in terms of week, then // 24 give you days
+        # if the value is greater than 5, then its a weekday
+        # if currTime is odd, then its a odd day and vise versa with even days
+
+    
+        dayOfWeek = (currTime%(24*7))//24
+        hourOfDay = currTime%24
+        if self.state == "quarantined":
+            return self.initial_location
+        elif self.state == "infected Symptomatic Severe" and currTime>self.lastUpdate+120:
+            return self.initial_location
+        # the schedule is a row of the int32 schedule tensor, int() keeps numpy integers out of the room dictionaries
+        if dayOfWeek > 3: # its a weekend
+            return int(self.schedule[2][hourOfDay])
+        elif dayOfWeek & 1: # bit and, its an odd day
+            return int(self.schedule[1][hourOfDay])
+        else: # its an even day
+            return int(self.schedule[0][hourOfDay])
+
+    def move(self, routes):
+        """
+            chooses the random room and moves the agent inside
+        """
+        pastLocation = self.currLocation
+        if routes.isAdjacent(self.currLocation, self.destination):
+            # the agent reached it's destination, takes a rest
+            
+            self.currLocation = self.destination
+            self.destination = None
+            self.path = []
+            self.motion = "stationary"
+        elif self.path == []:
+            pass #no change
+        else: #the path array is not empty, the agent is still moving
+            self.motion = "moving"
+            self.currLocation = self.path.pop()
+            #self.travelTime = 0
+        return (pastLocation, self.currLocation)
+   
+    def changeState(self, updateTime, stateName, durration):
+        """
+            Change the state of the agents, all states have a minimum waiting time,
+            and changing state durring that waiting period is not recommended, because it defeats the purpose
+        
+            If the current state can evolve unexpectedly, then set durration to 0 and use a random value to determine if the state should change.
+            Negative value for durration means the state will persist on to infinity
+        
+            Parameters:
+            - updateTime: the time when the state was updated
+            - stateName: the name of the start to transition to 
+            - infected: bool that tells if the agent was infected or not
+            - durration: the minimum time required to wait until having the choice of chnaging states
+        """
+        self.lastUpdate = updateTime
+        self.statePersistance = durration
+        self.state = stateName
+        if stateName in self.infectedStates:
+            self.infected = True
+    
+    def transitionTime(self):
+        """
+            return the time that that the agent can change state,
+            since the agent is looking at his "clock", the returned time could be off from the global time, can be used for comas (if those states are implimented)
+        """
+        return self.lastUpdate + self.statePersistance
+
 def agentFactory(agent_df, slotVal):
     """
         factory function used to dynamically assign __slots__, creates agents from the given df
@@ -177,7 +632,7 @@ def agentFactory(agent_df, slotVal):
         - slotVal: the column values of the dataframe
     
     """
-    class Agents:
+    class Agents(AgentBehavior):
         """
             creates an agent that moves between rooms and interacts with each other (indirectly)
         """
@@ -186,110 +641,6 @@ def agentFactory(agent_df, slotVal):
             for slot, value in zip(self.__slots__, agentParam):
                 self.__setattr__(slot, value)
 
-        def updateLoc(self, currTime, adjDict):
-            """
-                change agent's state, either moving or stationary,
-                look at adjacent rooms and move to one of the connected rooms
-
-                Parameters:
-                - currTime: the current time
-                - adjDict: the adjacency dictionary, (key: roomId, value: list of roomsId of rooms connected to the key)    
-            """
-            curr_room = self.currLocation
-            
-            if self.motion == "stationary" and currTime >= self.arrivalTime:
-                if True: #purly deterministic 
-                    self.destination = self.checkschedule(currTime)
-                    nextNode,lastNode  = adjDict[curr_room][0][0], adjDict[self.destination][0][0] 
-                    if curr_room == self.destination:
-                        self.path = []
-                    elif nextNode == lastNode: # moving between the same superstructure
-                        self.path = [nextNode]
-                    else: # required to move across the transit hub
-                        self.path = [lastNode, self.transit, nextNode] 
-                    self.move(adjDict)
-            elif self.motion == "moving" and currTime >= self.arrivalTime:
-                # the agent is still moving across
-                self.move(adjDict)
-                self.arrivalTime = currTime
-            else: # the agent doesnt need to move
-                return (self.currLocation, self.currLocation)
-            return (curr_room, self.currLocation)
-
-        def checkschedule(self, currTime):
-            """
-                check the current time and return the value stored in the shcedule
-
-                Parameters:
-                - currTime: current time, used to find the schedule item
-            
-            """
-            # there are 24*7 hours in a week
-            # currTime%24*7 will give you the time in terms of week, then // 24 give you days
-            # if the value is greater than 5, then its a weekday
-            # if currTime is odd, then its a odd day and vise versa with even days
-
-        
-            dayOfWeek = (currTime%(24*7))//24
-            hourOfDay = currTime%24
-            if self.state == "quarantined":
-                return self.initial_location
-            elif self.state == "infected Symptomatic Severe" and currTime>self.lastUpdate+120:
-                return self.initial_location
-            if dayOfWeek > 3: # its a weekend
-                return self.schedule[2][hourOfDay]
-            elif dayOfWeek & 1: # bit and, its an odd day
-                return self.schedule[1][hourOfDay]
-            else: # its an even day
-                return self.schedule[0][hourOfDay]
-
-        def move(self, adjDict):
-            """
-                chooses the random room and moves the agent inside
-            """
-            pastLocation = self.currLocation
-            if self.destination in [a[0] for a in adjDict[self.currLocation]]:
-                # the agent reached it's destination, takes a rest
-                
-                self.currLocation = self.destination
-                self.destination = None
-                self.path = []
-                self.motion = "stationary"
-            elif self.path == []:
-                pass #no change
-            else: #the path array is not empty, the agent is still moving
-                self.motion = "moving"
-                self.currLocation = self.path.pop()
-                #self.travelTime = 0
-            return (pastLocation, self.currLocation)
-   
-        def changeState(self, updateTime, stateName, durration):
-            """
-                Change the state of the agents, all states have a minimum waiting time,
-                and changing state durring that waiting period is not recommended, because it defeats the purpose
-            
-                If the current state can evolve unexpectedly, then set durration to 0 and use a random value to determine if the state should change.
-                Negative value for durration means the state will persist on to infinity
-            
-                Parameters:
-                - updateTime: the time when the state was updated
-                - stateName: the name of the start to transition to 
-                - infected: bool that tells if the agent was infected or not
-                - durration: the minimum time required to wait until having the choice of chnaging states
-            """
-            self.lastUpdate = updateTime
-            self.statePersistance = durration
-            self.state = stateName
-            if stateName in ["exposed", "infected Asymptomatic", "infected Asymptomatic Fixed", "infected Symptomatic Mild", "infected Symptomatic Severe"]:
-                self.infected = True
-        
-        def transitionTime(self):
-            """
-                return the time that that the agent can change state,
-                since the agent is looking at his "clock", the returned time could be off from the global time, can be used for comas (if those states are implimented)
-            """
-            return self.lastUpdate + self.statePersistance
-
         def __repr__(self):
             repr_list = [val for val in self.__slots__]
             return repr_list.join() 
@@ -299,10 +650,176 @@ def agentFactory(agent_df, slotVal):
             return repr_list.join() 
 
     # creates the agents and put them in a dictionary
-    tempDict = dict()
-    for index, row in agent_df.iterrows():
-        tempDict[index] = Agents(row.values.tolist())
-    return tempDict
+    return objectsFromDf(agent_df, Agents)
+
+def objectsFromDf(df, objectClass):
+    """
+        return a dictionary, key: index of the row --> value: objectClass(list of the row's values), used by the factories.
+        the rows are taken from one object array of the dataframe (the values keep their python type, like iterrows on a mixed dataframe), 
+        instead of making a pandas Series for every row
+    """
+    return dict(zip(df.index.tolist(), map(objectClass, df.to_numpy(dtype=object).tolist())))
+
+class AgentStore:
+    """
+        columnar (struct of arrays) storage for the agents, each attribute is one numpy array with one entry per agent,
+        the row of an agent in every array is the agent's Id, so the ids have to be 0, 1, ..., n-1
+
+        columns in numericColumns get a fixed numpy dtype, columns in codedColumns are stored as small integer codes
+        (the code tables grow if a new value is assigned) and every other column is kept in a numpy object array
+    """
+    numericColumns = {
+        "agentId": np.int32, "currLocation": np.int32, "transit": np.int32,
+        "lastUpdate": np.int64, "statePersistance": np.int64, "arrivalTime": np.int64,
+        "compliance": np.bool_, "infected": np.bool_, "gathering": np.bool_,
+    }
+    codedColumns = ("state", "motion")
+
+    def __init__(self, agent_df, slotVal, stateNames=()):
+        """
+            Parameters:
+            - agent_df: a panda dataframe with each row corresponding to an agent's initial value
+            - slotVal: the column values of the dataframe
+            - stateNames: the names of the states, they get the codes 0, 1, 2, ... in the given order
+        """
+        if not agent_df.index.equals(pd.RangeIndex(len(agent_df))):
+            raise ValueError("the columnar agent store requires the agent ids to be 0, 1, ..., n-1")
+        self.size = len(agent_df)
+        self.slots = tuple(slotVal)
+        self.columns = dict()
+        self.codeNames = {"state": list(stateNames), "motion": ["stationary", "moving"]}
+        self.codeIndex = dict((column, dict((name, code) for code, name in enumerate(names))) for column, names in self.codeNames.items())
+        for slot in self.slots:
+            values = agent_df[slot].to_numpy()
+            if slot in self.codedColumns:
+                # encode each distinct value once, factorize lists them in the order they first appear (the order encode would give them codes in)
+                valueIndex, uniqueValues = pd.factorize(values)
+                self.columns[slot] = np.array([self.encode(slot, value) for value in uniqueValues], dtype=np.int8)[valueIndex]
+            elif slot in self.numericColumns:
+                self.columns[slot] = values.astype(self.numericColumns[slot])
+            else:
+                column = np.empty(self.size, dtype=object)
+                column[:] = list(values)
+                self.columns[slot] = column
+        # slots whose column was replaced by attachColumn
+        self.attachedSlots = set()
+        self.viewClass = self.makeViewClass()
+
+    def __getstate__(self):
+        """the AgentView class is not copied or pickled, it is made again for the new arrays in __setstate__"""
+        state = self.__dict__.copy()
+        del state["viewClass"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.viewClass = self.makeViewClass()
+
+    def encode(self, column, value):
+        """return the integer code of the value, a new code is made if the value hasn't been seen before"""
+        codes = self.codeIndex[column]
+        if value not in codes:
+            codes[value] = len(self.codeNames[column])
+            self.codeNames[column].append(value)
+        return codes[value]
+
+    def columnProperty(self, slot):
+        """
+            return the property that reads and writes the entry of the slot's column,
+            the property keeps a reference to the array, so columns have to be modified in place and never replaced
+        """
+        column = self.columns[slot]
+        if slot in self.attachedSlots:
+            def getter(view):
+                return column[view._row]
+            def setter(view, value):
+                column[view._row] = value
+        elif slot in self.codedColumns:
+            names = self.codeNames[slot]
+            def getter(view):
+                return names[column.item(view._row)]
+            def setter(view, value):
+                column[view._row] = self.encode(slot, value)
+        else:
+            def getter(view):
+                return column.item(view._row)
+            def setter(view, value):
+                column[view._row] = value
+        return property(getter, setter)
+
+    def makeViewClass(self):
+        """make the AgentView class, one property per slot made by columnProperty"""
+        class AgentView(AgentBehavior):
+            """
+                a thin view of one row of the AgentStore, it behaves like the Agents object made by agentFactory
+            """
+            __slots__ = ("_row",)
+            def __init__(self, row):
+                self._row = row
+        for slot in self.slots:
+            setattr(AgentView, slot, self.columnProperty(slot))
+        return AgentView
+
+    def codes(self, column, values):
+        """return an array of codes for the values of a coded column"""
+        return np.array([self.codeIndex[column].get(value, -1) for value in values], dtype=np.int8)
+
+    def match(self, attrName, attrVal):
+        """return an array of agent Ids whose attribute attrName is equal to attrVal"""
+        if attrName in self.codedColumns:
+            return np.flatnonzero(self.columns[attrName] == self.codeIndex[attrName].get(attrVal, -1))
+        return np.flatnonzero(self.columns[attrName] == attrVal)
+
+    def attachColumn(self, slot, array):
+        """
+            replace the column of the slot with an array that has one row per agent (the row can be an array),
+            the property of the slot returns the agent's row of the array (a view), assigning to it writes into the array
+        """
+        self.columns[slot] = array
+        self.attachedSlots.add(slot)
+        setattr(self.viewClass, slot, self.columnProperty(slot))
+
+    def nbytes(self):
+        """return the number of bytes used by the arrays (the content of the object columns is not included)"""
+        return sum(column.nbytes for column in self.columns.values())
+
+class AgentViews(collections.abc.Mapping):
+    """
+        dictionary like object (key: agentId, value: AgentView) used in place of the dictionary of Agents objects,
+        the views are made on demand, so there's no per agent object kept in memory
+    """
+    def __init__(self, store):
+        self.store = store
+        self.viewClass = store.viewClass
+
+    def __getstate__(self):
+        return {"store": self.store}
+
+    def __setstate__(self, state):
+        # the copied store has its own AgentView class
+        self.__init__(state["store"])
+
+    def __getitem__(self, agentId):
+        if not 0 <= agentId < self.store.size:
+            raise KeyError(agentId)
+        return self.viewClass(agentId)
+
+    def __iter__(self):
+        return iter(range(self.store.size))
+
+    def __len__(self):
+        return self.store.size
+
+def agentStoreFactory(agent_df, slotVal, stateNames=()):
+    """
+        same as agentFactory, but the agents are stored in an AgentStore, returns a dictionary like object of AgentView
+
+        Parameters:
+        - agent_df: a panda dataframe with each row corresponding to an agent's initial value
+        - slotVal: the column values of the dataframe
+        - stateNames: the names of the states
+    """
+    return AgentViews(AgentStore(agent_df, slotVal, stateNames))
 
 def roomFactory(room_df, slotVal):
     """
@@ -313,15 +830,29 @@ def roomFactory(room_df, slotVal):
         - slotVal: the column values of the dataframe
     """
     class Partitions:
-        __slots__ = slotVal
+        # infectiousness is the sum of the contribution of the agents inside, infectiousCount the number of agents with a contribution,
+        # both are only kept up to date when the model uses the incremental infection kernel
+        __slots__ = tuple(slotVal) + ("infectiousness", "infectiousCount")
         def __init__(self, roomParam):
             for slot, value in zip(self.__slots__, roomParam):
                 self.__setattr__(slot, value)
+            self.infectiousness, self.infectiousCount = 0, 0
 
-        def enter(self, agentId):
-            """ a put the id of the agent that entered the room"""
+        def enter(self, agentId, contribution=0):
+            """ a put the id of the agent that entered the room, return False if the room was full and the agent was not added"""
             if self.checkCapacity():
                 self.agentsInside.add(agentId)
+                self.changeContribution(0, contribution)
+                return True
+            return False
+
+        def changeContribution(self, previousContribution, contribution):
+            """ update infectiousness when the contribution of an agent inside the room changes"""
+            if previousContribution == contribution:
+                return
+            self.infectiousCount += bool(contribution) - bool(previousContribution)
+            # reset to exactly 0 so that floating point leftovers don't keep an empty room infectious
+            self.infectiousness = self.infectiousness - previousContribution + contribution if self.infectiousCount > 0 else 0
 
         def checkCapacity(self):
             """return a boolean, return True if theres capacity for one more agent, False if the room is at max capacity 
@@ -331,15 +862,13 @@ def roomFactory(room_df, slotVal):
                 return True
             return False
     
-        def leave(self, agentId):
+        def leave(self, agentId, contribution=0):
             """ remove the id of the agent that exited the room"""
             if agentId in self.agentsInside:
                 self.agentsInside.discard(agentId)
+                self.changeContribution(contribution, 0)
         
-    tempDict = dict()
-    for index, row in room_df.iterrows():
-        tempDict[index] = Partitions(row.values.tolist())
-    return tempDict
+    return objectsFromDf(room_df, Partitions)
     
 def superStrucFactory(struc_df, slotVal):
     """
@@ -355,11 +884,321 @@ def superStrucFactory(struc_df, slotVal):
             for slot, value in zip(self.__slots__, strucParam):
                 self.__setattr__(slot, value)
 
-    temp_dict = dict()
-    for index, row in struc_df.iterrows():
-        temp_dict[index] = Superstructure(row.values.tolist())
-    return temp_dict
+    return objectsFromDf(struc_df, Superstructure)
  
+class RoomGraph:
+    """
+        the room graph in compressed sparse row form, the edges of room i are at the positions offsets[i] to offsets[i+1] of neighbors and travelTimes,
+        in the order they were added. the arrays are indexed by room id (index 0 is unused because room ids start at 1)
+    """
+    def __init__(self, sources, neighbors, travelTimes, size):
+        """
+            Parameters:
+            - sources, neighbors, travelTimes: int arrays, one entry per edge (source room Id, neighbor room Id, travel time)
+            - size: the length of the room arrays (largest room Id + 1)
+        """
+        order = np.argsort(sources, kind="stable")
+        self.offsets = np.zeros(size+1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=self.offsets[1:])
+        self.neighbors = np.asarray(neighbors, dtype=np.int64)[order]
+        self.travelTimes = np.asarray(travelTimes)[order]
+
+    def neighborsOf(self, roomId):
+        """return the room Ids connected to the room"""
+        return self.neighbors[self.offsets[roomId]:self.offsets[roomId+1]]
+
+    def toDict(self):
+        """return the adjacency dictionary (key: roomId, value: list of (roomId, travel time)) of the rooms with at least one edge"""
+        neighbors, travelTimes, offsets = self.neighbors.tolist(), self.travelTimes.tolist(), self.offsets.tolist()
+        return dict((roomId, list(zip(neighbors[start:end], travelTimes[start:end])))
+                    for roomId, (start, end) in enumerate(zip(offsets, offsets[1:])) if end > start)
+
+class RouteTable:
+    """
+        precomputed routes for the room graph made by makeAdjacencyDict.
+        the graph is a hub and spoke graph, every leaf is connected to the hub of its building and the building hubs are connected to the transit hub,
+        so the route between two rooms only depends on the hubs of the two rooms and one entry per room is enough to store every route: 
+        - same room: no move
+        - same building: leaf --> building hub --> leaf (2 moves)
+        - different buildings: leaf --> building hub --> transit hub --> building hub --> leaf (4 moves)
+        the "hub" of a room is the first room in its adjacency list, the same rule the agents always used to find their path,
+        for a building hub or the transit hub that's one of its leaves, so a route starting or ending on a hub
+        still takes 2 or 4 moves, isn't the shortest path and can skip an edge (e.g. building hub --> leaf --> transit hub --> leaf --> building hub)
+    """
+    def __init__(self, adjDict, transitId):
+        """
+            Parameters:
+            - adjDict: the adjacency dictionary, (key: roomId, value: list of (roomId, travel time) of the rooms connected to the key)
+            - transitId: the room Id of the transit hub
+        """
+        size = max(adjDict.keys()) + 1
+        self.transit = transitId
+        # the first room in the adjacency list, for a leaf it's the hub of its building
+        self.hubOf = np.full(size, -1, dtype=np.int32)
+        self.neighbors = [frozenset() for _ in range(size)]
+        for roomId, adjRooms in adjDict.items():
+            self.hubOf[roomId] = adjRooms[0][0]
+            self.neighbors[roomId] = frozenset(adjRoom for adjRoom, _ in adjRooms)
+        self.hubList = self.hubOf.tolist()
+        # roomId*size + adjRoom for every edge, sorted, used by areAdjacent
+        self.size = size
+        self.edgeKeys = np.sort(np.array([roomId*size + adjRoom for roomId, adjRooms in enumerate(self.neighbors) for adjRoom in adjRooms], dtype=np.int64))
+
+    def path(self, source, destination):
+        """
+            return the list of rooms the agent has to go through before reaching the destination, 
+            the list is in reverse order (the next room is at the end) so the agent can pop the rooms as it moves
+        """
+        nextNode, lastNode = self.hubList[source], self.hubList[destination]
+        if source == destination:
+            return []
+        elif nextNode == lastNode: # moving between the same superstructure
+            return [nextNode]
+        else: # required to move across the transit hub
+            return [lastNode, self.transit, nextNode]
+
+    def route(self, source, destination):
+        """return the list of rooms visited from source to destination, both ends included, it's the shortest one when both rooms are leaves"""
+        if source == destination:
+            return [source]
+        return [source] + self.path(source, destination)[::-1] + [destination]
+
+    def isAdjacent(self, roomId, otherId):
+        """return True if there's an edge between the two rooms"""
+        return otherId in self.neighbors[roomId]
+
+    def areAdjacent(self, roomIds, otherIds):
+        """same as isAdjacent for arrays of room Ids, return a boolean array (False where otherIds is negative)"""
+        keys = np.asarray(roomIds, dtype=np.int64)*self.size + otherIds
+        position = np.minimum(np.searchsorted(self.edgeKeys, keys), len(self.edgeKeys)-1)
+        return (self.edgeKeys[position] == keys) & (np.asarray(otherIds) >= 0)
+
+    def hopCount(self, sources, destinations):
+        """
+            return the number of moves made by an agent going from the sources to the destinations (len(route) - 1), 
+            works with ints or numpy arrays, the result is always 0, 2 or 4 (see the class docstring for routes that start or end on a hub)
+
+            Parameters:
+            - sources: the room Id(s) where the agents start
+            - destinations: the room Id(s) where the agents want to go
+        """
+        sources, destinations = np.asarray(sources), np.asarray(destinations)
+        sameHub = self.hubOf[sources] == self.hubOf[destinations]
+        return np.where(sources == destinations, 0, np.where(sameHub, 2, 4))
+
+class CompiledWorld:
+    """
+        small integer codes and boolean arrays for the rooms and the states, built once when the world is created 
+        so that the hot loops do array lookups instead of string comparisons, the names are only kept for I/O and reporting. 
+        the room arrays are indexed by room id (index 0 is unused because room ids start at 1)
+
+        - is_hub: the room is a building hub (its name ends with "_hub")
+        - is_social, is_offcampus: the room's building type is social or offCampus
+        - mask_always: every agent in the room wears a mask, see infectionWithinPopulation
+        - mask_required_for_compliant: only the compliant agents in the room wear a mask
+        - mask_blocks: the mask of a compliant agent blocks the infection in a leaf of the room's building type, see infection
+    """
+    def __init__(self, rooms, stateNames, faceMaskConfig):
+        """
+            Parameters:
+            - rooms: the dictionary of Partitions objects (key: roomId, value: room)
+            - stateNames: list of every state name, the position in the list is the state code
+            - faceMaskConfig: the "FaceMasks" section of the config
+        """
+        self.stateNames = list(stateNames)
+        self.stateCode = dict((stateName, code) for code, stateName in enumerate(self.stateNames))
+        self.buildingTypeNames = sorted(set(room.building_type for room in rooms.values()))
+        self.buildingTypeCode = dict((typeName, code) for code, typeName in enumerate(self.buildingTypeNames))
+        nonCompliantLeaf = set(faceMaskConfig["NonCompliantLeaf"] + faceMaskConfig["NonCompliantBuilding"])
+        compliantZone = set(faceMaskConfig["CompliantHub"])
+        nonCompliantZone = set(faceMaskConfig["NonCompliantBuilding"])
+
+        size = max(rooms.keys()) + 1
+        self.building_type = np.full(size, -1, dtype=np.int8)
+        self.is_hub = np.zeros(size, dtype=bool)
+        typeCodes = np.fromiter((self.buildingTypeCode[room.building_type] for room in rooms.values()), dtype=np.int8, count=len(rooms))
+        roomIds = np.fromiter(rooms.keys(), dtype=np.int64, count=len(rooms))
+        self.building_type[roomIds] = typeCodes
+        self.is_hub[roomIds] = [room.room_name.endswith("_hub") for room in rooms.values()]
+        self.is_social = self.isType(["social"])
+        self.is_offcampus = self.isType(["offCampus"])
+        nonCompliant = self.isType(nonCompliantLeaf)
+        maskedHub = self.is_hub & self.isType(compliantZone)
+        self.mask_always = ~nonCompliant | maskedHub
+        self.mask_required_for_compliant = nonCompliant & ~maskedHub & self.isType(nonCompliantZone)
+        self.mask_blocks = ~nonCompliant
+        # the rooms without a -1 building type, sorted by id
+        self.roomIds = np.sort(roomIds)
+
+    def isType(self, typeNames):
+        """return a boolean array that is True for the rooms with one of the given building types"""
+        codes = [self.buildingTypeCode[typeName] for typeName in typeNames if typeName in self.buildingTypeCode]
+        return np.isin(self.building_type, codes)
+
+class TransitionScheduler:
+    """
+        priority queue of the agents' next state transition, keyed by the first hour at which the agent can change state.
+        an agent has at most one pending transition, scheduling it again replaces the old one (the old heap entry is skipped when popped)
+    """
+    def __init__(self):
+        self.heap = []
+        # key: agentId, value: due time of the pending transition
+        self.dueTime = dict()
+        # list of (time, number of transitions) for each call of popDue, for instrumentation
+        self.firedCount = []
+
+    def __len__(self):
+        return len(self.dueTime)
+
+    def schedule(self, agentId, dueTime=None):
+        """
+            set the time of the next transition of the agent, None cancels the pending transition
+
+            Parameters:
+            - agentId: the agent's key/Id value
+            - dueTime: int, the first hour at which the agent can change state
+        """
+        if dueTime is None:
+            self.dueTime.pop(agentId, None)
+            return
+        self.dueTime[agentId] = dueTime
+        heapq.heappush(self.heap, (dueTime, agentId))
+
+    def popDue(self, time):
+        """return the agentIds whose transition is due at time, sorted by due time then agentId, and remove them from the queue"""
+        due = []
+        while self.heap and self.heap[0][0] <= time:
+            dueTime, agentId = heapq.heappop(self.heap)
+            if self.dueTime.get(agentId) == dueTime:
+                del self.dueTime[agentId]
+                due.append(agentId)
+        self.firedCount.append((time, len(due)))
+        return due
+
+class IdSet(dict):
+    """
+        a set of agent ids (the keys, the values are None) iterated in the order the ids were added, used for the rooms' occupants and state2IdDict.
+        the iteration order of a set depends on its hash table, so a set rebuilt from its saved elements can be iterated in another order,
+        the order of an IdSet only depends on the ids added and removed, so restore and loadWorld make the same sets as the run that saved them
+    """
+    __slots__ = ()
+    def __init__(self, ids=()):
+        super().__init__(zip(ids, itertools.repeat(None)))
+
+    def __repr__(self):
+        return f"IdSet({list(self)})"
+
+    def add(self, agentId):
+        self[agentId] = None
+
+    def discard(self, agentId):
+        self.pop(agentId, None)
+
+def packLists(lists):
+    """return (offsets, values), two int64 arrays that store a list of int lists, list i is values[offsets[i]:offsets[i+1]]"""
+    lengths = np.fromiter((len(entry) for entry in lists), dtype=np.int64, count=len(lists))
+    offsets = np.zeros(len(lists)+1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter(itertools.chain.from_iterable(lists), dtype=np.int64, count=int(offsets[-1]))
+    return offsets, values
+
+# the bit generators that can be chosen with the "BitGenerator" key of the "Engine" section
+BIT_GENERATORS = {
+    "PCG64": np.random.PCG64,
+    "PCG64DXSM": np.random.PCG64DXSM,
+    "Philox": np.random.Philox,
+    "SFC64": np.random.SFC64,
+    "MT19937": np.random.MT19937,
+}
+
+def makeGenerator(seedSequence, bitGenerator="PCG64"):
+    """return a np.random.Generator that uses the named bit generator (see BIT_GENERATORS) seeded with the np.random.SeedSequence"""
+    return np.random.Generator(BIT_GENERATORS[bitGenerator](seedSequence))
+
+# the constants of the Philox4x32-10 function (Salmon et al. 2011, "Parallel random numbers: as easy as 1, 2, 3")
+PHILOX_MULTIPLIERS = (np.uint64(0xD2511F53), np.uint64(0xCD9E8D57))
+PHILOX_KEY_INCREMENTS = (np.uint64(0x9E3779B9), np.uint64(0xBB67AE85))
+
+def philoxUniforms(key, counters):
+    """
+        return uniform random values in [0, 1) made from the counters with the Philox4x32-10 function, 
+        unlike a stream the value of a counter only depends on the key and the counter, so it can be computed in any order
+
+        Parameters:
+        - key: two ints below 2**32
+        - counters: four ints or arrays of ints below 2**32 that are broadcast together, the four words of each counter
+    """
+    # the 32 bit words are kept in uint64 so the 64 bit product of two words doesn't overflow
+    c0, c1, c2, c3 = (np.array(word, dtype=np.uint64) for word in np.broadcast_arrays(*counters))
+    k0, k1 = np.uint64(key[0]), np.uint64(key[1])
+    mask, shift = np.uint64(0xFFFFFFFF), np.uint64(32)
+    for _ in range(10):
+        product0, product1 = PHILOX_MULTIPLIERS[0]*c0, PHILOX_MULTIPLIERS[1]*c2
+        c0, c1, c2, c3 = (product1 >> shift) ^ c1 ^ k0, product1 & mask, (product0 >> shift) ^ c3 ^ k1, product0 & mask
+        k0, k1 = (k0 + PHILOX_KEY_INCREMENTS[0]) & mask, (k1 + PHILOX_KEY_INCREMENTS[1]) & mask
+    # 53 random bits from the first two words, like np.random.Generator.random
+    return ((c0 >> np.uint64(5))*np.uint64(67108864) + (c1 >> np.uint64(6)))/9007199254740992.0
+
+def sequentialInfections(randVec, threshold):
+    """
+        return the positions of the infected candidates with the rule of the infection loop: the candidates are checked in order,
+        candidate j is infected if randVec[index] < threshold[j] and index only moves to the next random value after an infection
+
+        Parameters:
+        - randVec: array of random values, used in order
+        - threshold: array with the infection probability of each candidate, in the order the candidates are checked
+    """
+    infected, start = [], 0
+    while len(infected) < len(randVec) and start < len(threshold):
+        above = np.flatnonzero(threshold[start:] > randVec[len(infected)])
+        if len(above) == 0:
+            break
+        start += int(above[0])
+        infected.append(start)
+        start += 1
+    return np.array(infected, dtype=np.int64)
+
+def unpackLists(offsets, values):
+    """the inverse of packLists, return a list of int lists"""
+    values = values.tolist()
+    return [values[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+def encodeColumn(values):
+    """
+        return (kind, arrays), the column of attribute values as numpy arrays that can be saved as .npy files,
+        kind is "bool", "int", "float", "str" (one array), "npint" (ints some of which are np.int64, the values and which ones are np.int64)
+        or "set", "idset", "list" (the two arrays of packLists, for sets, IdSets and lists of ints),
+        raises a TypeError if the values are not all of one of these kinds
+    """
+    if all(isinstance(value, (bool, np.bool_)) for value in values):
+        return "bool", [np.array(values, dtype=bool)]
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) for value in values):
+        # rng.choice gives np.int64 values, they are kept as they are so the loaded world has the same types
+        isNumpy = np.array([isinstance(value, np.int64) for value in values], dtype=bool)
+        if isNumpy.any():
+            return "npint", [np.array(values, dtype=np.int64), isNumpy]
+        return "int", [np.array(values, dtype=np.int64)]
+    if all(isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)) for value in values):
+        return "float", [np.array(values, dtype=float)]
+    if all(isinstance(value, str) for value in values):
+        return "str", [np.array(values, dtype=str)]
+    for kind, kindType in [("set", set), ("idset", IdSet), ("list", list)]:
+        if all(isinstance(value, kindType) for value in values):
+            return kind, list(packLists(values))
+    raise TypeError(f"can't save a column with the types {sorted(set(type(value).__name__ for value in values))}")
+
+def decodeColumn(kind, arrays):
+    """the inverse of encodeColumn, return the list of values"""
+    if kind == "set":
+        return [set(entry) for entry in unpackLists(*arrays)]
+    if kind == "idset":
+        return [IdSet(entry) for entry in unpackLists(*arrays)]
+    if kind == "list":
+        return unpackLists(*arrays)
+    if kind == "npint":
+        return [np.int64(value) if isNumpy else value for value, isNumpy in zip(arrays[0].tolist(), arrays[1].tolist())]
+    return arrays[0].tolist()
+
 class AgentBasedModel:
     def __init__(self):
         """
@@ -378,6 +1217,29 @@ class AgentBasedModel:
         # rename in the future, used to cache informstion to reduce the number of filtering thats happening in the future run
         self.state2IdDict=dict()
         self.gathering_count = 0
+        self.columnarAgents = False
+        self.infectionKernel = "loop"
+        self.useTransitionScheduler = False
+        self.agentStore = None
+        # room id of the room each agent is inside, -1 if the agent is in no room (the room was full)
+        self.agentRoom = None
+        # True once the rooms' infectiousness is kept up to date, see rebuildInfectiousness
+        self.accumulateInfection = False
+        self.transitionScheduler = None
+        # used to only update the agents that change location, see moverIds
+        self.moveTime, self.lastMoveSlot = None, None
+        self.lastOverrideIds, self.stillMoving = set(), []
+        self.moverSetCache = dict()
+        # copy of the compiled schedules, made when turnOnInterventions changes them, so restore can put them back
+        self.originalSchedules = None
+        # every random value of the model comes from self.rng, see seedRandom
+        self.bitGenerator = "PCG64"
+        self.commonRandomNumbers = False
+        self.seedRandom()
+
+    # the agent attributes saved by snapshot, other than state, motion, destination and path
+    agentIntAttributes = ("lastUpdate", "statePersistance", "currLocation", "arrivalTime")
+    agentBoolAttributes = ("infected", "compliance")
 
     def addKeys(self, tempDict):
         """
@@ -404,6 +1266,87 @@ class AgentBasedModel:
         print("the following interventions are turned on/off:")
         print(f" (Facemask, {self.faceMask_intervention}), (Quarantine, {self.quarantine_intervention}), (Closed,  {self.closedBuilding_intervention}), (Hybrid, {self.hybridClass_intervention}), (Less Social, {self.lessSocial_intervention})")
 
+    def configureEngine(self):
+        """
+            read the optional "Engine" section of the config, the section only changes how the simulation is computed, not what is simulated.
+            a missing section or a missing key keeps the default value
+
+            - ColumnarAgents: if True, the agents are kept in an AgentStore (numpy arrays) instead of one object per agent,
+                the movement, the state transitions and the room sums read the arrays (see columnarMoves), the rest goes through the views,
+                on its own it runs about as fast as the objects, it saves memory and it's needed by the "vectorized" kernel
+            - InfectionKernel: "loop" goes over the rooms one by one, "vectorized" computes every room at once with np.bincount,
+                "incremental" goes over the rooms but keeps the infectiousness of each room up to date as agents move and change state
+                instead of summing it every hour, every kernel gives the same result, "vectorized" needs the AgentStore so it turns on ColumnarAgents,
+                it's the fastest engine (it also only goes over the rooms with an agent due for a state transition)
+            - TransitionScheduler: if True, the state transitions are taken from a TransitionScheduler instead of checking every agent inside a room,
+                unlike the room loop it also changes the state of agents that are not inside a room
+            - BitGenerator: the name of the bit generator of self.rng, one of the keys of BIT_GENERATORS (default "PCG64"),
+                the same seed gives different values with different bit generators
+            - CommonRandomNumbers: if True, the random values of the simulation (infection, state transitions, testing, walkins, gatherings) 
+                come from keyedUniforms instead of self.rng, so with the same seed each agent gets the same values in every scenario
+                and the random values stay in step when the scenarios diverge (the room and hub infection values are keyed by
+                the order they are used in, not by agent), the world and the schedules still come from self.rng
+            - WorldCache: if True, createModel saves the world it makes (see saveWorld) and loads it instead of making it again 
+                when a model is made with the same csv files, world config and seed (only when a seed is given), 
+                the sets of agents in the rooms are rebuilt when the world is loaded, which can change the order they are iterated in,
+                so the runs can differ from the runs without the cache (a model that saves the world loads it back, so it runs like the models that load it)
+        """
+        engineConfig = self.config.get("Engine", dict())
+        self.columnarAgents = engineConfig.get("ColumnarAgents", False)
+        self.infectionKernel = engineConfig.get("InfectionKernel", "loop")
+        if self.infectionKernel not in ("loop", "vectorized", "incremental"):
+            raise ValueError(f"unknown InfectionKernel {self.infectionKernel!r}, expected 'loop', 'vectorized' or 'incremental'")
+        if self.infectionKernel == "vectorized":
+            self.columnarAgents = True
+        self.useTransitionScheduler = engineConfig.get("TransitionScheduler", False)
+        self.bitGenerator = engineConfig.get("BitGenerator", "PCG64")
+        if self.bitGenerator not in BIT_GENERATORS:
+            raise ValueError(f"unknown BitGenerator {self.bitGenerator!r}, expected one of {list(BIT_GENERATORS.keys())}")
+        self.commonRandomNumbers = engineConfig.get("CommonRandomNumbers", False)
+        self.worldCache = engineConfig.get("WorldCache", False)
+
+    def seedRandom(self, seed=None):
+        """
+            make self.rng, the np.random.Generator used for every random value of the model (schedules, infection, testing, ...)
+
+            Parameters:
+            - seed: an int, a np.random.SeedSequence or None for a new random seed, the SeedSequence is kept in self.seedSequence
+        """
+        self.seedSequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = makeGenerator(self.seedSequence, self.bitGenerator)
+        # the key of keyedUniforms
+        self.randomKey = self.seedSequence.generate_state(2, np.uint32).tolist()
+
+    # the purpose codes of keyedUniforms, each random decision of the simulation has its own code so the values of two decisions are independent
+    randomPurposes = dict((purpose, code) for code, purpose in enumerate(
+        ["hub", "room", "transition", "transit", "screening", "falsePositive", "falseNegative", "walkin", "gatheringSize", "gatheringMember", "gathering", "sampling"]))
+
+    def keyedUniforms(self, purpose, ids, draw=0):
+        """
+            return uniform random values in [0, 1) keyed on (id, hour, purpose, draw) with philoxUniforms and self.randomKey,
+            the value for a key is always the same, whatever was drawn before, so two scenarios with the same seed use the same value for the same agent and decision
+
+            Parameters:
+            - purpose: the name of the decision, one of the keys of randomPurposes
+            - ids: an agentId or an array of agentIds (or the index of a group for decisions that aren't about one agent)
+            - draw: int or array, tells apart several values for the same id, purpose and hour, Ex: the 4 calls of hub_infection in an hour
+        """
+        return philoxUniforms(self.randomKey, (ids, self.time, AgentBasedModel.randomPurposes[purpose], draw))
+
+    def agentUniforms(self, purpose, agentIds, draw=0):
+        """
+            return one uniform random value in [0, 1) per agent of agentIds (in the same order), 
+            from self.rng or from keyedUniforms with CommonRandomNumbers
+        """
+        if self.commonRandomNumbers:
+            return self.keyedUniforms(purpose, np.fromiter(agentIds, dtype=np.int64, count=len(agentIds)), draw)
+        return self.rng.random(len(agentIds))
+
+    def keyedChoice(self, purpose, agentIds, size, draw=0):
+        """return size agents of agentIds chosen without replacement, the agents with the smallest keyedUniforms values"""
+        agentIds = np.asarray(agentIds)
+        return agentIds[np.argsort(self.keyedUniforms(purpose, agentIds, draw), kind="stable")[:size]]
+
     def configureDebug(self, debugBool):
         """
             set debug equal to True or False,
@@ -428,15 +1371,9 @@ class AgentBasedModel:
         Expand the dataframe along the counterColumn 
 
         """
-        slotVal = self.agent_df.columns.values.tolist()
-        if counterColumn in slotVal:
-            slotVal.remove(counterColumn)
-        tempList = []
-        for _, row in self.agent_df.iterrows():
-            counter = row[counterColumn]
-            rowCopy = row.drop(counterColumn).to_dict()
-            tempList+=[rowCopy for _ in range(counter)]
-        self.agent_df = pd.DataFrame(tempList) 
+        repeated = self.agent_df.loc[self.agent_df.index.repeat(self.agent_df[counterColumn].astype(int))].drop(columns=counterColumn)
+        # same column types as a dataframe made from a list of rows
+        self.agent_df = repeated.reset_index(drop=True).infer_objects()
 
     def createWorld(self):
         """
@@ -458,11 +1395,28 @@ class AgentBasedModel:
         self.roomNameId = dict((getattr(room, "room_name"), roomId) for roomId, room in self.rooms.items())
         # initialize a transit hub
         self.agent_df["transit"] = self.roomNameId[self.config["World"]["transitName"]]
+        # precompute the routes between rooms, used by the agents when they move
+        self.routes = RouteTable(self.adjacencyDict, self.roomNameId[self.config["World"]["transitName"]])
+        self.compileWorld()
         # add rooms to buildings, because up to this point the rooms and the buildings are separate Objects and we need buildings to store references(IDs) to rooms
         self.addRoomsToBuildings()
-        # create agent object, dict(key: agentId --> value: agent object)
-        self.agents = self.createObject(self.agent_df, agentFactory)
+        self.createAgents()
+
+    def createAgents(self):
+        """create agent object, dict(key: agentId --> value: agent object) from self.agent_df"""
+        if self.columnarAgents:
+            self.agents = self.createObject(self.agent_df, functools.partial(agentStoreFactory, stateNames=self.world.stateNames))
+            self.agentStore = self.agents.store
+        else:
+            self.agents = self.createObject(self.agent_df, agentFactory)
+            self.agentStore = None
         
+    def compileWorld(self):
+        """make the CompiledWorld and the CompiledConfig, call it again when the name or the building type of a room changes"""
+        stateNames = [stateName for stateList in self.config["Agents"]["PossibleStates"].values() for stateName in stateList]
+        self.world = CompiledWorld(self.rooms, stateNames, self.config["FaceMasks"])
+        self.compiledConfig = configCompiler.compileConfig(self.config, self.roomNameId, self.world)
+
     def addAttrToDf(self):
         """
             add columns to dataframe before object creation, mainly because objects in this code use __slots__,
@@ -480,19 +1434,29 @@ class AgentBasedModel:
     
     def makeAdjacencyDict(self):
         """
-            creates an adjacency list implimented with a dictionary
+            creates the room graph (self.roomGraph, a RoomGraph) and returns the adjacency list implimented with a dictionary,
+            every room has an edge to the room named in its "connected_to" column, and the reverse edge if the graph is undirected
 
             Parameters (implicit):
             - room's "connected_to" parameters
         """
-        adjDict = dict()
-        for roomId, row in self.room_df.iterrows():
-            adjRoom = self.room_df.index[self.room_df["room_name"] == row["connected_to"]].tolist()[0]
-            travelTime = row["travel_time"]
-            adjDict[roomId] = adjDict.get(roomId, []) + [(adjRoom, travelTime)]
-            if not self.directedGraph:
-                adjDict[adjRoom] = adjDict.get(adjRoom,[]) + [(roomId, travelTime)]
-        return adjDict
+        roomIds = self.room_df.index.to_numpy()
+        # key: room name, value: room Id, the first room is kept when two rooms have the same name
+        nameId = dict(zip(self.room_df["room_name"].tolist()[::-1], roomIds.tolist()[::-1]))
+        connectedTo = self.room_df["connected_to"].tolist()
+        missingRooms = sorted(set(name for name in connectedTo if name not in nameId))
+        if missingRooms:
+            raise ValueError(f"the rooms {missingRooms} are in the connected_to column but not in the room_name column")
+        adjRooms = np.array([nameId[name] for name in connectedTo], dtype=np.int64)
+        travelTimes = self.room_df["travel_time"].to_numpy()
+        if self.directedGraph:
+            sources, neighbors = roomIds, adjRooms
+        else:
+            # the edge of each row is followed by its reverse edge
+            sources, neighbors = np.column_stack((roomIds, adjRooms)).ravel(), np.column_stack((adjRooms, roomIds)).ravel()
+            travelTimes = np.repeat(travelTimes, 2)
+        self.roomGraph = RoomGraph(sources, neighbors, travelTimes, int(roomIds.max())+1)
+        return self.roomGraph.toDict()
     
     def add_Id_to_Df(self):
         for dfRef, dfEntry in zip([self.agent_df, self.room_df, self.building_df], ["agentId", "roomId", "buildingId"]):
@@ -520,7 +1484,7 @@ class AgentBasedModel:
         for buildingId, building in self.buildings.items():
             building.roomsInside = []   
         for roomId, room in self.rooms.items():
-            self.buildings[self.buildingNameId[room.located_building]].roomsInside = self.buildings[self.buildingNameId[room.located_building]].roomsInside + [roomId] 
+            self.buildings[self.buildingNameId[room.located_building]].roomsInside.append(roomId)
     
     def booleanAssignment(self):
         """
@@ -535,7 +1499,7 @@ class AgentBasedModel:
         if percent > 1: percent/=100
         size = int(len(self.agents) * percent)
         sample = np.concatenate((np.ones(size), np.zeros(len(self.agents)-size)), axis=0)
-        np.random.shuffle(sample)
+        self.rng.shuffle(sample)
         for index, agent in enumerate(self.agents.values()):
             if sample[index]:
                 setattr(agent, attrName,True)
@@ -543,17 +1507,17 @@ class AgentBasedModel:
                 setattr(agent, attrName,False)
 
     def intializeAndConfigureObjects(self):
-        # # build a dictionary, key: state --> value: list of agentIds
-        # initialize state2IdDict
-        for stateList in self.config["Agents"]["PossibleStates"].values():
-            for stateName in stateList:
-                self.state2IdDict[stateName] = set()
+        self.buildWorld()
+        self.initializeStates()
 
+    def buildWorld(self):
+        """
+            the part of the initialization that uses self.rng to make the world: the agents' boolean attributes, where they live and their schedules,
+            everything it changes is saved by saveWorld
+        """
         # initialize agentsInside
         for rooms in self.rooms.values():
-            rooms.agentsInside = set()
-      
-        self.transitionDict = self.config["Infection"]["TransitionTime"]
+            rooms.agentsInside = IdSet()
 
         # make schedules for each agents, outside of pickle for testing and for randomization
         self.booleanAssignment()
@@ -563,10 +1527,21 @@ class AgentBasedModel:
         # put agents in the right position
         
         self.studentFacultySchedule() # have hybrid,closing
+        self.compileSchedules()
+
+    def initializeStates(self):
+        """the part of the initialization that starts the simulation in the world: the states, the masks, the testing groups and the infection kernel"""
+        # # build a dictionary, key: state --> value: list of agentIds
+        # initialize state2IdDict
+        for stateList in self.config["Agents"]["PossibleStates"].values():
+            for stateName in stateList:
+                self.state2IdDict[stateName] = IdSet()
+        self.transitionDict = self.config["Infection"]["TransitionTime"]
         # agents dont change after this so we can get the offCampus students
         self.initialize_infection()
         self.initializeFaceMask()
         self.initializeTestingAndQuarantine()
+        self.initializeInfectionKernel()
 
     def initializeHybridClasses(self):
         onCampusIds = self.getAgents("onCampus", "Agent_type")
@@ -586,9 +1561,9 @@ class AgentBasedModel:
             self.remoteCount = remoteStudentCount + remoteFacultyCount
             if self._debug:
                 print(f"HybridClass in effect, {remoteStudentCount} many agents are re-configured (onCampus --> OffCampus), and {remoteFacultyCount} faculty are remote")
-            self.remoteStudentIds = set(np.random.choice(onCampusIds, size=remoteStudentCount, replace=False))            
-            self.remoteFacultyIds = set(np.random.choice(facultyIds, size=remoteFacultyCount, replace=False))
-            self.remoteOffCampusIds = set(np.random.choice(offCampusIds, size=remoteOffCampusCount, replace=False))
+            self.remoteStudentIds = set(self.rng.choice(onCampusIds, size=remoteStudentCount, replace=False))            
+            self.remoteFacultyIds = set(self.rng.choice(facultyIds, size=remoteFacultyCount, replace=False))
+            self.remoteOffCampusIds = set(self.rng.choice(offCampusIds, size=remoteOffCampusCount, replace=False))
             self.rooms[offCampusLeaf].limit+=self.remoteCount
             self.rooms[offCampusLeaf].capacity+= self.remoteCount
           
@@ -616,7 +1591,7 @@ class AgentBasedModel:
             dorms = self.findMatchingRooms("building_type", "dorm")
             doubleRooms = [roomId for roomId in dorms if self.rooms[roomId].capacity == 2]
             convertCount = min(len(doubleRooms), self.config["HybridClass"]["RemovedDoubleCount"])
-            for roomId in np.random.choice(doubleRooms, size=convertCount, replace=False):
+            for roomId in self.rng.choice(doubleRooms, size=convertCount, replace=False):
                 self.rooms[roomId].capacity = 1
             print("NewCap", sum(self.rooms[roomId].capacity for roomId in dorms))
         dormRoom = self.findMatchingRooms("building_type", "dorm")
@@ -630,12 +1605,12 @@ class AgentBasedModel:
             elif initialLoc in self.buildingNameId.keys(): # if location is under building name
                 # randomly choose rooms from the a building that doesnt end in "_hub" and is empty
                 possibleRooms = [roomId for roomId in self.buildings[self.buildingNameId[initialLoc]].roomsInside 
-                                if not self.rooms[roomId].room_name.endswith("_hub") and self.rooms[roomId].checkCapacity()]
-                location = np.random.choice(possibleRooms)
+                                if not self.world.is_hub[roomId] and self.rooms[roomId].checkCapacity()]
+                location = self.rng.choice(possibleRooms)
                 counter[1]+=1
             elif initialLoc in possibleBType: # if location is under building type
                 possibleRooms = [roomId for roomId in self.findMatchingRooms("building_type", initialLoc) if self.rooms[roomId].checkCapacity()]
-                location = np.random.choice(possibleRooms)
+                location = self.rng.choice(possibleRooms)
                 counter[2]+=1
             else:
                 print("something wrong, possibly there are agents that dont have a valid spawn point, maybe increase capacity for some nodes?")
@@ -669,12 +1644,15 @@ class AgentBasedModel:
             Parameters(might be removed):
             - strType (= False): if the value is a string or not, 
         """
+        isHub = self.world.is_hub
         if attrVal==None: # return rooms without filters
-            return [roomId for roomId, room in self.rooms.items() if not getattr(room, "room_name").endswith("hub")]
+            return [roomId for roomId in self.rooms.keys() if not isHub[roomId]]
+        if partitionAttr == "building_type" and not strType: # compare the codes instead of the strings
+            return self.world.roomIds[(self.world.building_type[self.world.roomIds] == self.world.buildingTypeCode.get(attrVal, -2)) & ~isHub[self.world.roomIds]].tolist()
         if strType: # case insensitive
-            return [roomId for roomId, room in self.rooms.items() if getattr(room, partitionAttr).strip().lower() == attrVal.strip().lower() and not getattr(room, "room_name").endswith("hub")]
+            return [roomId for roomId, room in self.rooms.items() if getattr(room, partitionAttr).strip().lower() == attrVal.strip().lower() and not isHub[roomId]]
         else:
-            return [roomId for roomId, room in self.rooms.items() if getattr(room, partitionAttr) == attrVal and not getattr(room, "room_name").endswith("hub")]
+            return [roomId for roomId, room in self.rooms.items() if getattr(room, partitionAttr) == attrVal and not isHub[roomId]]
 
     def startRoomLog(self):
         """
@@ -734,7 +1712,7 @@ class AgentBasedModel:
 
         if len(onCampusIds) < seedNumber:
             print("not enough agents to satisfy initial # of seed, taking the minimum")
-        infectedAgentIds = np.random.choice(onCampusIds,size=min(len(onCampusIds), seedNumber), replace=False)
+        infectedAgentIds = self.rng.choice(onCampusIds,size=min(len(onCampusIds), seedNumber), replace=False)
         for agentId in infectedAgentIds:
             self.changeStateDict(agentId, "susceptible",seedState)
         debugTempDict = dict()
@@ -755,9 +1733,10 @@ class AgentBasedModel:
         self.compliantZone = set(self.config["FaceMasks"]["CompliantHub"])
         self.nonCompliantZone = set(self.config["FaceMasks"]["NonCompliantBuilding"])
         
+        # the agents given a 0 don't comply, so complianceRatio is the fraction of the agents that don't comply
         maskNumber = int(self.config["World"]["complianceRatio"]*len(self.agents))
         maskVec = np.concatenate((np.zeros(maskNumber),np.ones(len(self.agents)-maskNumber)))
-        np.random.shuffle(maskVec)
+        self.rng.shuffle(maskVec)
         for i, agent in enumerate(self.agents.values()):
             if maskVec[i] > 0:
                 agent.compliance = True
@@ -779,12 +1758,85 @@ class AgentBasedModel:
             
             self.groupIds = []
             while len(totalIds) > 0:
-                sampledIds = np.random.choice(list(totalIds), size=min(len(totalIds), self.config["Quarantine"]["BatchSize"]),replace=False)
+                sampledIds = self.rng.choice(list(totalIds), size=min(len(totalIds), self.config["Quarantine"]["BatchSize"]),replace=False)
                 totalIds -= set(sampledIds)
                 self.groupIds.append(list(sampledIds))
       
             self.quarantineGroupNumber, self.quarantineGroupIndex = len(self.groupIds), 0
 
+    def initializeInfectionKernel(self):
+        """
+            build agentRoom from the rooms and the per room arrays used by vectorizedInfection,
+            the arrays are indexed by room id (index 0 is unused because room ids start at 1)
+        """
+        self.agentRoom = np.full(len(self.agents), -1, dtype=np.int32)
+        for roomId, room in self.rooms.items():
+            for agentId in room.agentsInside:
+                self.agentRoom[agentId] = roomId
+        world = self.world
+        self.roomKv, self.roomLimit = np.zeros(len(world.is_hub)), np.ones(len(world.is_hub))
+        for roomId, room in self.rooms.items():
+            self.roomKv[roomId], self.roomLimit[roomId] = room.Kv, room.limit
+        # the hubs checked by hub_infection, in the same order as self.rooms
+        self.infectionHubIds = [roomId for roomId in self.rooms.keys() if world.is_hub[roomId] and not world.is_offcampus[roomId]]
+        self.stateContribution = None
+        if self.infectionKernel == "incremental":
+            self.rebuildInfectiousness()
+        if self.useTransitionScheduler:
+            self.transitionScheduler = TransitionScheduler()
+            for agentId in self.agents.keys():
+                self.scheduleTransition(agentId)
+
+    def rebuildInfectiousness(self):
+        """
+            sum the infectiousness of every room from scratch and keep it up to date from now on,
+            call it again after changing something that changes the contribution of agents other than their state or location (Ex: compliance)
+        """
+        self.accumulateInfection = True
+        for roomId, room in self.rooms.items():
+            room.infectiousness, room.infectiousCount = 0, 0
+            for agentId in room.agentsInside:
+                room.changeContribution(0, self.agentContribution(agentId, roomId))
+
+    def agentContribution(self, agentId, roomId):
+        """
+            return the contribution of an agent to the infectiousness of the room with roomId, 
+            always 0 if the rooms' infectiousness is not kept up to date
+        """
+        if not self.accumulateInfection:
+            return 0
+        if self.agentStore is None and self.agents[agentId].state not in self.compiledConfig.contributionByState:
+            return 0
+        return self.infectionWithinPopulation((agentId,), roomId)
+
+    def columnarContributions(self, agentIds, roomIds):
+        """
+            return an array with agentContribution(agentId, roomId) for each pair of agentIds and roomIds, computed with the columns of the AgentStore
+
+            Parameters:
+            - agentIds, roomIds: arrays of the same length
+        """
+        columns = self.agentStore.columns
+        contribution = self.contributionByCode()[columns["state"][agentIds]]
+        if self.R0Calculation:
+            contribution = contribution * np.isin(agentIds, self.R0_agentIds)
+        if self.faceMask_intervention: # the mask rules of the room, see infectionWithinPopulation
+            masked = self.world.mask_always[roomIds] | (self.world.mask_required_for_compliant[roomIds] & columns["compliance"][agentIds])
+            contribution = np.where(masked, contribution*self.maskP, contribution)
+        return contribution
+
+    def contributionByCode(self):
+        """
+            return an array with the contribution of each state code of the AgentStore,
+            the array is rebuilt when the store learns a new state name
+        """
+        stateNames = self.agentStore.codeNames["state"]
+        if self.stateContribution is None or len(self.stateContribution) != len(stateNames):
+            # the codes after the compiled states are names that are not in PossibleStates, they don't contribute
+            contribution = self.compiledConfig.contribution
+            self.stateContribution = np.concatenate((contribution, np.zeros(len(stateNames) - len(contribution))))
+        return self.stateContribution
+
     def initializeClosingBuilding(self):
         """
         "ClosedBuilding_LeafKv=0" : [],
@@ -806,10 +1858,31 @@ class AgentBasedModel:
         self.e_homeP = self.config["ClosingBuildings"]["Exception_GoingHomeP"]
         return closedBuilding, semiClosedBuilding
 
+    def closedBuildingChanges(self, closed, semiClosed, students):
+        """
+            return (goingHome, toSocial), boolean arrays that tell which schedule entries are replaced by the agent's home and by their social space
+            when the buildings of "ClosingBuildings" close, used by studentFacultySchedule and turnOnInterventions: 
+            the students go home with probability GoingHomeP instead of a closed building and otherwise go to their social space, 
+            they go home with probability GoingHomeP instead of a semi closed building and otherwise stay, the faculty go home instead of a closed building.
+            one random value is drawn for each student entry in a closed or semi closed building, in the order of the entries
+
+            Parameters:
+            - closed, semiClosed: boolean arrays, True for the entries in a closed (semi closed) building, an entry in both is closed
+            - students: boolean array of the same shape, True for the entries of students
+        """
+        drawn = students & (closed | semiClosed)
+        goingHome = np.zeros(closed.shape, dtype=bool)
+        goingHome[drawn] = self.rng.random(np.count_nonzero(drawn)) < self.homeP
+        toSocial = closed & students & ~goingHome
+        goingHome |= closed & ~students
+        return goingHome, toSocial
+
     def getAgentsInGroup(self, agentIds, attrVal, attrName="state"):
         return [agentId for agentId in agentIds if getattr(self.agents[agentId], attrName) == attrVal]
 
     def getAgents(self, attrVal, attrName="state"):
+        if self.agentStore is not None:
+            return self.agentStore.match(attrName, attrVal).tolist()
         return [agentId for agentId, agent in self.agents.items() if getattr(agent, attrName) == attrVal]
 
     def countAgentsInGroup(self, agentIds, attrVal, attrName="state"):
@@ -828,11 +1901,26 @@ class AgentBasedModel:
             - previousState: the state of the agent, better to be a parameter because checks occurs before the function is called
             - newState: the state name to transition into
         """
+        roomId = int(self.agentRoom[agentId]) if self.accumulateInfection else -1
+        if roomId >= 0:
+            previousContribution = self.agentContribution(agentId, roomId)
         self.state2IdDict[previousState].discard(agentId)# remove the agent from the state list
         if previousState == "quarantined" and not self.agents[agentId].infected:
             self.state2IdDict["falsePositive"].discard(agentId)
         self.state2IdDict[newState].add(agentId)# then add them to the new state list
         self.agents[agentId].changeState(self.time, newState, self.transitionDict[newState])
+        if roomId >= 0:
+            self.rooms[roomId].changeContribution(previousContribution, self.agentContribution(agentId, roomId))
+        if self.transitionScheduler is not None:
+            self.scheduleTransition(agentId)
+
+    def scheduleTransition(self, agentId):
+        """put the next state transition of the agent in transitionScheduler, the agent changes state at the first hour after transitionTime()"""
+        agent = self.agents[agentId]
+        if agent.state == "quarantined" or (agent.state != "susceptible" and self.transitionDict[agent.state] > 0):
+            self.transitionScheduler.schedule(agentId, agent.transitionTime() + 1)
+        else:
+            self.transitionScheduler.schedule(agentId)
     
 
      # takes 4 seconds
@@ -869,8 +1957,8 @@ class AgentBasedModel:
         if self.lessSocial_intervention:
             socialP *= self.config["LessSocializing"]["SocializingProbability"]
             print("social p", socialP)
-        schedules, onVsOffCampus = schedule_students.scheduleCreator(socialP)
-        fac_schedule, randomizedFac = schedule_faculty.scheduleCreator()
+        schedules, onVsOffCampus = schedule_students.scheduleCreator(socialP, self.rng)
+        fac_schedule, randomizedFac = schedule_faculty.scheduleCreator(self.rng)
         classrooms = self.findMatchingRooms("building_type", "classroom")
         stem = self.findMatchingRooms("located_building", "STEM_office")
         art = self.findMatchingRooms("located_building", "HUM_office")
@@ -878,38 +1966,30 @@ class AgentBasedModel:
         if self.closedBuilding_intervention:
             closedBuilding, semiClosed = self.initializeClosingBuilding()
             closedBuilding, semiClosed = set(closedBuilding), set(semiClosed)
-            
-
-            for index, schedule in enumerate(schedules):
-                for i, row in enumerate(schedule):
-                    for j, item in enumerate(row):
-                        if item in closedBuilding:
-                            if random.random() < self.homeP:
-                                schedules[index][i][j] = "sleep"
-                            else:
-                                schedules[index][i][j] = "social"
-                        elif item in semiClosed:
-                            if random.random() < self.homeP:
-                                schedules[index][i][j] = "sleep" 
-            #schedules = [
-            #    [[item if item not in closedBuilding else ("sleep" if random.random() < self.homeP else "social") for item in row]
-            #     for row in uniqueSchedule] for uniqueSchedule in schedules]# ("sleep" if random.random() < 0.5 else "social")
-            fac_schedule = [
-                [[item if item not in closedBuilding else "Off" for item in row] for row in uniqueSchedule] 
-                    for uniqueSchedule in fac_schedule]
+            # the entries of the students and then of the faculty, in the order of the schedules
+            rows = [row for schedule in schedules for row in schedule] + [row for schedule in fac_schedule for row in schedule]
+            entries = [(row, j, item) for row in rows for j, item in enumerate(row)]
+            studentEntries = sum(len(row) for schedule in schedules for row in schedule)
+            goingHome, toSocial = self.closedBuildingChanges(np.array([item in closedBuilding for _, _, item in entries], dtype=bool), 
+                np.array([item in semiClosed for _, _, item in entries], dtype=bool), np.arange(len(entries)) < studentEntries)
+            for index in np.flatnonzero(goingHome | toSocial).tolist():
+                row, j, _ = entries[index]
+                # "sleep" is the student's dorm or home, "Off" the faculty's home
+                row[j] = "social" if toSocial[index] else ("sleep" if index < studentEntries else "Off")
         
         
         # assign one dining room as faculty only
         facultyDiningRoom = self.findMatchingRooms("building_type", "dining")[0]
         self.rooms[facultyDiningRoom].room_name = "faculty_dining_room"
         self.rooms[facultyDiningRoom].building_type = "faculty_dining_room"
+        self.compileWorld()
         
         # sample faculty schedule ["Off", "Off", "dining", 45, "Off", ...]
         offCampusScheduleTemplate = [[offCampusLeaf for _ in range(24)] for _ in range(3)]
         for index, (facSche, randFac) in enumerate(zip(fac_schedule, randomizedFac)):
             replacement = stem if randFac == "S" else (art if randFac == "A" else hum)
             
-            favoriteOffice = np.random.choice(replacement)
+            favoriteOffice = self.rng.choice(replacement)
             
             for i, row in enumerate(facSche):
                 for j, item in enumerate(row):
@@ -977,6 +2057,65 @@ class AgentBasedModel:
                 print(self.convertScheduleToRoomName(agent.schedule[:2]))
         """
         
+    def compileSchedules(self):
+        """
+            pack the schedules of all agents into one (number of agents, 3, 24) int32 array of room ids, self.scheduleTensor,
+            and replace each agent's schedule with a view of its row.
+            raises a ValueError if an entry that isn't a room Id (ex: "social", "dorm", "lirary") is left in a schedule
+        """
+        agentCount = len(self.agents)
+        self.scheduleTensor = np.zeros((agentCount, 3, 24), dtype=np.int32)
+        unresolved = dict()
+        for agentId, agent in self.agents.items():
+            for i, row in enumerate(agent.schedule):
+                for j, item in enumerate(row):
+                    if isinstance(item, (int, np.integer)) and not isinstance(item, bool) and item in self.rooms:
+                        self.scheduleTensor[agentId, i, j] = item
+                    else:
+                        unresolved.setdefault(repr(item), []).append(agentId)
+        if unresolved:
+            summary = ", ".join(f"{item} ({len(agentIds)} entries, ex: agent {agentIds[0]})" for item, agentIds in unresolved.items())
+            raise ValueError(f"the schedules have entries that are not room Ids: {summary}")
+        self.attachSchedules()
+        if self._debug:
+            print(f"compiled the schedules into a {self.scheduleTensor.shape} array, {self.scheduleTensor.nbytes} bytes")
+
+    def attachSchedules(self):
+        """replace each agent's schedule with a view of its row of self.scheduleTensor and set self.homeLocations"""
+        if self.agentStore is not None:
+            self.agentStore.attachColumn("schedule", self.scheduleTensor)
+        else:
+            for agentId, agent in self.agents.items():
+                agent.schedule = self.scheduleTensor[agentId]
+        self.homeLocations = np.array([agent.initial_location for agent in self.agents.values()], dtype=np.int32)
+
+    def scheduleColumn(self, currTime):
+        """return the row of the schedule used at currTime, 0: even day, 1: odd day, 2: weekend, same rule as checkschedule"""
+        dayOfWeek = (currTime%(24*7))//24
+        if dayOfWeek > 3: # its a weekend
+            return 2
+        return dayOfWeek & 1
+
+    def scheduledDestinations(self, currTime, agentIds=None):
+        """
+            return the room Ids where the agents wants to be at currTime, equivalent to calling checkschedule on every agent
+
+            Parameters:
+            - currTime: the current time
+            - agentIds: array of agent Ids, if None, all agents
+        """
+        if agentIds is None:
+            agentIds = np.arange(len(self.agents))
+        else:
+            agentIds = np.asarray(agentIds, dtype=np.int64)
+        destinations = self.scheduleTensor[agentIds, self.scheduleColumn(currTime), currTime%24]
+        # quarantined and severely sick agents stay in their initial location
+        atHome = np.isin(agentIds, list(self.state2IdDict["quarantined"]))
+        severe = [agentId for agentId in self.state2IdDict["infected Symptomatic Severe"] if currTime > self.agents[agentId].lastUpdate+120]
+        atHome |= np.isin(agentIds, severe)
+        destinations[atHome] = self.homeLocations[agentIds[atHome]]
+        return destinations
+
     def replaceScheduleEntry(self, antecedent):
         """
             replace locations with each agent's initial location
@@ -990,7 +2129,7 @@ class AgentBasedModel:
     def replacewithTwo(self, agentIds):
         socialSpace = self.findMatchingRooms("building_type", "social")
         for index, agentId in enumerate(agentIds):
-            twoFriendGroup = np.random.choice(socialSpace, size=2, replace=False)
+            twoFriendGroup = self.rng.choice(socialSpace, size=2, replace=False)
             for i, row in enumerate(self.agents[agentId].schedule):
                 for j, item in enumerate(row):
                     if item == "social":
@@ -1018,7 +2157,7 @@ class AgentBasedModel:
             roomIds = self.findMatchingRooms("building_type", partitionTypes)
            
             if not perEntry:
-                randomVec = np.random.choice(roomIds, size=len(filteredId), replace=True)
+                randomVec = self.rng.choice(roomIds, size=len(filteredId), replace=True)
             for agentId in filteredId:
                 for i, row in enumerate(self.agents[agentId].schedule):
                     for j, item in enumerate(row):
@@ -1026,7 +2165,7 @@ class AgentBasedModel:
                             if not perEntry:
                                 self.agents[agentId].schedule[i][j] = randomVec[index]
                             else:
-                                self.agents[agentId].schedule[i][j] = np.random.choice(roomIds)
+                                self.agents[agentId].schedule[i][j] = self.rng.choice(roomIds)
                 index +=1
         else: # if a list of values is passed
             def indexVal(listObj, obj):
@@ -1043,7 +2182,7 @@ class AgentBasedModel:
             
             randRoomIds = []
             for idList in partitionIds:
-                randRoomIds.append(np.random.choice(idList, size=agentCount, replace=True))
+                randRoomIds.append(self.rng.choice(idList, size=agentCount, replace=True))
 
             for agentId in filteredId:
                 for i, row in enumerate(self.agents[agentId].schedule):
@@ -1067,16 +2206,16 @@ class AgentBasedModel:
                     if self._debug:
                         print(f"at time {self.time} lazy sunday, no one is moving")
                 else:
-                    for _ in range(4):
-                        self.updateAgent()
-                        self.hub_infection()
+                    for step in range(4):
+                        self.updateAgent(step)
+                        self.hub_infection(step)
                 self.infection()
            
             # if weekdays
             if self.dateDescriptor != "W" and self.dateDescriptor!="LS":
                 if modTime == 8:
                     self.checkForWalkIn()
-                if self.quarantine_intervention and self.time%self.quarantineInterval == self.config["Quarantine"]["offset"]: 
+                if self.quarantine_intervention and self.time%self.quarantineInterval == self.compiledConfig.quarantineOffset: 
                     self.testForDisease()
                 self.delayed_quarantine()
             # its a weekend and sunday midnight
@@ -1120,6 +2259,319 @@ class AgentBasedModel:
         print(f"# infected: {counter}, initial: {self.config['Infection']['SeedNumber']}, Ave R0: {(counter - self.config['Infection']['SeedNumber'])/self.config['Infection']['SeedNumber']}")
         return (counter - self.config["Infection"]["SeedNumber"])/self.config["Infection"]["SeedNumber"]
     
+    def snapshot(self):
+        """
+            return the state of the simulation as compact arrays, restore(snapshot) puts the model back in that state.
+            only what changes during a simulation is in the snapshot (the agents' states and locations, the rooms' occupants and counters, the clock, 
+            the quarantine queues and the stored time series), the world, the schedules, the routes, the config and the dataframes are shared, 
+            so a snapshot can only be restored into the model it was taken from.
+
+            the snapshot is a dictionary with two keys, 
+            "arrays": dictionary of numpy arrays and "values": dictionary of python values (ints, strings, lists) that can be saved as json
+        """
+        agents = [self.agents[agentId] for agentId in range(len(self.agents))]
+        stateCode, stateNames = self.world.stateCode, self.world.stateNames
+        arrays, values = dict(), dict()
+        arrays["agentState"] = np.array([stateCode[agent.state] for agent in agents], dtype=np.int8)
+        for attrName in AgentBasedModel.agentIntAttributes:
+            arrays["agent_"+attrName] = np.array([getattr(agent, attrName) for agent in agents], dtype=np.int64)
+        for attrName in AgentBasedModel.agentBoolAttributes:
+            arrays["agent_"+attrName] = np.array([getattr(agent, attrName) for agent in agents], dtype=bool)
+        arrays["agentMoving"] = np.array([agent.motion == "moving" for agent in agents], dtype=bool)
+        arrays["agentDestination"] = np.array([-1 if agent.destination is None else agent.destination for agent in agents], dtype=np.int64)
+        # path is 0 until the agent's first move, it is only read after updateLoc sets it so it's saved as an empty path
+        arrays["agentPathOffsets"], arrays["agentPath"] = packLists([agent.path or [] for agent in agents])
+        
+        rooms = list(self.rooms.values())
+        arrays["roomIds"] = np.fromiter(self.rooms.keys(), dtype=np.int64, count=len(rooms))
+        arrays["roomInfectedNumber"] = np.array([room.infectedNumber for room in rooms], dtype=np.int64)
+        arrays["roomHubCount"] = np.array([room.hubCount for room in rooms], dtype=np.int64)
+        arrays["roomInfectiousness"] = np.array([room.infectiousness for room in rooms], dtype=float)
+        arrays["roomInfectiousCount"] = np.array([room.infectiousCount for room in rooms], dtype=np.int64)
+        # the IdSets are stored in their iteration order, so the restored ones are iterated in the same order
+        arrays["roomAgentsOffsets"], arrays["roomAgents"] = packLists([room.agentsInside for room in rooms])
+        arrays["stateAgentsOffsets"], arrays["stateAgents"] = packLists([self.state2IdDict[stateName] for stateName in stateNames])
+        arrays["agentRoom"] = self.agentRoom.copy()
+        arrays["roomKv"] = np.array([room.Kv for room in rooms], dtype=float)
+        if self.originalSchedules is not None:
+            arrays["scheduleTensor"] = self.scheduleTensor.copy()
+
+        values["time"], values["date"], values["dateDescriptor"] = self.time, self.date, self.dateDescriptor
+        values["R0Calculation"], values["gathering_count"] = self.R0Calculation, self.gathering_count
+        values["quarantineGroupIndex"] = getattr(self, "quarantineGroupIndex", 0)
+        values["falsePositiveList"] = [list(map(int, group)) for group in self.falsePositiveList]
+        values["quarantineList"] = [list(map(int, group)) for group in self.quarantineList]
+        values["screeningTime"] = list(self.screeningTime)
+        values["moveTime"], values["lastMoveSlot"] = self.moveTime, self.lastMoveSlot
+        values["lastOverrideIds"], values["stillMoving"] = list(self.lastOverrideIds), list(self.stillMoving)
+        values["room_cap_log"] = [[roomId, list(log)] for roomId, log in self.room_cap_log.items()]
+        values["interventions"] = [self.faceMask_intervention, self.quarantine_intervention, self.closedBuilding_intervention, self.walkIn]
+        values["storeVal"] = self.storeVal
+        if self.storeVal:
+            values["timeIncrement"] = self.timeIncrement
+            values["parameters"] = dict((stateName, list(series)) for stateName, series in self.parameters.items())
+            values["timeSeries"] = list(self.timeSeries)
+        if self.transitionScheduler is not None:
+            values["transitionHeap"] = [list(entry) for entry in self.transitionScheduler.heap]
+            values["transitionDueTime"] = [[agentId, dueTime] for agentId, dueTime in self.transitionScheduler.dueTime.items()]
+            values["transitionFiredCount"] = [list(entry) for entry in self.transitionScheduler.firedCount]
+        return {"arrays": arrays, "values": values}
+
+    def restore(self, snapshot):
+        """
+            put the model back in the state saved by snapshot, the snapshot is not modified so it can be restored many times
+
+            Parameters:
+            - snapshot: the dictionary returned by snapshot() on this model
+        """
+        arrays, values = snapshot["arrays"], snapshot["values"]
+        stateNames = self.world.stateNames
+        agents = [self.agents[agentId] for agentId in range(len(self.agents))]
+        columns = dict((attrName, arrays["agent_"+attrName].tolist()) for attrName in AgentBasedModel.agentIntAttributes + AgentBasedModel.agentBoolAttributes)
+        states = [stateNames[code] for code in arrays["agentState"].tolist()]
+        motions = ["moving" if moving else "stationary" for moving in arrays["agentMoving"].tolist()]
+        destinations = [None if destination == -1 else destination for destination in arrays["agentDestination"].tolist()]
+        paths = unpackLists(arrays["agentPathOffsets"], arrays["agentPath"])
+        for agentId, agent in enumerate(agents):
+            for attrName, column in columns.items():
+                setattr(agent, attrName, column[agentId])
+            agent.state, agent.motion, agent.destination, agent.path = states[agentId], motions[agentId], destinations[agentId], paths[agentId]
+
+        occupants = unpackLists(arrays["roomAgentsOffsets"], arrays["roomAgents"])
+        for index, roomId in enumerate(arrays["roomIds"].tolist()):
+            room = self.rooms[roomId]
+            room.agentsInside = IdSet(occupants[index])
+            room.infectedNumber, room.hubCount = int(arrays["roomInfectedNumber"][index]), int(arrays["roomHubCount"][index])
+            room.infectiousness, room.infectiousCount = float(arrays["roomInfectiousness"][index]), int(arrays["roomInfectiousCount"][index])
+            room.Kv = self.roomKv[roomId] = float(arrays["roomKv"][index])
+        self.state2IdDict = dict((stateName, IdSet(agentIds)) for stateName, agentIds in zip(stateNames, unpackLists(arrays["stateAgentsOffsets"], arrays["stateAgents"])))
+        self.agentRoom = arrays["agentRoom"].copy()
+        if "scheduleTensor" in arrays or self.originalSchedules is not None:
+            # the schedules were changed by turnOnInterventions before or after the snapshot, the agents' schedules are views so the array is written in place
+            self.scheduleTensor[...] = arrays.get("scheduleTensor", self.originalSchedules)
+            self.moverSetCache = dict()
+
+        self.time, self.date, self.dateDescriptor = values["time"], values["date"], values["dateDescriptor"]
+        self.R0Calculation, self.gathering_count = values["R0Calculation"], values["gathering_count"]
+        self.quarantineGroupIndex = values["quarantineGroupIndex"]
+        self.falsePositiveList = [list(group) for group in values["falsePositiveList"]]
+        self.quarantineList = [list(group) for group in values["quarantineList"]]
+        self.screeningTime = list(values["screeningTime"])
+        self.moveTime = values["moveTime"]
+        self.lastMoveSlot = None if values["lastMoveSlot"] is None else tuple(values["lastMoveSlot"])
+        self.lastOverrideIds, self.stillMoving = set(values["lastOverrideIds"]), list(values["stillMoving"])
+        self.faceMask_intervention, self.quarantine_intervention, self.closedBuilding_intervention, self.walkIn = values["interventions"]
+        self.room_cap_log = dict((roomId, list(log)) for roomId, log in values["room_cap_log"])
+        self.storeVal = values["storeVal"]
+        if self.storeVal:
+            self.timeIncrement = values["timeIncrement"]
+            self.parameters = dict((stateName, list(series)) for stateName, series in values["parameters"].items())
+            self.timeSeries = list(values["timeSeries"])
+        if self.transitionScheduler is not None:
+            self.transitionScheduler.heap = [tuple(entry) for entry in values["transitionHeap"]]
+            self.transitionScheduler.dueTime = dict((agentId, dueTime) for agentId, dueTime in values["transitionDueTime"])
+            self.transitionScheduler.firedCount = [tuple(entry) for entry in values["transitionFiredCount"]]
+
+    # the interventions that turnOnInterventions can turn on in the middle of a run
+    switchableInterventions = ("facemasks", "quarantine", "closingbuildings", "walkin")
+
+    def turnOnInterventions(self, interventionNames):
+        """
+            turn on interventions in the middle of a run (used by branchSimulation), from the next hour the model runs as if they were on.
+            the compliance and the testing groups are assigned when the model is created whether the interventions are on or not, so 
+            "FaceMasks", "Quarantine" and the permitted action "walkin" only turn on the checks done every hour.
+            "ClosingBuildings" changes the compiled schedules like studentFacultySchedule does: the hours students spend in a closed building type 
+            are spent at home with probability GoingHomeP or else in their social space (a random one if they don't have one), 
+            the hours students spend in an Exception_SemiClosedBuilding type are spent at home with probability GoingHomeP, 
+            faculty go home instead of a closed building type (see closedBuildingChanges), and the rooms of ClosedBuildingOpenHub get a Kv of 0.
+            "HybridClasses" and "LessSocial" change who lives where and the schedules themselves, they can only be turned on when the model is created
+
+            Parameters:
+            - interventionNames: list of intervention names (case insensitive), Ex: ["FaceMasks", "Quarantine"]
+        """
+        names = set(name.lower() for name in interventionNames)
+        unknown = names.difference(AgentBasedModel.switchableInterventions)
+        if unknown:
+            raise ValueError(f"the interventions {sorted(unknown)} can't be turned on during a run, expected names in {AgentBasedModel.switchableInterventions}")
+        missing = [f"{sectionName}.{key}" for sectionName, schema in configCompiler.CONFIG_SCHEMA.items() for key, requirement in schema.items() 
+                    if requirement in names and key not in self.config.get(sectionName, dict())]
+        if missing:
+            raise ValueError(f"the config is missing the keys {missing} used by the interventions")
+        self.faceMask_intervention |= "facemasks" in names
+        self.quarantine_intervention |= "quarantine" in names
+        self.walkIn |= "walkin" in names
+        if "closingbuildings" in names and not self.closedBuilding_intervention:
+            self.closedBuilding_intervention = True
+            closedBuilding, semiClosedRooms = self.initializeClosingBuilding()
+            for roomId, room in self.rooms.items():
+                self.roomKv[roomId] = room.Kv
+            if self.originalSchedules is None:
+                self.originalSchedules = self.scheduleTensor.copy()
+            # the faculty dining room was a dining room when studentFacultySchedule closed the buildings
+            closedTypes = closedBuilding + (["faculty_dining_room"] if "dining" in closedBuilding else [])
+            closedRooms = [roomId for bType in closedTypes for roomId in self.findMatchingRooms("building_type", bType)]
+            closed = np.isin(self.scheduleTensor, closedRooms)
+            students = np.array([agent.archetype == "student" for agent in self.agents.values()])
+            goingHome, toSocial = self.closedBuildingChanges(closed, np.isin(self.scheduleTensor, semiClosedRooms), 
+                np.broadcast_to(students[:, None, None], closed.shape))
+            # replacewithTwo gives each student one social space, the first one in the schedule, 
+            # the students that never socialize get a random one like they would in studentFacultySchedule
+            socialRooms = self.findMatchingRooms("building_type", "social")
+            flatSchedules = self.scheduleTensor.reshape(len(self.agents), -1)
+            inSocial = np.isin(flatSchedules, socialRooms)
+            ownSocialSpace = flatSchedules[np.arange(len(self.agents)), inSocial.argmax(axis=1)]
+            socialSpace = np.where(inSocial.any(axis=1), ownSocialSpace, self.rng.choice(socialRooms, size=len(self.agents)))
+            self.scheduleTensor[goingHome] = np.broadcast_to(self.homeLocations[:, None, None], closed.shape)[goingHome]
+            self.scheduleTensor[toSocial] = np.broadcast_to(socialSpace[:, None, None], closed.shape)[toSocial]
+            self.moverSetCache = dict()
+        # the agents that move next are found from the schedule of the last move, which might have changed, so everyone is checked
+        self.lastMoveSlot = None
+        if self.accumulateInfection:
+            self.rebuildInfectiousness()
+        print(f"turned on {sorted(names)} at day {self.time//24}")
+
+    def saveCheckpoint(self, fileName):
+        """
+            save the snapshot of the model, the state of self.rng and the seeds to a compressed .npz file, 
+            the file is written next to fileName and then renamed, so a stopped run leaves the previous checkpoint intact.
+            the world isn't saved, resumeModel makes it again from the seed the model was created with and then calls loadCheckpoint.
+            saving doesn't change the model, the sets of agents are IdSets so the resumed model visits the agents in the same order as this one
+
+            Parameters:
+            - fileName: the path of the .npz file
+        """
+        snapshot = self.snapshot()
+        values = {"snapshot": snapshot["values"], "rngState": self.rng.bit_generator.state, "configHash": configCompiler.configHash(self.config),
+            "worldSeed": [self.worldSeed.entropy, list(self.worldSeed.spawn_key)], "seed": [self.seedSequence.entropy, list(self.seedSequence.spawn_key)]}
+        # the generator states hold numpy arrays for some bit generators
+        valuesText = json.dumps(values, default=lambda value: value.tolist())
+        temporaryName = fileName+".tmp"
+        with open(temporaryName, "wb") as f:
+            np.savez_compressed(f, values=np.array(valuesText), **snapshot["arrays"])
+        os.replace(temporaryName, fileName)
+
+    def loadCheckpoint(self, fileName):
+        """
+            put the model in the state saved by saveCheckpoint, the model has to have the same world (see resumeModel)
+
+            Parameters:
+            - fileName: the path of the .npz file
+        """
+        snapshot, values = readCheckpoint(fileName)
+        if values["configHash"] != configCompiler.configHash(self.config):
+            raise ValueError(f"the checkpoint {fileName} was saved with a different config")
+        self.restore(snapshot)
+        self.seedRandom(np.random.SeedSequence(values["seed"][0], spawn_key=values["seed"][1]))
+        self.rng.bit_generator.state = values["rngState"]
+
+    # the attributes of the model set by buildWorld, saved by saveWorld (the ones that are set)
+    worldAttributes = ("largeGathering", "lazySunday", "remoteCount", "homeP", "e_homeP")
+    worldIdSets = ("remoteStudentIds", "remoteFacultyIds", "remoteOffCampusIds")
+
+    def saveWorld(self, folder):
+        """
+            save the world made by createWorld and buildWorld in the folder, loadWorld makes the same world from it without reading the csv files.
+            each attribute of the agents, the rooms and the buildings is saved as a column (.npy files, the sets and lists of ids in the CSR form of packLists), 
+            with the schedule tensor and the room graph (offsets, neighbor ids and travel times), world.json has the kinds of the columns, the name --> id tables,
+            the attributes of the model set by buildWorld and the state of self.rng. the dataframes are pickled, they keep their dtypes.
+            the loaded world is the same as this one down to the order of the dictionaries and sets and the types of the values
+            the files are written in a temporary folder that is renamed at the end, if another process saved the same world first its folder is kept
+
+            Parameters:
+            - folder: the folder of the world, see worldCachePath
+        """
+        temporaryFolder = f"{folder}.tmp{os.getpid()}"
+        os.makedirs(temporaryFolder, exist_ok=True)
+        arrays, columns = dict(), dict()
+        for tableName, objects, df in [("agent", self.agents, self.agent_df), ("room", self.rooms, self.room_df), ("building", self.buildings, self.building_df)]:
+            arrays[tableName+"Ids"] = np.fromiter(objects.keys(), dtype=np.int64, count=len(objects))
+            columns[tableName] = []
+            for slot in df.columns.tolist():
+                if tableName == "agent" and slot == "schedule": # saved as the schedule tensor
+                    columns[tableName].append([slot, "schedule"])
+                    continue
+                kind, columnArrays = encodeColumn([getattr(obj, slot) for obj in objects.values()])
+                columns[tableName].append([slot, kind])
+                for index, array in enumerate(columnArrays):
+                    arrays[f"{tableName}_{slot}_{index}"] = array
+        arrays["scheduleTensor"] = self.scheduleTensor
+        arrays["roomGraphOffsets"], arrays["roomGraphNeighbors"], arrays["roomGraphTravelTimes"] = self.roomGraph.offsets, self.roomGraph.neighbors, self.roomGraph.travelTimes
+        for tableName, nameId in [("room", self.roomNameId), ("building", self.buildingNameId)]:
+            arrays[tableName+"Names"] = np.array(list(nameId.keys()), dtype=str)
+            arrays[tableName+"NameIds"] = np.fromiter(nameId.values(), dtype=np.int64, count=len(nameId))
+        for name, array in arrays.items():
+            np.save(os.path.join(temporaryFolder, name+".npy"), array)
+        for tableName, df in [("agent", self.agent_df), ("room", self.room_df), ("building", self.building_df)]:
+            df.to_pickle(os.path.join(temporaryFolder, tableName+"_df.pkl"))
+        # the remote ids are an empty dict when there are no hybrid classes, a set of np.int64 otherwise
+        values = {"columns": columns, "rngState": self.rng.bit_generator.state,
+            "attributes": dict((name, getattr(self, name)) for name in AgentBasedModel.worldAttributes if hasattr(self, name)),
+            "idSets": dict((name, [type(getattr(self, name)).__name__, [int(agentId) for agentId in getattr(self, name)], [isinstance(agentId, np.int64) for agentId in getattr(self, name)]]) 
+                for name in AgentBasedModel.worldIdSets)}
+        with open(os.path.join(temporaryFolder, "world.json"), "w") as f:
+            json.dump(values, f, default=lambda value: value.tolist())
+        try:
+            os.rename(temporaryFolder, folder)
+        except OSError:
+            if not os.path.exists(folder):
+                raise
+            shutil.rmtree(temporaryFolder)
+
+    def loadWorld(self, folder):
+        """
+            make the world saved by saveWorld, this replaces createWorld and buildWorld, the model has to be configured like the model that saved it 
+            (createModel checks the csv files, the world config and the seed through the name of the folder)
+
+            Parameters:
+            - folder: the folder of the world, see worldCachePath
+        """
+        with open(os.path.join(folder, "world.json")) as f:
+            values = json.load(f)
+        def load(name):
+            return np.load(os.path.join(folder, name+".npy"), mmap_mode="r")
+        frames, npintColumns = dict(), []
+        for tableName, columns in values["columns"].items():
+            ids = load(tableName+"Ids").tolist()
+            data = dict()
+            for slot, kind in columns:
+                if kind == "schedule":
+                    data[slot] = 0
+                    continue
+                arrayCount = 2 if kind in ("set", "idset", "list", "npint") else 1
+                data[slot] = decodeColumn(kind, [load(f"{tableName}_{slot}_{index}") for index in range(arrayCount)])
+                if kind == "npint":
+                    npintColumns.append((tableName, slot, data[slot]))
+            frames[tableName] = pd.DataFrame(data, index=ids)
+        # the objects are made from the saved attributes, the dataframes of the model that saved the world replace these ones once the objects are made
+        self.building_df, self.room_df, self.agent_df = frames["building"], frames["room"], frames["agent"]
+        offsets = load("roomGraphOffsets")
+        sources = np.repeat(np.arange(len(offsets)-1), np.diff(offsets))
+        self.roomGraph = RoomGraph(sources, load("roomGraphNeighbors"), load("roomGraphTravelTimes"), len(offsets)-1)
+        self.adjacencyDict = self.roomGraph.toDict()
+        self.buildings = self.createObject(self.building_df, superStrucFactory)
+        self.rooms = self.createObject(self.room_df, roomFactory)
+        self.buildingNameId = dict(zip(load("buildingNames").tolist(), load("buildingNameIds").tolist()))
+        self.roomNameId = dict(zip(load("roomNames").tolist(), load("roomNameIds").tolist()))
+        self.routes = RouteTable(self.adjacencyDict, self.roomNameId[self.config["World"]["transitName"]])
+        self.compileWorld()
+        self.createAgents()
+        # the dataframe made the np.int64 values python ints
+        tables = {"agent": self.agents, "room": self.rooms, "building": self.buildings}
+        for tableName, slot, columnValues in npintColumns:
+            for obj, value in zip(tables[tableName].values(), columnValues):
+                setattr(obj, slot, value)
+        for tableName in ["building", "room", "agent"]:
+            setattr(self, tableName+"_df", pd.read_pickle(os.path.join(folder, tableName+"_df.pkl")))
+        for name, (typeName, agentIds, isNumpy) in values["idSets"].items():
+            agentIds = [np.int64(agentId) if numpyId else agentId for agentId, numpyId in zip(agentIds, isNumpy)]
+            setattr(self, name, set(agentIds) if typeName == "set" else dict.fromkeys(agentIds))
+        for name, value in values["attributes"].items():
+            setattr(self, name, value)
+        # a copy, the schedules are changed in place by turnOnInterventions
+        self.scheduleTensor = np.array(load("scheduleTensor"))
+        self.attachSchedules()
+        self.rng.bit_generator.state = values["rngState"]
+
     def initializeStoringParameter(self, listOfStatus):
         """
             tell the code which values to keep track of. 
@@ -1158,71 +2610,213 @@ class AgentBasedModel:
             stateListTrunked.append(":".join([trunk(state), str(number)]))
         print(f"time: {self.time}, states occupied: {' | '.join(stateListTrunked)}")
 
-    def updateAgent(self):
-        """call the update function on each person"""
+    def updateAgent(self, step=0):
+        """
+            call the update function on each person
+
+            Parameters:
+            - step: which of the 4 calls in the hour this is, used by the keyed random values (CommonRandomNumbers)
+        """
         # change location if the old and new location is different
         index = 0
-        transitionP = self.config["World"]["offCampusInfectionProbability"]
-        offCampusNumber = len(self.rooms[self.roomNameId["offCampus_hub"]].agentsInside)
+        transitionP = self.compiledConfig.offCampusInfectionProbability
+        offCampusHubId, transitId = self.compiledConfig.offCampusHubId, self.compiledConfig.transitId
+        offCampusNumber = len(self.rooms[offCampusHubId].agentsInside)
         if not self.R0Calculation and offCampusNumber > 0 and self.time%24 < 12:
-            randomVec = np.random.random(offCampusNumber) 
-        for agentId, agent in self.agents.items():
-            loc = agent.updateLoc(self.time, self.adjacencyDict)
-            if loc[0] != loc[1]:
-                # if the agent is coming back to the network from the offcampus node
-                if not self.R0Calculation and loc[0] == self.roomNameId["offCampus_hub"] and loc[1] == self.roomNameId[self.config["World"]["transitName"]] and self.time%24<12: 
-                    if agent.state == "susceptible" and randomVec[index] < transitionP:
-                        if self._debug:
-                            print("*"*5, "changed state from susceptible to exposed through transit")
-                        self.changeStateDict(agentId,agent.state, "exposed")
-                        self.rooms[loc[0]].infectedNumber+=1
-                    index+=1
-                    
-                self.rooms[loc[0]].leave(agentId)
-                self.rooms[loc[1]].enter(agentId)
+            # indexed by agentId with CommonRandomNumbers, else by the order the agents come back
+            randomVec = self.keyedUniforms("transit", np.arange(len(self.agents)), step) if self.commonRandomNumbers else self.rng.random(offCampusNumber) 
+        contributions = None
+        if self.agentStore is not None:
+            moved, stillMoving = self.columnarMoves(self.moverIds())
+            if self.accumulateInfection and moved:
+                movedIds, previousRooms, rooms = (np.array(column, dtype=np.int64) for column in zip(*moved))
+                contributions = list(zip(self.columnarContributions(movedIds, previousRooms).tolist(), self.columnarContributions(movedIds, rooms).tolist()))
+        else:
+            moved, stillMoving = [], []
+            for agentId in self.moverIds().tolist():
+                agent = self.agents[agentId]
+                loc = agent.updateLoc(self.time, self.routes)
+                if agent.motion == "moving":
+                    stillMoving.append(agentId)
+                if loc[0] != loc[1]:
+                    moved.append((agentId, loc[0], loc[1]))
+        # the rooms are updated after every agent moved, an agent's move doesn't depend on the rooms so the order is the same as moving them one by one
+        for position, (agentId, previousLoc, loc) in enumerate(moved):
+            # if the agent is coming back to the network from the offcampus node
+            if not self.R0Calculation and previousLoc == offCampusHubId and loc == transitId and self.time%24<12: 
+                if self.agents[agentId].state == "susceptible" and randomVec[agentId if self.commonRandomNumbers else index] < transitionP:
+                    if self._debug:
+                        print("*"*5, "changed state from susceptible to exposed through transit")
+                    self.changeStateDict(agentId, "susceptible", "exposed")
+                    self.rooms[previousLoc].infectedNumber+=1
+                    if contributions is not None: # the contribution changed with the state
+                        contributions[position] = (self.agentContribution(agentId, previousLoc), self.agentContribution(agentId, loc))
+                index+=1
+            
+            leaving, entering = (self.agentContribution(agentId, previousLoc), self.agentContribution(agentId, loc)) if contributions is None else contributions[position]
+            self.rooms[previousLoc].leave(agentId, leaving)
+            self.agentRoom[agentId] = loc if self.rooms[loc].enter(agentId, entering) else -1
+        self.stillMoving = stillMoving
+
+    def moverIds(self):
+        """
+            return a sorted array of the agents that can change location in this call of updateAgent,
+            every other agent is already at the location given by its schedule so calling updateLoc on it would do nothing.
+
+            the first call in an hour takes the agents whose schedule entry changed since the last hour with movement (moverSet),
+            the agents that are (or were at the last movement) quarantined or severely sick, and the agents that are still on their way,
+            the other calls in the same hour only take the agents that are still on their way
+        """
+        if self.moveTime == self.time:
+            return np.array(self.stillMoving, dtype=np.int64)
+        slot = (self.scheduleColumn(self.time), self.time%24)
+        overrideIds = self.state2IdDict["quarantined"] | self.state2IdDict["infected Symptomatic Severe"]
+        if self.lastMoveSlot is None: # no movement since the agents were placed, everyone is checked 
+            candidates = np.arange(len(self.agents))
+        else:
+            extraIds = self.lastOverrideIds.union(overrideIds, self.stillMoving)
+            candidates = np.union1d(self.moverSet(self.lastMoveSlot, slot), np.fromiter(extraIds, dtype=np.int64, count=len(extraIds)))
+        self.moveTime, self.lastMoveSlot, self.lastOverrideIds = self.time, slot, set(overrideIds)
+        return candidates
+
+    def columnarMoves(self, agentIds):
+        """
+            same as calling updateLoc on each agent of agentIds (in order), computed with the columns of the AgentStore,
+            return a list of (agentId, previous location, new location) for the agents whose location changed 
+            and the list of the agents that are still moving.
+
+            a path made by RouteTable.path is popped once when it's made, so the path left is always the start of 
+            [hub of the destination, transit hub], the path of an agent that starts moving is computed from its destination
+
+            Parameters:
+            - agentIds: sorted array of agent Ids, see moverIds
+        """
+        columns, routes, currTime = self.agentStore.columns, self.routes, self.time
+        movingCode = self.agentStore.codeIndex["motion"]["moving"]
+        location = columns["currLocation"][agentIds].astype(np.int64)
+        due = columns["arrivalTime"][agentIds] <= currTime
+        moving = columns["motion"][agentIds] == movingCode
+        starting, continuing = np.flatnonzero(due & ~moving), np.flatnonzero(due & moving)
+
+        destination = np.full(len(agentIds), -1, dtype=np.int64)
+        pathLength = np.zeros(len(agentIds), dtype=np.int64)
+        nextRoom = np.full(len(agentIds), -1, dtype=np.int64)
+        destination[starting] = self.scheduledDestinations(currTime, agentIds[starting])
+        source, target = location[starting], destination[starting]
+        pathLength[starting] = np.where(source == target, 0, np.where(routes.hubOf[source] == routes.hubOf[target], 1, 3))
+        nextRoom[starting] = routes.hubOf[source]
+        paths = columns["path"][agentIds[continuing]].tolist()
+        destination[continuing] = columns["destination"][agentIds[continuing]].tolist()
+        pathLength[continuing] = [len(path) for path in paths]
+        nextRoom[continuing] = [path[-1] if path else -1 for path in paths]
+
+        # same as AgentBehavior.move
+        arrived = due & routes.areAdjacent(location, destination)
+        stepping = due & ~arrived & (pathLength > 0)
+        newLocation = np.where(arrived, destination, np.where(stepping, nextRoom, location))
+
+        columns["currLocation"][agentIds] = newLocation
+        columns["arrivalTime"][agentIds[continuing]] = currTime
+        columns["motion"][agentIds[arrived]] = self.agentStore.codeIndex["motion"]["stationary"]
+        columns["motion"][agentIds[stepping]] = movingCode
+        destinationColumn = columns["destination"]
+        destinationColumn[agentIds[starting]] = np.fromiter(destination[starting].tolist(), dtype=object, count=len(starting))
+        destinationColumn[agentIds[arrived]] = None
+        # the path left after the move, only the agents that stepped on a hub before the last one have rooms left
+        remaining = np.where(stepping, pathLength-1, 0)[due].tolist()
+        columns["path"][agentIds[due]] = np.fromiter(([routes.hubList[target], routes.transit][:length] for target, length in zip(destination[due].tolist(), remaining)), 
+            dtype=object, count=len(remaining))
+
+        changed = newLocation != location
+        moved = list(zip(agentIds[changed].tolist(), location[changed].tolist(), newLocation[changed].tolist()))
+        stillMoving = agentIds[columns["motion"][agentIds] == movingCode].tolist()
+        return moved, stillMoving
+
+    def moverSet(self, previousSlot, slot):
+        """
+            return a sorted array of the agents whose schedule entry at slot is different from the entry at previousSlot,
+            the result is kept for each (previousSlot, slot) pair so each pair is computed once per model
+
+            Parameters:
+            - previousSlot: tuple, (schedule row, hour of the day) of the last hour with movement 
+            - slot: tuple, (schedule row, hour of the day) of the current hour
+        """
+        key = (previousSlot, slot)
+        if key not in self.moverSetCache:
+            changed = self.scheduleTensor[:, previousSlot[0], previousSlot[1]] != self.scheduleTensor[:, slot[0], slot[1]]
+            self.moverSetCache[key] = np.flatnonzero(changed)
+        return self.moverSetCache[key]
   
-    def hub_infection(self):
-        randVec = np.random.random(len(self.state2IdDict["susceptible"]))
+    def hub_infection(self, step=0):
+        # one random value per susceptible agent, used in order, the next value is only taken after an infection 
+        # (with CommonRandomNumbers the value is keyed by its position in randVec)
+        randVec = self.agentUniforms("hub", range(len(self.state2IdDict["susceptible"])), step)
         index = 0
-        for roomId, room in self.rooms.items():
-            if room.room_name.endswith("_hub") and room.building_type != "offCampus":
-                totalInfection = self.infectionInRoom(roomId)
-                for  agentId in room.agentsInside:
-                    if self.agents[agentId].state == "susceptible":
-                        coeff = 1
-                        if self.faceMask_intervention and self.agents[agentId].compliance: # check for compliance
-                            if self.rooms[roomId].building_type != "social":
-                                coeff *= self.maskB
-                    
-                        if randVec[index] < coeff*totalInfection:
-                            self.changeStateDict(agentId,"susceptible", "exposed")
-                            room.infectedNumber+=1
-                            room.hubCount+=1
-                            index+=1
-                            if self._debug:
-                                print(f"at time {self.time}, in {(roomId, room.room_name)}, 1 got infected by the comparison randomValue < {totalInfection}. Kv is {room.Kv}, limit is {room.limit},  {len(room.agentsInside)} people in room ")
+        if self.infectionKernel == "vectorized":
+            self.vectorizedInfection(randVec, hubs=True)
+            return
+        susceptible = self.susceptibleFlags()
+        for roomId in self.infectionHubIds:
+            room = self.rooms[roomId]
+            if self.accumulateInfection and room.infectiousCount == 0:
+                continue
+            totalInfection = self.infectionInRoom(roomId)
+            # masks don't block the infection in social hubs
+            maskBlocks = self.faceMask_intervention and not self.world.is_social[roomId]
+            for  agentId in room.agentsInside:
+                if susceptible[agentId]:
+                    coeff = 1
+                    if maskBlocks and self.agents[agentId].compliance: # check for compliance
+                        coeff *= self.maskB
+                
+                    if randVec[index] < coeff*totalInfection:
+                        self.changeStateDict(agentId,"susceptible", "exposed")
+                        room.infectedNumber+=1
+                        room.hubCount+=1
+                        index+=1
+                        if self._debug:
+                            print(f"at time {self.time}, in {(roomId, room.room_name)}, 1 got infected by the comparison randomValue < {totalInfection}. Kv is {room.Kv}, limit is {room.limit},  {len(room.agentsInside)} people in room ")
                             
     def infection(self):
         """
             the actual function that takes care of the infection
             goes over rooms and check if an infected person is inside and others were infected
         """
-        # time it takes to transition states, negative means, states doesnt change
-        transition = self.config["Infection"]["TransitionTime"]
-        transitionProbability = self.config["Infection"]["TransitionProbability"]
-        randVec = np.random.random(len(self.state2IdDict["susceptible"]))
-        randVec2 = np.random.random(len(self.state2IdDict["exposed"]) + len(self.state2IdDict["infected Asymptomatic"]))
-        index1, index2 = 0, 0
+        # one random value per susceptible agent, used in order, see hub_infection
+        randVec = self.agentUniforms("room", range(len(self.state2IdDict["susceptible"])))
+        index1 = 0
+        if self.commonRandomNumbers: # indexed by agentId, see transitionAgents
+            randVec2 = self.keyedUniforms("transition", np.arange(len(self.agents)))
+        else:
+            randVec2 = self.rng.random(len(self.state2IdDict["exposed"]) + len(self.state2IdDict["infected Asymptomatic"]))
+        index2 = 0
+        # with the AgentStore the agents that can't change state are left out before going over the rooms
+        due = self.dueAgents() if self.agentStore is not None and self.transitionScheduler is None else None
+        if self.infectionKernel == "vectorized":
+            # infections only depend on the agents in the same room, so doing every room before the transitions gives the same result
+            self.vectorizedInfection(randVec)
+            if self.transitionScheduler is None:
+                # only the rooms with a due agent, in the same order as the loop
+                dueFlags = due.tolist()
+                for roomId in np.unique(self.agentRoom[due]).tolist():
+                    if roomId >= 0:
+                        index2 = self.transitionAgents([agentId for agentId in self.rooms[roomId].agentsInside if dueFlags[agentId]], randVec2, index2)
+            else:
+                self.transitionAgents(self.transitionScheduler.popDue(self.time), randVec2)
+            return
+        susceptible = self.susceptibleFlags()
+        due = None if due is None else due.tolist()
         for roomId, room in self.rooms.items():
-            if room.building_type != "offCampus":
+            # with the incremental kernel a room without infectious agents is skipped without looking at the agents inside 
+            if not self.world.is_offcampus[roomId] and not (self.accumulateInfection and room.infectiousCount == 0):
                 totalInfection = self.infectionInRoom(roomId)
                 if totalInfection > 0:
+                    maskBlocks = self.faceMask_intervention and self.world.mask_blocks[roomId]
                     for agentId in room.agentsInside:
-                        if self.agents[agentId].state == "susceptible":
+                        if susceptible[agentId]:
                             coeff = 1
-                            if self.faceMask_intervention and self.agents[agentId].compliance: # check for compliance
-                                if self.rooms[roomId].building_type not in self.nonCompliantLeaf:
-                                    coeff *= self.maskB
+                            if maskBlocks and self.agents[agentId].compliance: # check for compliance
+                                coeff *= self.maskB
                             
                             if randVec[index1] < coeff*totalInfection:
                                 self.changeStateDict(agentId,"susceptible", "exposed")
@@ -1237,37 +2831,124 @@ class AgentBasedModel:
                                         print(f"at time {self.time}, in {(roomId, room.room_name)}, 1 got infected by the comparison randomValue < {totalInfection}. Kv is {room.Kv}, limit is {room.limit},  {len(room.agentsInside)} people in room, contrib: {contribution}")
 
 
-            # this loop takes care of agent's state transitions
-            for agentId in room.agentsInside:   
-                state = self.agents[agentId].state
-                if self.agents[agentId].transitionTime() < self.time and state == "quarantined":
-                    # go back to the susceptible state, because the agent was never infected, just self isolated
-                    # or recovered from infection during quarantine
-                    exitState = "recovered" if self.agents[agentId].infected else "susceptible" 
-                    self.changeStateDict(agentId, "quarantined", exitState)
-                elif self.agents[agentId].transitionTime() < self.time and state != "quarantined" and state != "susceptible" and transition[state] > 0:
-                    cdf = 0
-                    if False and (agentId in self.R0_agentIds):
-                            # only for R0, go to the worst case scenario, exposed --> infected Asymptomatic --> infected Symptomatic Mild
-                        tup = transitionProbability[state][0]
-                        self.changeStateDict(agentId, self.agents[agentId].state, tup[0])
-                    else:
-                        if len(transitionProbability[state]) > 1:
-                            
-                            for tup in transitionProbability[state]:
-                                if tup[1] > randVec2[index2] > cdf:
-                                    cdf+=tup[1]
-                                    nextState = tup[0]
-                            index2+=1
-                        else:
-                            nextState = transitionProbability[state][0][0]
+            if self.transitionScheduler is None:
+                agentIds = room.agentsInside if due is None else [agentId for agentId in room.agentsInside if due[agentId]]
+                index2 = self.transitionAgents(agentIds, randVec2, index2)
+        if self.transitionScheduler is not None:
+            self.transitionAgents(self.transitionScheduler.popDue(self.time), randVec2)
+
+    def dueAgents(self):
+        """
+            return a boolean array indexed by agentId, True for the agents that transitionAgents would change state now, 
+            computed with the columns of the AgentStore. an agent infected in this hour isn't due, so the list can be made before the infection
+        """
+        columns = self.agentStore.columns
+        # same conditions as transitionAgents for each state code of the store
+        changing = np.array([stateName == "quarantined" or (stateName != "susceptible" and self.transitionDict.get(stateName, 0) > 0) 
+            for stateName in self.agentStore.codeNames["state"]], dtype=bool)
+        return changing[columns["state"]] & (columns["lastUpdate"] + columns["statePersistance"] < self.time)
+
+    def susceptibleFlags(self):
+        """
+            return a list of booleans indexed by agentId, True for the susceptible agents, read by the infection loops instead of each agent's state.
+            an agent is only checked once per loop, so the list doesn't have to follow the infections made by the loop
+        """
+        flags = [False]*len(self.agents)
+        for agentId in self.state2IdDict["susceptible"]:
+            flags[agentId] = True
+        return flags
 
-                        self.changeStateDict(agentId, self.agents[agentId].state, nextState)
+    def transitionAgents(self, agentIds, randVec2, index2=0):
+        """
+            move the agents whose state persisted long enough to their next state, the other agents are left as they are
+
+            Parameters:
+            - agentIds: iterable of agentIds to check
+            - randVec2: random values used to pick the next state when there's more than one possible next state, 
+                used in order or indexed by agentId with CommonRandomNumbers
+            - index2: index of the next unused value in randVec2
+
+            return the index of the next unused value in randVec2
+        """
+        # time it takes to transition states, negative means, states doesnt change
+        transition = self.transitionDict
+        transitionTables = self.compiledConfig.transitionTables
+        for agentId in agentIds:   
+            state = self.agents[agentId].state
+            if self.agents[agentId].transitionTime() < self.time and state == "quarantined":
+                # go back to the susceptible state, because the agent was never infected, just self isolated
+                # or recovered from infection during quarantine
+                exitState = "recovered" if self.agents[agentId].infected else "susceptible" 
+                self.changeStateDict(agentId, "quarantined", exitState)
+            elif self.agents[agentId].transitionTime() < self.time and state != "quarantined" and state != "susceptible" and transition[state] > 0:
+                nextStates, cdf = transitionTables[state]
+                if len(nextStates) > 1:
+                    # the first state whose cumulative probability is above the random value
+                    nextState = nextStates[bisect.bisect_right(cdf, randVec2[agentId if self.commonRandomNumbers else index2])]
+                    index2+=1
+                else:
+                    nextState = nextStates[0]
+
+                self.changeStateDict(agentId, self.agents[agentId].state, nextState)
+        return index2
     
+    def vectorizedInfection(self, randVec, hubs=False):
+        """
+            infect the susceptible agents of every room at once, gives the same result as the loop in infection (or hub_infection if hubs is True)
+
+            the contribution of the agents is summed per room with np.bincount over agentRoom,
+            then the susceptible agents of the infectious rooms are compared with the infectiousness of their room by sequentialInfections
+
+            Parameters:
+            - randVec: array of random values used in order, one per susceptible agent
+            - hubs: boolean, only infect in the hubs like hub_infection
+        """
+        store = self.agentStore
+        inRoom = np.flatnonzero(self.agentRoom >= 0)
+        roomIds = self.agentRoom[inRoom]
+        stateCodes = store.columns["state"][inRoom]
+        weights = self.contributionByCode()[stateCodes]
+        if self.R0Calculation:
+            weights = weights * np.isin(inRoom, self.R0_agentIds)
+        if self.faceMask_intervention:
+            compliance = store.columns["compliance"][inRoom]
+            weights = weights * np.where(compliance, self.compiledConfig.maskFactorCompliant[roomIds], self.compiledConfig.maskFactorOther[roomIds])
+        roomCount = len(self.roomKv)
+        totalInfection = np.bincount(roomIds, weights=weights, minlength=roomCount)
+        occupancy = np.bincount(roomIds, minlength=roomCount)
+        # same order of operations as infectionInRoom 
+        world = self.world
+        roomInfection = np.where(world.is_social & ~world.is_hub, (self.baseP*2*totalInfection)/(5*(occupancy//5+1)), (self.baseP*self.roomKv*totalInfection)/self.roomLimit)
+        roomInfection[world.is_offcampus | (~world.is_hub if hubs else False)] = 0
+
+        # the susceptible agents of the infectious rooms in the order the loop checks them, so the random values are used in the same order
+        infectious = np.flatnonzero(roomInfection > 0).tolist()
+        rooms = [self.rooms[roomId].agentsInside for roomId in infectious]
+        agentIds = np.fromiter(itertools.chain.from_iterable(rooms), dtype=np.int64, count=sum(map(len, rooms)))
+        roomIds = np.repeat(np.array(infectious, dtype=np.int64), list(map(len, rooms)))
+        susceptible = store.columns["state"][agentIds] == world.stateCode["susceptible"]
+        agentIds, roomIds = agentIds[susceptible], roomIds[susceptible]
+        threshold = roomInfection[roomIds]
+        if self.faceMask_intervention:
+            maskBlock = (~world.is_social if hubs else world.mask_blocks)[roomIds]
+            threshold = np.where(store.columns["compliance"][agentIds] & maskBlock, self.maskB*threshold, threshold)
+        infected = sequentialInfections(randVec, threshold)
+        for agentId, roomId, infection in zip(agentIds[infected].tolist(), roomIds[infected].tolist(), roomInfection[roomIds[infected]].tolist()):
+            room = self.rooms[roomId]
+            self.changeStateDict(agentId, "susceptible", "exposed")
+            room.infectedNumber+=1
+            if hubs:
+                room.hubCount+=1
+            if self._debug:
+                print(f"at time {self.time}, in {(roomId, room.room_name)}, 1 got infected by the comparison randomValue < {infection}. Kv is {room.Kv}, limit is {room.limit},  {len(room.agentsInside)} people in room ")
+
     def infectionInRoom(self, roomId):
         """find the total infectiousness of a room by adding up the contribution of all agents in the room"""
-        contribution = self.infectionWithinPopulation(self.rooms[roomId].agentsInside, roomId)
-        if self.rooms[roomId].building_type == "social" and not self.rooms[roomId].room_name.endswith("_hub"): # check for division by zero
+        if self.accumulateInfection:
+            contribution = self.rooms[roomId].infectiousness
+        else:
+            contribution = self.infectionWithinPopulation(self.rooms[roomId].agentsInside, roomId)
+        if self.world.is_social[roomId] and not self.world.is_hub[roomId]: # check for division by zero
             if len(self.rooms[roomId].agentsInside) == 0:
                 return 0
             cummulativeFunc = (self.baseP*2*contribution)/(5*int(len(self.rooms[roomId].agentsInside)/5+1))
@@ -1276,25 +2957,28 @@ class AgentBasedModel:
         return cummulativeFunc
 
     def infectionWithinPopulation(self, agentIds, roomId=None):
+        if not self.faceMask_intervention:
+            maskAlways, maskCompliant = False, False
+        elif roomId == -1: # social or large gathering, only the compliant agents wear a mask
+            maskAlways, maskCompliant = False, True
+        else: # the mask rules of the room, see CompiledWorld
+            maskAlways, maskCompliant = bool(self.world.mask_always[roomId]), bool(self.world.mask_required_for_compliant[roomId])
         contribution = 0
+        if self.agentStore is not None:
+            # read the columns instead of making a view of each agent, same sum in the same order
+            stateCodes, compliance = self.agentStore.columns["state"], self.agentStore.columns["compliance"]
+            contributionByCode = self.contributionByCode().tolist()
+            for agentId in agentIds:
+                individualContribution = contributionByCode[stateCodes[agentId]] if not self.R0Calculation or agentId in self.R0_agentIds else 0
+                if maskAlways or (maskCompliant and compliance[agentId]):
+                    individualContribution*=self.maskP
+                contribution+= individualContribution
+            return contribution
         for agentId in agentIds:
             lastUpdate = self.agents[agentId].lastUpdate
             individualContribution =  self.infectionContribution(agentId, lastUpdate)
-            if self.faceMask_intervention:
-                if roomId == -1: # social or large gathering
-                    if self.agents[agentId].compliance:
-                        individualContribution*=self.maskP
-                elif self.rooms[roomId].building_type in self.nonCompliantLeaf: # if dorm, social or dining
-                    if self.rooms[roomId].room_name.endswith("_hub") and self.rooms[roomId].building_type in self.compliantZone:
-                        individualContribution*=self.maskP # put mask if dorm or dining hub
-                    elif self.rooms[roomId].building_type in self.nonCompliantZone:
-                        if self.agents[agentId].compliance:
-                            individualContribution*=self.maskP # some compliance with social
-                    # otherwise no mask
-                else: # any other spaces
-                    individualContribution*=self.maskP
-                
-                
+            if maskAlways or (maskCompliant and self.agents[agentId].compliance):
+                individualContribution*=self.maskP
             contribution+= individualContribution
         return contribution
 
@@ -1302,10 +2986,10 @@ class AgentBasedModel:
         """return the contribution to the infection for a specific agent"""
         if self.R0Calculation:
             if agentId in self.R0_agentIds: 
-                return self.config["Infection"]["Contribution"].get(self.agents[agentId].state, 0)
+                return self.compiledConfig.contributionByState.get(self.agents[agentId].state, 0)
             return 0
         else: 
-            return self.config["Infection"]["Contribution"].get(self.agents[agentId].state, 0)
+            return self.compiledConfig.contributionByState.get(self.agents[agentId].state, 0)
         return 0
 
     def testForDisease(self): 
@@ -1318,7 +3002,10 @@ class AgentBasedModel:
             - None
         """
         if self.config["Quarantine"]["RandomSampling"]: # if random
-            listOfId = np.random.choice(self.groupIds, size=self.config["Quarantine"]["RandomSampleSize"], replace=False)
+            if self.commonRandomNumbers:
+                listOfId = self.keyedChoice("sampling", self.groupIds, self.config["Quarantine"]["RandomSampleSize"])
+            else:
+                listOfId = self.rng.choice(self.groupIds, size=self.config["Quarantine"]["RandomSampleSize"], replace=False)
         else: # we cycle through groups to check infected
             listOfId = self.groupIds[self.quarantineGroupIndex]
             self.quarantineGroupIndex = (self.quarantineGroupIndex+1)% self.quarantineGroupNumber
@@ -1328,19 +3015,19 @@ class AgentBasedModel:
         else:
             notSymptomatic = {agentId for agentId in listOfId 
                     if self.agents[agentId].state != "infected Symptomatic Mild" and self.agents[agentId].state != "infected Symptomatic Severe"}
-            randomVec = np.random.random(len(notSymptomatic))
+            randomVec = self.agentUniforms("screening", list(notSymptomatic))
             complyingP = self.config["Quarantine"]["ShowingUpForScreening"]
             nonComplyingAgent = [agentId for i, agentId in enumerate(notSymptomatic) if randomVec[i] > complyingP]
             listOfId = list(set(listOfId) - set(nonComplyingAgent))
         fpDelayedList, delayedList = [], []
-        falsePositiveMask = np.random.random(len(listOfId))
+        falsePositiveMask = self.agentUniforms("falsePositive", listOfId)
         falsePositiveResult = [agentId for agentId, prob in zip(listOfId, falsePositiveMask) if prob < self.config["Quarantine"]["falsePositive"] and agentId in self.state2IdDict["susceptible"]]
         normalScreeningId = list(set(listOfId) - set(falsePositiveResult))
         # these people had false positive results and are quarantined
         for agentId in falsePositiveResult:
             fpDelayedList.append(agentId)
         
-        falseNegVec = np.random.random(len(normalScreeningId))
+        falseNegVec = self.agentUniforms("falseNegative", normalScreeningId)
         # these are people who are normally screened
         for i, agentId in enumerate(normalScreeningId):
             # double the difficulty to catch Asymptomatic compared to symptomatic
@@ -1395,7 +3082,8 @@ class AgentBasedModel:
             for agentId in mild|severe: # union of the two sets
                 if self.agents[agentId].lastUpdate+23 > self.time: # people walkin if they seen symptoms for a day
                     # with some probability the agent will walkin
-                    tupP = np.random.random(2) # (P of walking in,  P for false Pos)
+                    # (P of walking in,  P for false Pos)
+                    tupP = self.keyedUniforms("walkin", agentId, np.arange(2)) if self.commonRandomNumbers else self.rng.random(2)
                     if tupP[0] < self.config["Quarantine"]["walkinProbability"].get(self.agents[agentId].state, 0): # walkin occurs
                         if tupP[1] > self.config["Quarantine"]["falseNegative"]: # no false negatives
                             self.changeStateDict(agentId,self.agents[agentId].state, "quarantined")
@@ -1410,10 +3098,15 @@ class AgentBasedModel:
             groupMinCount, groupMaxCount = 20, 60
             subsets, randVecs = [], []
             newly_infected = 0
-            for _ in range(groupNumber):
-                size = random.randint(groupMinCount,groupMaxCount)
-                subsets.append(np.random.choice(agentIds, size=size, replace=False))
-                randVecs.append(np.random.random(size))
+            for group in range(groupNumber):
+                if self.commonRandomNumbers:
+                    size = groupMinCount + int(self.keyedUniforms("gatheringSize", group)*(groupMaxCount-groupMinCount+1))
+                    subsets.append(self.keyedChoice("gatheringMember", agentIds, size, group))
+                    randVecs.append(self.agentUniforms("gathering", subsets[-1], group))
+                else:
+                    size = int(self.rng.integers(groupMinCount, groupMaxCount, endpoint=True))
+                    subsets.append(self.rng.choice(agentIds, size=size, replace=False))
+                    randVecs.append(self.rng.random(size))
             totalSubset = list({agentId for subset in subsets for agentId in subset})
             
             counter = self.countAgentsInGroup(totalSubset, "susceptible")
@@ -1629,7 +3322,6 @@ def main():
             },
         },
         "World" : {
-            "UnitTime" : "Hours",
             # by having the supposed days to be simulated, 
             # we can allocate the required space beforehand to speedup data storing
             "InferedSimulatedDays":100,
@@ -1663,8 +3355,6 @@ def main():
         "Quarantine" : {
             # this dictates if we randomly sample the population or cycle through Batches
             "RandomSampling": False,
-            # for random sampling from the agent population
-            "SamplingProbability" : 0,
    
             "ResultLatency":24,
             "walkinProbability" : {
@@ -16,35 +16,27 @@ def assignUniqueName(df, columnName="building_name", groupingCol=""):
         dorm,       DormB           -->     DormB_dorm
     """
     # use the first entry as the "name" column if the name is not valid
-    headerVal, nameCount = list(df.columns.values), dict()
+    headerVal = list(df.columns.values)
     columnName = headerVal[0] if  columnName not in headerVal else columnName
     
     # check if we want to group the names
     grouping = True if groupingCol != "" else False
     
-    for index, rowVal in df.iterrows():
-        itemName = str(rowVal[columnName])
-        groupName = str(rowVal[groupingCol]) + "_" if grouping else ""
-        newName = (groupName + itemName).replace(" ", "_")
-        # count the occurrnace of unique names
-        nameCount[newName] = nameCount.get(newName, 0) + 1
-        entry = newName
-        if nameCount[newName] > 1 and newName not in["transit_space_hallway", "transit_space_hub", "transit_space"]:
-            entry+=str(nameCount[entry])
-        df.loc[index, columnName] = entry
+    groupName = df[groupingCol].astype(str) + "_" if grouping else ""
+    newName = (groupName + df[columnName].astype(str)).str.replace(" ", "_", regex=False)
+    # count the occurrnace of unique names, the nth occurrence (n > 1) gets n appended
+    nameCount = newName.groupby(newName, sort=False).cumcount() + 1
+    numbered = (nameCount > 1) & ~newName.isin(["transit_space_hallway", "transit_space_hub", "transit_space"])
+    df[columnName] = newName.where(~numbered, newName + nameCount.astype(str))
     return df
 
 def createSuperStruc(df, objCount="count"):
     """
        creates multiple of the same object by looking at the obj_count and returns a new df that contains the multiplied rows 
     """
-    rowList, colName = [], list(df.columns.values)
-    colName.remove(objCount)
-    for _, rows in df.iterrows():
-        
-        for _ in range(int(rows[objCount])):
-            rowList.append( {key:val for key, val in zip(colName, rows[colName])})
-    return pd.DataFrame(rowList)
+    repeated = df.loc[df.index.repeat(df[objCount].astype(int))].drop(columns=objCount)
+    # same column types as a dataframe made from a list of rows
+    return repeated.reset_index(drop=True).infer_objects()
 
 def createPartitions(df):
     """
@@ -56,36 +48,35 @@ def createPartitions(df):
     capacities = ["cap_S", "cap_M", "cap_L"]
     limits = ["enroll_S", "enroll_M", "enroll_L"]
     nameStr, connection = "room_name", "connected_to"
-    rowList, colName = [], list(df.columns.values)
     hubName = "_hub"
-    for index, rows in df.iterrows(): # iterate over each structure
-        for leafName, capacity, limit in zip(leaves, capacities, limits):# create the small, medium, large
-            for _ in range(int(rows[leafName])): # for each size make the corresponding rooms
-                dict1 = {nameStr: rows[nameStr], 
+    df = df.reset_index(drop=True)
+    parts = []
+    for order, (leafName, capacity, limit) in enumerate(zip(leaves, capacities, limits)): # create the small, medium, large
+        # for each size make the corresponding rooms
+        rows = df.loc[df.index.repeat(df[leafName].astype(int))]
+        parts.append(pd.DataFrame({nameStr: rows[nameStr], 
                         "capacity" : rows[capacity],
                         "limit" : rows[limit],
                         "located_building": rows["building_name"],
-                        "connected_to": rows["building_name"]+hubName,
+                        connection: rows["building_name"]+hubName,
                         "travel_time": 1,
                         "building_type":rows["building_type"],
-                        "Kv":rows["Kv"]             
-                }
-                rowList.append(dict1)
-        hubDict = {
-            nameStr: rows[nameStr] + hubName, 
-            "capacity" : rows["hubCapacity"],
-            "limit": rows["hubCapacity"],
-            "located_building": rows["building_name"],
-            "connected_to": "transit_space_hub",
+                        "Kv":rows["Kv"],
+                        "order": order}))
+    # add the hallways, for each building, a building without rooms gets the hub of the previous row (the transit hub, for the transit space)
+    hasRooms = df[leaves].astype(int).sum(axis=1) > 0
+    parts.append(pd.DataFrame({nameStr: (df["building_name"]+hubName).where(hasRooms, "transit_space_hub"), 
+            "capacity" : df["hubCapacity"],
+            "limit": df["hubCapacity"],
+            "located_building": df["building_name"],
+            connection: "transit_space_hub",
             "travel_time": 1,
-            "building_type":rows["building_type"],
-            "Kv":rows["hubKv"]
-        }
-        # add the hallways, for each building 
-        previousRoom = dict(rowList[-1])
-        hubDict[nameStr] = previousRoom["connected_to"]
-        rowList.append(hubDict)
-    return pd.DataFrame(rowList)
+            "building_type":df["building_type"],
+            "Kv":df["hubKv"],
+            "order": len(leaves)}))
+    # the rooms of each building in the order small, medium, large and then its hub
+    partitions = pd.concat(parts).rename_axis("building").sort_values(["building", "order"], kind="stable")
+    return partitions.drop(columns="order").reset_index(drop=True).infer_objects()
 
 def mod_building(fileName, folder, debug=True):
     original_df = flr.make_df(folder,fileName, debug=debug)
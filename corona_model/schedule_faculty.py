@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import random
 import itertools
 # the code works but a bit slow, so open for change
 
@@ -40,7 +38,9 @@ def pickClass(tickets,ASched,BSched):
 ## 'off',classroom-number, 'office','dining'
    
 
-def scheduleCreator():
+def scheduleCreator(rng=None):
+    # rng: the np.random.Generator used for every random choice, None makes a new one
+    rng = np.random.default_rng() if rng is None else rng
     #Params
     dh = 0.3 #probability of going to the dining hall on a particular day.
     # Create Agents
@@ -97,9 +97,9 @@ def scheduleCreator():
        for j in class_times:
           for k in class_days:
              arts_tickets.append(('Arts',i,j,k))
-    random.shuffle(stem_tickets)
-    random.shuffle(hum_tickets)
-    random.shuffle(arts_tickets)
+    rng.shuffle(stem_tickets)
+    rng.shuffle(hum_tickets)
+    rng.shuffle(arts_tickets)
     #print(len(stem_tickets))
     #print(len(arts_tickets))
     #print(len(hum_tickets))
@@ -174,12 +174,12 @@ def scheduleCreator():
              arts_tickets.pop(j)
          
        #dining hall
-       if random.random() < dh: #go to the dining hall on day A
+       if rng.random() < dh: #go to the dining hall on day A
           AvailableSlots = [m for m in range(len(mySchedA)) if mySchedA[m] == None]
-          mySchedA[random.choice(AvailableSlots)] = 'dining'
-       if random.random() < dh:
+          mySchedA[int(rng.choice(AvailableSlots))] = 'dining'
+       if rng.random() < dh:
           AvailableSlots = [m for m in range(len(mySchedB)) if mySchedB[m] == None]
-          mySchedB[random.choice(AvailableSlots)] = 'dining'
+          mySchedB[int(rng.choice(AvailableSlots))] = 'dining'
 
        #Now fill in the remaining slots with office
        AvailableSlots = [m for m in range(len(mySchedA)) if mySchedA[m] == None]
@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import random
 import itertools
 # the code works but a bit slow, so open for change
 
@@ -40,7 +38,9 @@ def pickClass(tickets,ASched,BSched):
 ## 'gym', 'library','social','dining','sleep','dorm'
    
 
-def scheduleCreator(social):
+def scheduleCreator(social, rng=None):
+    # rng: the np.random.Generator used for every random choice, None makes a new one
+    rng = np.random.default_rng() if rng is None else rng
     #Params
     g = 0.15 # the probability of going to the gym on any particular day
     s = social # the probability of going to a social space
@@ -59,7 +59,7 @@ def scheduleCreator(social):
     randomizedAgents.extend(list(itertools.repeat("A",500)))
     OnorOff = list(itertools.repeat("On",1500))
     OnorOff.extend(list(itertools.repeat("Off",500)))
-    random.shuffle(OnorOff)
+    rng.shuffle(OnorOff)
 
     #Define the classtimes
     class_times = [10,12,14,16]
@@ -275,9 +275,9 @@ def scheduleCreator(social):
 
 
     #Shuffle the groups of tickets
-    random.shuffle(stem_tickets)
-    random.shuffle(hum_tickets)
-    random.shuffle(arts_tickets)
+    rng.shuffle(stem_tickets)
+    rng.shuffle(hum_tickets)
+    rng.shuffle(arts_tickets)
     """
     print(len(stem_tickets))
     print(len(hum_tickets))
@@ -369,7 +369,7 @@ def scheduleCreator(social):
         #done with the initial major classes, now pick two additional classes
         tried = [0,0,0]
         while foundClasses < 4 and min(tried)<=2: #Then I still need to find another class
-           m = random.randint(1,3)
+           m = int(rng.integers(1, 3, endpoint=True))
            if m == 1:
               tried[0]+=1
               j = pickClass(stem_tickets,mySchedA,mySchedB)
@@ -414,7 +414,7 @@ def scheduleCreator(social):
            #Day A has one visit to the dining Hall
            meal = False
            while meal == False:
-              x = random.choice([8,9,10,11,12,13,14,15,17,18,19,20])
+              x = int(rng.choice([8,9,10,11,12,13,14,15,17,18,19,20]))
               if mySchedA[x] == None:
                  meal = True
                  mySchedA[x] = 'dining'
@@ -422,7 +422,7 @@ def scheduleCreator(social):
            #Day B has one visit to the dining Hall
            meal = False
            while meal == False:
-              x = random.choice([8,9,10,11,12,13,14,15,17,18,19,20])
+              x = int(rng.choice([8,9,10,11,12,13,14,15,17,18,19,20]))
               if mySchedB[x] == None:
                  meal = True
                  mySchedB[x] = 'dining'
@@ -432,7 +432,7 @@ def scheduleCreator(social):
            B = False
            tries = 0
            while B == False and tries < 8:
-              x = random.randint(8,11)
+              x = int(rng.integers(8, 11, endpoint=True))
               tries+=1
               if mySchedA[x] == None:
                  B = True
@@ -440,7 +440,7 @@ def scheduleCreator(social):
            L = False
            tries = 0
            while L == False and tries < 8:
-              x = random.randint(12,15)
+              x = int(rng.integers(12, 15, endpoint=True))
               tries+=1
               if mySchedA[x] == None:
                  L = True
@@ -448,7 +448,7 @@ def scheduleCreator(social):
            D = False
            tries = 0
            while D == False and tries < 8:
-              x = random.randint(17,20)
+              x = int(rng.integers(17, 20, endpoint=True))
               tries += 1
               if mySchedA[x] == None:
                  D = True
@@ -458,7 +458,7 @@ def scheduleCreator(social):
            B = False
            tries = 0
            while B == False and tries < 8:
-              x = random.randint(8,11)
+              x = int(rng.integers(8, 11, endpoint=True))
               tries += 1
               if mySchedB[x] == None:
                  B = True
@@ -466,7 +466,7 @@ def scheduleCreator(social):
            L = False
            tries = 0
            while L == False and tries < 8:
-              x = random.randint(12,15)
+              x = int(rng.integers(12, 15, endpoint=True))
               tries+=1
               if mySchedB[x] == None:
                  L = True
@@ -474,42 +474,42 @@ def scheduleCreator(social):
            D = False
            tries = 0
            while D == False and tries < 8:
-              x = random.randint(17,20)
+              x = int(rng.integers(17, 20, endpoint=True))
               tries += 1
               if mySchedB[x] == None:
                  D = True
                  mySchedB[x] = 'dining'
                  
            #Visits to the dining hall on Day W
-           x = random.randint(8,11)
+           x = int(rng.integers(8, 11, endpoint=True))
            mySchedW[x] = 'dining'
-           x = random.randint(12,15)
+           x = int(rng.integers(12, 15, endpoint=True))
            mySchedW[x] = 'dining'
-           x = random.randint(17,20)
+           x = int(rng.integers(17, 20, endpoint=True))
            mySchedW[x] = 'dining'
 
 
         #Decide if we're going to the Gym each day
-        if random.random() < g: #add a gym to Day A
+        if rng.random() < g: #add a gym to Day A
            AvailableSlots = [m for m in range(len(mySchedA)) if mySchedA[m] == None]
            if len(AvailableSlots) != 0:
-              gymtime = random.choice(AvailableSlots)
+              gymtime = int(rng.choice(AvailableSlots))
               mySchedA[gymtime] = 'gym'
-        if random.random() < g: #add a gym to Day B
+        if rng.random() < g: #add a gym to Day B
            AvailableSlots = [m for m in range(len(mySchedB)) if mySchedB[m] == None]
            if len(AvailableSlots) != 0:
-              gymtime = random.choice(AvailableSlots)
+              gymtime = int(rng.choice(AvailableSlots))
               mySchedB[gymtime] = 'gym'
-        if OnorOff[i] == "On" and random.random() < g: #add a gym to Day W
+        if OnorOff[i] == "On" and rng.random() < g: #add a gym to Day W
            AvailableSlots = [m for m in range(len(mySchedW)) if mySchedW[m] == None]
            if len(AvailableSlots) != 0:
-              gymtime = random.choice(AvailableSlots)
+              gymtime = int(rng.choice(AvailableSlots))
               mySchedW[gymtime] = 'gym'
         
         #Now pick all extras: Social,Library,and Hanging out in Dorm
         AvailableSlots = [m for m in range(len(mySchedA)) if mySchedA[m] == None]
         for x in AvailableSlots: #for each available slot fill it in with something
-           Task = random.random()
+           Task = rng.random()
            if OnorOff[i] == "On" and Task < lib: #this is an l, for library
               mySchedA[x] = 'library'
            elif OnorOff[i] == "On" and Task < lib+s:
@@ -524,7 +524,7 @@ def scheduleCreator(social):
               mySchedA[x] = 'Off'
         AvailableSlots = [m for m in range(len(mySchedB)) if mySchedB[m] == None]
         for x in AvailableSlots:
-           Task = random.random()
+           Task = rng.random()
            if OnorOff[i] == "On" and Task < lib:
               mySchedB[x] = 'library'
            elif OnorOff[i] == "On" and Task < lib+s:
@@ -539,7 +539,7 @@ def scheduleCreator(social):
               mySchedB[x] = 'Off'
         AvailableSlots = [m for m in range(len(mySchedW)) if mySchedW[m] == None]
         for x in AvailableSlots:
-           Task = random.random()
+           Task = rng.random()
            if OnorOff[i] == "On" and Task < lib:
               mySchedW[x] = 'library'
            elif OnorOff[i] == "On" or Task < lib+s:
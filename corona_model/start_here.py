@@ -62,7 +62,6 @@ def main():
             },
         },
         "World" : {
-            "UnitTime" : "Hours",
             # by having the supposed days to be simulated, 
             # we can allocate the required space beforehand to speedup data storing
             "InferedSimulatedDays":100,
@@ -91,8 +90,6 @@ def main():
             # this dictates if we randomly sample the population or cycle through Batches
             "RandomSampling": False,
             "RandomSampleSize": 100,
-            # for random sampling from the agent population
-            "SamplingProbability" : 0,
             "ResultLatency":2*24,
             "walkinProbability" : {
                 "infected Symptomatic Mild": 0.7, 
@@ -125,7 +122,27 @@ def main():
         },
         "LessSocializing":{
             "SocializingProbability":0.5
-        }
+        },
+        # these only change how the simulation is computed, not the results
+        "Engine":{
+            # keep the agents in numpy arrays instead of one object per agent, about as fast as the objects on its own, 
+            # it uses less memory and the vectorized infection kernel needs it
+            "ColumnarAgents": False,
+            # "loop", "vectorized" or "incremental", vectorized computes the infection of every room at once (needs ColumnarAgents),
+            # incremental keeps the infectiousness of each room up to date instead of summing it every hour
+            "InfectionKernel": "loop",
+            # take the state transitions from a queue sorted by due time instead of checking every agent every hour,
+            # the random values are used in a different order so the results are not the same as with False
+            "TransitionScheduler": False,
+            # the bit generator of the model's np.random.Generator: "PCG64", "PCG64DXSM", "Philox", "SFC64" or "MT19937"
+            "BitGenerator": "PCG64",
+            # draw the random values of the simulation from a Philox stream keyed on (agent, hour, purpose), 
+            # so with the same seed an agent gets the same random values in every scenario (smaller variance of the differences between scenarios)
+            "CommonRandomNumbers": False,
+            # save the world (rooms, agents, schedules) in picklefile/world_<hash> and load it the next time the same csv files,
+            # world config and seed are used, only used when a seed is given
+            "WorldCache": False,
+        },
 
     }
   
@@ -401,13 +418,17 @@ def main():
             for (specificKey, specificValue) in listOfControls:
                 configCopy[categoryKey][specificKey] = specificValue
         R0Count = 100 if index < 1 else 40
+        # if not None, R0Count is the maximum and the R0 simulations stop once the 95% confidence interval of the mean R0 is within ± R0Tolerance
+        R0Tolerance = None
         multiCounts = 20
         if True or index in []: 
             typeName = "p_" + str(configCopy["Infection"]["baseP"]) + "_"
             modelName=typeName+modelName+"_"+str(simulationGeneration)
             #model_framework.simpleCheck(configCopy, days=100, visuals=True, debug=False, modelName=files+modelName)
             #InfectedCountDict[modelName] = model_framework.multiSimulation(multiCounts, configCopy, days=100, debug=False, modelName=files+modelName) 
-            R0Dict[modelName] = model_framework.R0_simulation(modelConfig, R0_controls,R0Count, debug=True, timeSeriesVisual=False, R0Visuals=True, modelName=modelName)
+            # the branches share the first 20 days (with the interventions of configCopy) and turn on more interventions from day 20
+            #branchDict = model_framework.branchSimulation(configCopy, {"same": [], "masks": ["FaceMasks"], "closing": ["ClosingBuildings"]}, 20, days=100, replicates=multiCounts)
+            R0Dict[modelName] = model_framework.R0_simulation(modelConfig, R0_controls,R0Count, debug=True, timeSeriesVisual=False, R0Visuals=True, modelName=modelName, tolerance=R0Tolerance)
             # the value of the dictionary is ([multiple R0 values], (descriptors, (tuple of useful data like mean and stdev)) 
     print(InfectedCountDict.items())
     print(R0Dict.items())
@@ -1,7 +1,7 @@
 import statistics as stat
 import numpy as np
-import matplotlib.pyplot as plt
 # this file is used for analyzing the data and providing insights
+# matplotlib is imported by the plotting functions, so the simulations that don't plot don't pay for it
 
 def analyzeModel(simulationData):
     """
@@ -83,6 +83,7 @@ def boxplot(data, oneD=False, pltTitle="Some Title", xlabel="Default X", ylabel=
     - saveName: string, ends with .png o some file format, save the plot with this name
 
     """
+    import matplotlib.pyplot as plt
     # nice example of boxplots:
     # https://matplotlib.org/2.0.1/examples/statistics/boxplot_color_demo.html
     fig1, ax1 = plt.subplots()
@@ -112,6 +113,7 @@ def boxplot(data, oneD=False, pltTitle="Some Title", xlabel="Default X", ylabel=
     plt.close()
 
 def barChart(data, oneD=False, pltTitle="Some Title", xlabel="Default X", ylabel="Default Y", labels=[], showPlt=True, savePlt=False, saveName="defaultimage.png"):
+    import matplotlib.pyplot as plt
     fig1, ax1 = plt.subplots()
     ax1.set_title(pltTitle)
     if oneD:
@@ -176,6 +178,33 @@ def analyzeData(ListData):
     
     return (npMean, stdev, rangeVal, median)
 
+class RunningMeanVariance:
+    """
+        mean and variance of a stream of values updated one value at a time (Welford's algorithm), 
+        used to stop running simulations once the mean is known precisely enough
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sumSquares = 0.0 # sum of the squared differences from the mean
+    
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta/self.count
+        self.sumSquares += delta*(value - self.mean)
+
+    def variance(self):
+        """sample variance, 0 with less than 2 values"""
+        return self.sumSquares/(self.count-1) if self.count > 1 else 0.0
+
+    def halfWidth(self, confidence=0.95):
+        """half-width of the confidence interval of the mean (normal approximation), infinite with less than 2 values"""
+        if self.count < 2:
+            return float("inf")
+        z = stat.NormalDist().inv_cdf((1+confidence)/2)
+        return z*(self.variance()/self.count)**0.5
+
 def geometric_mean(listData):
     """
         this function is created in python's statistics library from 3.8
@@ -0,0 +1,59 @@
+import warnings
+
+import pytest
+
+import configCompiler
+
+
+def test_default_config_is_valid_without_warnings(modelConfig):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        configCompiler.validateConfig(modelConfig)
+
+
+def test_missing_keys_are_all_reported(modelConfig):
+    del modelConfig["Infection"]["baseP"]
+    del modelConfig["World"]["transitName"]
+    with pytest.raises(ValueError) as error:
+        configCompiler.validateConfig(modelConfig)
+    assert "Infection.baseP" in str(error.value) and "World.transitName" in str(error.value)
+
+
+def test_intervention_keys_are_only_required_when_turned_on(modelConfig):
+    del modelConfig["HybridClass"]["RemoteFacultyCount"]
+    configCompiler.validateConfig(modelConfig)
+    modelConfig["World"]["TurnedOnInterventions"] = ["HybridClasses"]
+    with pytest.raises(ValueError, match="HybridClass.RemoteFacultyCount"):
+        configCompiler.validateConfig(modelConfig)
+
+
+def test_misspelled_key_warns_with_a_suggestion(modelConfig):
+    modelConfig["World"]["complianceRatoi"] = modelConfig["World"].pop("complianceRatio")
+    with pytest.warns(UserWarning, match="did you mean 'complianceRatio'"):
+        with pytest.raises(ValueError, match="World.complianceRatio"):
+            configCompiler.validateConfig(modelConfig)
+
+
+def test_state_names_and_transition_tables_are_checked(modelConfig):
+    modelConfig["Infection"]["TransitionProbability"]["exposed"] = [("infected Asymptomatic", 0.85), ("infected Asymptomatic Fixd", 0.9)]
+    with pytest.raises(ValueError) as error:
+        configCompiler.validateConfig(modelConfig)
+    assert "must be cumulative" in str(error.value) and "'infected Asymptomatic Fixd'" in str(error.value)
+
+
+def test_configHash_ignores_the_key_order(modelConfig):
+    configHash = configCompiler.configHash(modelConfig)
+    assert configCompiler.configHash(dict(reversed(list(modelConfig.items())))) == configHash
+    modelConfig["Infection"]["baseP"] += 1
+    assert configCompiler.configHash(modelConfig) != configHash
+
+
+def test_keys_of_the_start_here_experiments_are_reported(modelConfig):
+    # the spelling used by the experiments of start_here.main, the model ignores them
+    modelConfig["World"]["ComplianceRatio"] = 1
+    modelConfig["ClosingBuildings"]["ClosedBuildingType"] = ["gym", "library"]
+    with pytest.warns(UserWarning) as records:
+        configCompiler.validateConfig(modelConfig)
+    messages = [str(record.message) for record in records]
+    assert any("World.ComplianceRatio is ignored, did you mean 'complianceRatio'" in message for message in messages)
+    assert any("ClosingBuildings.ClosedBuildingType is ignored, did you mean 'ClosedBuilding_ByType'" in message for message in messages)
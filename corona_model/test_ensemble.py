@@ -0,0 +1,55 @@
+import contextlib
+import copy
+import io
+
+import numpy as np
+import pytest
+
+import ensemble
+import model_framework
+
+
+@pytest.fixture(scope="module")
+def R0Model(defaultConfig):
+    return model_framework.createModel(copy.deepcopy(defaultConfig), R0=True, seed=4)
+
+
+def test_ensemble_statistics_match_the_scalar_engine(modelConfig, R0Model):
+    # compareWithScalar raises an AssertionError if a mean or a variance is off
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparison = ensemble.compareWithScalar(modelConfig, replicates=8, days=4, seed=4)
+    assert set(comparison.keys()) == set(R0Model.world.stateNames) | {"R0"}
+    # both engines have to infect someone for the comparison to mean anything
+    assert comparison["R0"][0] > 0 and comparison["R0"][1] > 0
+
+
+def test_default_stream_is_spawned_from_the_model_seed(R0Model):
+    first, second = copy.deepcopy(R0Model), copy.deepcopy(R0Model)
+    runs = [ensemble.EnsembleModel(model, 3) for model in [first, second]]
+    for run in runs:
+        run.updateSteps(48)
+    assert runs[0].stateCounts.keys() == runs[1].stateCounts.keys()
+    for key, counts in runs[0].stateCounts.items():
+        np.testing.assert_array_equal(counts, runs[1].stateCounts[key])
+
+
+def test_full_rooms_keep_agents_out_like_the_scalar_engine(R0Model):
+    model = copy.deepcopy(R0Model)
+    # small rooms so that some agents find their room full, the moves don't depend on the random values
+    for room in model.rooms.values():
+        room.capacity = max(1, int(room.capacity)//8)
+    run = ensemble.EnsembleModel(model, 2)
+    model.initializeStoringParameter(["susceptible"])
+    refused = 0
+    for time in range(7, 23):
+        model.time = run.time = time
+        for step in range(4):
+            model.updateAgent(step)
+            run.updateAgent()
+            inRoom = model.agentRoom >= 0
+            refused += np.count_nonzero(~inRoom)
+            for replicate in range(2):
+                np.testing.assert_array_equal(run.location[replicate], [agent.currLocation for agent in model.agents.values()])
+                np.testing.assert_array_equal(run.inRoom[replicate], inRoom)
+            np.testing.assert_array_equal(run.occupancy.reshape(2, -1)[0, list(model.rooms.keys())], [len(room.agentsInside) for room in model.rooms.values()])
+    assert refused > 0
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+
+import fileRelated as flr
+
+
+def test_resultStore_round_trip(tmp_path):
+    folder = str(tmp_path/"results")
+    store = flr.ResultStore(folder, {"seed": 3}, chunkSize=2)
+    for simulation in range(5):
+        store.append({"simulation": simulation, "total": simulation*10}, {"infected": list(range(simulation+1))})
+    # the first two chunks are on disk before the store is closed
+    assert len(flr.readManifest(folder)["chunks"]) == 2
+    store.close()
+    manifest, columns = flr.loadResults(folder, concatenate=True)
+    assert [chunk["rows"] for chunk in manifest["chunks"]] == [2, 2, 1]
+    assert manifest["runs"][0]["seed"] == 3 and manifest["runs"][0]["rows"] == 5
+    assert columns["simulation"].tolist() == [0, 1, 2, 3, 4] and columns["total"].tolist() == [0, 10, 20, 30, 40]
+    # the time series of a chunk are padded with nan up to the longest one, the chunks up to the widest chunk
+    infected = columns["infected"]
+    assert infected.shape == (5, 5)
+    assert infected[4].tolist() == [0, 1, 2, 3, 4] and infected[2, :3].tolist() == [0, 1, 2] and np.isnan(infected[2, 3:]).all()
+
+
+def test_resultStore_appends_new_runs_and_ignores_unlisted_chunks(tmp_path):
+    folder = str(tmp_path/"results")
+    store = flr.ResultStore(folder, chunkSize=10)
+    store.append({"total": 1})
+    store.close()
+    store = flr.ResultStore(folder, chunkSize=10)
+    store.append({"total": 2, "extra": 5.0})
+    store.close()
+    # a run that stopped while writing a chunk leaves a chunk that isn't in the manifest
+    os.makedirs(os.path.join(folder, "chunk_00002"))
+    np.save(os.path.join(folder, "chunk_00002", "total.npy"), np.array([3]))
+    manifest, columns = flr.loadResults(folder)
+    assert len(manifest["runs"]) == 2 and [chunk["run"] for chunk in manifest["chunks"]] == [0, 1]
+    assert [array.tolist() for array in columns["total"]] == [[1], [2]]
+    assert columns["extra"][0] is None
+    _, columns = flr.loadResults(folder, concatenate=True)
+    assert columns["total"].tolist() == [1, 2] and np.isnan(columns["extra"][0]) and columns["extra"][1] == 5.0
+
+
+def test_resultStore_escapes_the_column_names_used_as_file_names(tmp_path):
+    folder = str(tmp_path/"results")
+    store = flr.ResultStore(folder)
+    store.append({"a/b": 1, "../up": 2, "infected Asymptomatic": 3, "100%": 4})
+    store.close()
+    assert not os.path.exists(str(tmp_path/"up.npy"))
+    assert sorted(os.listdir(os.path.join(folder, "chunk_00000"))) == ["..%2Fup.npy", "100%25.npy", "a%2Fb.npy", "infected Asymptomatic.npy"]
+    _, columns = flr.loadResults(folder, concatenate=True)
+    assert dict((name, column.tolist()) for name, column in columns.items()) == {"a/b": [1], "../up": [2], "infected Asymptomatic": [3], "100%": [4]}
+
+
+def test_resultStore_rejects_colliding_or_empty_column_names(tmp_path):
+    store = flr.ResultStore(str(tmp_path/"results"))
+    with pytest.raises(ValueError, match=r"the columns \['total'\] are both values and time series"):
+        store.append({"total": 1}, {"total": [1, 2]})
+    with pytest.raises(ValueError, match="not non empty strings"):
+        store.append({"": 1})
+    assert store.rows == []
+
+
+SCHEMA = {"name": "str", "kind": "category", "count": "int32", "Kv": "float64"}
+
+
+def writeCsv(tmp_path, text):
+    filePath = tmp_path/"table.csv"
+    filePath.write_text(text)
+    return str(filePath)
+
+
+def test_readCsv_strips_and_converts_the_columns(tmp_path):
+    df = flr.readCsv(writeCsv(tmp_path, " name , kind,count,Kv\n dorm room ,dorm, 3 ,0.5\nhub,transit,10,1\n"), SCHEMA)
+    assert df.columns.tolist() == ["name", "kind", "count", "Kv"]
+    assert df["name"].tolist() == ["dorm room", "hub"] and df["count"].tolist() == [3, 10]
+    assert df["count"].dtype == np.int32 and df["Kv"].dtype == np.float64 and df["kind"].dtype == "category"
+
+
+def test_readCsv_lists_every_problem(tmp_path):
+    filePath = writeCsv(tmp_path, "name,count,Kv\ndorm,3,0.5\n ,2.5,x\nhub,,1\n")
+    with pytest.raises(ValueError) as error:
+        flr.readCsv(filePath, SCHEMA)
+    message = str(error.value)
+    assert "missing column 'kind'" in message
+    # the header is line 1
+    assert "column 'name' has empty cells on the lines [3]" in message and "column 'count' has empty cells on the lines [4]" in message
+    assert "column 'Kv' has values that are not float64: ['x']" in message
+
+
+def test_readCsv_rejects_values_that_are_not_integers(tmp_path):
+    with pytest.raises(ValueError, match=r"column 'count' has values that are not int32: \['2.5', 'two'\]"):
+        flr.readCsv(writeCsv(tmp_path, "name,kind,count,Kv\na,b,2.5,1\nc,d,two,1\ne,f,4,1\n"), SCHEMA)
+
+
+def test_readCsv_reports_lines_with_too_many_cells(tmp_path):
+    with pytest.raises(ValueError, match="can't read"):
+        flr.readCsv(writeCsv(tmp_path, "name,kind,count,Kv\na,b,1,1,extra\n"), SCHEMA)
+
+
+def test_readCsv_reports_a_line_with_too_many_cells(tmp_path):
+    with pytest.raises(ValueError, match="can't read"):
+        flr.readCsv(writeCsv(tmp_path, "name,kind,count,Kv\na,b,1,1\nc,d,2,1,extra\n"), SCHEMA)
@@ -0,0 +1,579 @@
+import collections
+import copy
+import functools
+import json
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_framework
+
+# two buildings (hubs 3 and 6) with two leaves each, connected by the transit hub 7,
+# the first room in each adjacency list is the "hub" used by the routes, like makeAdjacencyDict does
+ADJDICT = {
+    1: [(3, 1)], 2: [(3, 1)], 3: [(1, 1), (2, 1), (7, 1)],
+    4: [(6, 1)], 5: [(6, 1)], 6: [(4, 1), (5, 1), (7, 1)],
+    7: [(3, 1), (6, 1)],
+}
+TRANSIT = 7
+LEAVES = [1, 2, 4, 5]
+
+
+@pytest.fixture(scope="module")
+def sharedModel(defaultConfig):
+    model = model_framework.createModel(copy.deepcopy(defaultConfig), seed=4)
+    return model, model.snapshot(), model.seedSequence, model.rng.bit_generator.state
+
+
+@pytest.fixture
+def model(sharedModel):
+    """the model made from the default config with seed 4, put back in its initial state after the test"""
+    model, snapshot, seedSequence, rngState = sharedModel
+    yield model
+    model.restore(snapshot)
+    model.seedRandom(seedSequence)
+    model.rng.bit_generator.state = rngState
+
+
+def runEngine(config, engine, days=4):
+    """run the default config with the given Engine keys for a few days and return the model"""
+    config = copy.deepcopy(config)
+    config["Engine"].update(engine)
+    model = model_framework.createModel(config, seed=4)
+    model_framework.runModel(model, days)
+    return model
+
+
+@pytest.fixture(scope="module")
+def referenceRun(defaultConfig):
+    model = runEngine(defaultConfig, dict())
+    # the run has to infect someone for the comparisons to mean anything
+    assert len(model.state2IdDict["susceptible"]) < len(model.agents) - model.config["Infection"]["SeedNumber"]
+    return model
+
+
+def legacyPath(source, destination):
+    """the path rule agents used before RouteTable, copied from the baseline Agent.updateLoc"""
+    nextNode, lastNode = ADJDICT[source][0][0], ADJDICT[destination][0][0]
+    if source == destination:
+        return []
+    elif nextNode == lastNode:
+        return [nextNode]
+    return [lastNode, TRANSIT, nextNode]
+
+
+def shortestDistance(source, destination):
+    distance, queue = {source: 0}, collections.deque([source])
+    while queue:
+        roomId = queue.popleft()
+        for adjRoom, _ in ADJDICT[roomId]:
+            if adjRoom not in distance:
+                distance[adjRoom] = distance[roomId] + 1
+                queue.append(adjRoom)
+    return distance[destination]
+
+
+def test_routeTable_matches_legacy_path():
+    routes = model_framework.RouteTable(ADJDICT, TRANSIT)
+    for source in ADJDICT:
+        for destination in ADJDICT:
+            assert routes.path(source, destination) == legacyPath(source, destination)
+            route = routes.route(source, destination)
+            assert route[0] == source and route[-1] == destination
+            if source in LEAVES and destination in LEAVES:
+                assert all(routes.isAdjacent(a, b) for a, b in zip(route, route[1:]))
+
+
+def test_hopCount_counts_the_moves_of_the_route():
+    routes = model_framework.RouteTable(ADJDICT, TRANSIT)
+    pairs = [(source, destination) for source in ADJDICT for destination in ADJDICT]
+    sources, destinations = np.array(pairs).T
+    hops = routes.hopCount(sources, destinations)
+    assert hops.tolist() == [len(routes.route(source, destination)) - 1 for source, destination in pairs]
+    assert set(hops.tolist()) == {0, 2, 4}
+    # shortest path between leaves, longer than the shortest path once a hub is one of the ends
+    for source, destination in pairs:
+        if source in LEAVES and destination in LEAVES:
+            assert routes.hopCount(source, destination) == shortestDistance(source, destination)
+    assert routes.hopCount(3, 1) == 4 and shortestDistance(3, 1) == 1
+    assert routes.hopCount(1, TRANSIT) == 2 and routes.hopCount(TRANSIT, 1) == 2
+
+
+def test_resumed_model_continues_like_the_run_that_saved_it(defaultConfig, referenceRun, tmp_path):
+    fileName = str(tmp_path/"checkpoint.npz")
+    model = model_framework.createModel(copy.deepcopy(defaultConfig), seed=4)
+    model_framework.runModel(model, 2, checkpointDays=1, checkpointName=fileName)
+    model_framework.runModel(model, 4)
+    resumed = model_framework.resumeModel(copy.deepcopy(defaultConfig), fileName)
+    assert resumed.time == 2*24
+    model_framework.runModel(resumed, 4)
+    # saving doesn't change the run, the run with checkpoints, the resumed run and the run without checkpoints are the same, 
+    # down to the order the agents are visited in
+    for other in [model, resumed]:
+        assert comparableSnapshot(other.snapshot()) == comparableSnapshot(referenceRun.snapshot())
+        assert other.parameters == referenceRun.parameters
+        assert other.rng.bit_generator.state == referenceRun.rng.bit_generator.state
+
+
+def test_closingBuildings_matches_the_schedule_builder(model, monkeypatch):
+    monkeypatch.setitem(model.config["ClosingBuildings"], "Exception_SemiClosedBuilding", ["dining"])
+    monkeypatch.setitem(model.config["ClosingBuildings"], "GoingHomeP", 0.5)
+    before = model.scheduleTensor.copy()
+    model.turnOnInterventions(["ClosingBuildings"])
+    after = model.scheduleTensor
+    buildingType = dict((roomId, room.building_type) for roomId, room in model.rooms.items())
+    home = model.homeLocations[:, None, None]
+    socialRooms = model.findMatchingRooms("building_type", "social")
+    students = np.array([agent.archetype == "student" for agent in model.agents.values()])
+    closed = np.isin(before, model.findMatchingRooms("building_type", "gym") + model.findMatchingRooms("building_type", "library"))
+    assert closed.any() and not np.isin(after, model.findMatchingRooms("building_type", "gym")).any()
+    changed = before != after
+    assert not (changed & ~closed & ~np.isin(before, model.findMatchingRooms("building_type", "dining"))).any()
+    # faculty go home
+    assert (after[closed & ~students[:, None, None]] == np.broadcast_to(home, after.shape)[closed & ~students[:, None, None]]).all()
+    for agentId in np.flatnonzero(students):
+        ownSocial = set(before[agentId][np.isin(before[agentId], socialRooms)].tolist())
+        replacements = set(after[agentId][closed[agentId]].tolist()) - {int(model.homeLocations[agentId])}
+        # the student keeps the social space of their schedule
+        assert len(replacements) <= 1 and (not ownSocial or replacements <= ownSocial)
+        assert all(buildingType[roomId] == "social" for roomId in replacements)
+        semiClosed = np.isin(before[agentId], model.findMatchingRooms("building_type", "dining"))
+        assert set(after[agentId][semiClosed & changed[agentId]].tolist()) <= {int(model.homeLocations[agentId])}
+    semiClosed = np.isin(before, model.findMatchingRooms("building_type", "dining")) & students[:, None, None]
+    assert 0.4 < changed[semiClosed].mean() < 0.6
+
+
+def test_branch_without_interventions_continues_like_the_plain_run(model):
+    model_framework.runModel(model, 1)
+    snapshot, seed = model.snapshot(), np.random.SeedSequence(7)
+    results = []
+    for run in [model_framework.runModel, functools.partial(model_framework.runBranch, interventionNames=[])]:
+        model.restore(snapshot)
+        model.seedRandom(seed)
+        run(model, days=3)
+        results.append((comparableSnapshot(model.snapshot()), model.rng.bit_generator.state))
+    assert results[0] == results[1]
+
+
+def test_branches_start_from_the_same_state(modelConfig, monkeypatch):
+    starts = dict()
+    runBranch = model_framework.runBranch
+    def recordStart(model, interventionNames, days, debug=False):
+        starts[tuple(interventionNames)] = (comparableSnapshot(model.snapshot()), model.rng.bit_generator.state)
+        return runBranch(model, interventionNames, days, debug)
+    monkeypatch.setattr(model_framework, "runBranch", recordStart)
+    branches = {"noIntervention": [], "masks": ["FaceMasks"], "closing": ["ClosingBuildings"]}
+    results = model_framework.branchSimulation(modelConfig, branches, branchDay=1, days=2, seed=4)
+    assert list(starts.keys()) == [tuple(interventionNames) for interventionNames in branches.values()]
+    (snapshot, rngState), *others = starts.values()
+    assert snapshot[1]["time"] == 24
+    assert all(other == (snapshot, rngState) for other in others)
+    assert list(results.keys()) == list(branches.keys()) and all(len(outputs) == 1 for outputs in results.values())
+
+
+def test_areAdjacent_matches_isAdjacent():
+    routes = model_framework.RouteTable(ADJDICT, TRANSIT)
+    roomIds = np.repeat(list(ADJDICT), len(ADJDICT))
+    otherIds = np.tile(list(ADJDICT), len(ADJDICT))
+    otherIds[::5] = -1
+    expected = [otherId >= 0 and routes.isAdjacent(roomId, otherId) for roomId, otherId in zip(roomIds, otherIds)]
+    assert routes.areAdjacent(roomIds, otherIds).tolist() == expected
+
+
+def test_agentStore_views_behave_like_the_agents():
+    agent_df = pd.DataFrame({"agentId": [0, 1, 2], "state": ["susceptible", "exposed", "susceptible"], "schedule": [[1], [2, 3], []], "compliance": [True, False, True]})
+    slotVal = list(agent_df.columns)
+    agents = model_framework.agentFactory(agent_df, slotVal)
+    views = model_framework.agentStoreFactory(agent_df, slotVal, ["susceptible", "exposed"])
+    assert len(views) == len(agents) and list(views) == list(agents)
+    for agentId, agent in agents.items():
+        assert all(getattr(views[agentId], slot) == getattr(agent, slot) for slot in slotVal)
+    views[2].state = "recovered"
+    assert views[2].state == "recovered" and views.store.match("state", "recovered").tolist() == [2]
+    assert views.store.match("compliance", True).tolist() == [0, 2]
+    with pytest.raises(KeyError):
+        views[3]
+
+
+@pytest.mark.parametrize("engine", [{"ColumnarAgents": True}, {"InfectionKernel": "vectorized"}, {"InfectionKernel": "incremental"},
+    {"InfectionKernel": "incremental", "ColumnarAgents": True}])
+def test_engines_give_the_same_results(defaultConfig, referenceRun, engine):
+    model = runEngine(defaultConfig, engine)
+    assert model.state2IdDict == referenceRun.state2IdDict
+    assert model.parameters == referenceRun.parameters
+    assert (model.agentRoom == referenceRun.agentRoom).all()
+    if model.accumulateInfection:
+        # the running sums are the sums made from scratch
+        accumulated = [(room.infectiousness, room.infectiousCount) for room in model.rooms.values()]
+        model.rebuildInfectiousness()
+        assert np.allclose(accumulated, [(room.infectiousness, room.infectiousCount) for room in model.rooms.values()])
+
+
+def test_sequentialInfections_follows_the_infection_loop():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        size = int(rng.integers(0, 20))
+        randVec, threshold = rng.random(size), rng.random(size)*rng.choice([0.1, 1])
+        # the loop of AgentBasedModel.infection
+        expected, index = [], 0
+        for position, value in enumerate(threshold):
+            if randVec[index] < value:
+                expected.append(position)
+                index += 1
+        assert model_framework.sequentialInfections(randVec, threshold).tolist() == expected
+
+
+def test_transitionScheduler_pops_the_latest_schedule_of_each_agent():
+    scheduler = model_framework.TransitionScheduler()
+    scheduler.schedule(3, 10)
+    scheduler.schedule(1, 10)
+    scheduler.schedule(2, 5)
+    scheduler.schedule(2, 12) # replaces the transition at 5
+    scheduler.schedule(4, 7)
+    scheduler.schedule(4) # cancels it
+    assert len(scheduler) == 3
+    assert scheduler.popDue(9) == []
+    assert scheduler.popDue(10) == [1, 3]
+    assert scheduler.popDue(20) == [2] and len(scheduler) == 0
+    assert scheduler.firedCount == [(9, 0), (10, 2), (20, 1)]
+
+
+def test_transitionScheduler_keeps_every_pending_transition(defaultConfig):
+    model = runEngine(defaultConfig, {"TransitionScheduler": True})
+    expected = dict()
+    for agentId, agent in model.agents.items():
+        if agent.state == "quarantined" or (agent.state != "susceptible" and model.transitionDict[agent.state] > 0):
+            expected[agentId] = agent.transitionTime() + 1
+    assert len(expected) > model.config["Infection"]["SeedNumber"]
+    assert model.transitionScheduler.dueTime == expected
+
+
+def test_complianceRatio_is_the_fraction_of_agents_that_dont_comply(defaultConfig):
+    config = copy.deepcopy(defaultConfig)
+    config["World"]["TurnedOnInterventions"] = ["FaceMasks"]
+    config["World"]["complianceRatio"] = 0.3
+    model = model_framework.createModel(config, seed=4)
+    nonCompliant = sum(not agent.compliance for agent in model.agents.values())
+    assert nonCompliant == int(0.3*len(model.agents))
+
+
+def test_multiSimulation_results_dont_depend_on_the_workers(defaultConfig, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for workers in [1, 2]:
+        model_framework.multiSimulation(2, copy.deepcopy(defaultConfig), 2, False, f"workers{workers}", workers=workers, seed=7)
+    assert (tmp_path/"workers1.csv").read_text() == (tmp_path/"workers2.csv").read_text()
+
+
+def comparableSnapshot(snapshot):
+    """the snapshot with the arrays as lists, the agent sets are kept in their iteration order"""
+    return dict((name, array.tolist()) for name, array in snapshot["arrays"].items()), snapshot["values"]
+
+
+def finalStates(model, days=4):
+    model_framework.runModel(model, days)
+    return model.state2IdDict
+
+
+def test_resultRow_merges_the_summaries():
+    row = model_framework.resultRow(3, 1.5, ({"TotalInfected": 4, "susceptible": 90}, {"largeGathering": 1, "dorm": 2}, dict(), dict()))
+    assert row == {"simulation": 3, "wallTime": 1.5, "TotalInfected": 4, "susceptible": 90, "largeGathering": 1, "dorm": 2}
+    with pytest.raises(ValueError, match=r"the columns \['susceptible'\] of simulation 3"):
+        model_framework.resultRow(3, 1.5, ({"susceptible": 90}, {"susceptible": 2}, dict(), dict()))
+    with pytest.raises(ValueError, match=r"the columns \['wallTime'\]"):
+        model_framework.resultRow(3, 1.5, ({"wallTime": 2}, dict(), dict(), dict()))
+
+
+def test_importing_model_framework_leaves_out_the_plotting_and_profiling_modules():
+    # a new interpreter, the modules imported by the other tests would hide an import
+    code = "import sys, model_framework; print(sorted(set(sys.modules) & {'matplotlib', 'networkx', 'cProfile'}))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(model_framework.__file__), capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_restore_puts_the_model_back_in_the_snapshot_state(model):
+    snapshot = model.snapshot()
+    json.dumps(snapshot["values"])
+    model_framework.runModel(model, 2)
+    assert comparableSnapshot(model.snapshot()) != comparableSnapshot(snapshot)
+    model.restore(snapshot)
+    assert comparableSnapshot(model.snapshot()) == comparableSnapshot(snapshot)
+
+
+def test_restored_replicates_are_reproducible(model):
+    snapshot = model.snapshot()
+    results = []
+    for seed in [1, 2, 1]:
+        model.restore(snapshot)
+        model.seedRandom(seed)
+        results.append(copy.deepcopy(finalStates(model)))
+    assert results[0] == results[2] and results[0] != results[1]
+
+
+def test_forked_replicates_match_the_restored_replicates(model):
+    seeds = np.random.SeedSequence(3).spawn(3)
+    forked = model_framework.forkReplicates(model, finalStates, seeds, workers=2)
+    snapshot = model.snapshot()
+    for seed, result in zip(seeds, forked):
+        model.restore(snapshot)
+        model.seedRandom(seed)
+        assert finalStates(model) == result
+
+
+def test_the_model_only_draws_from_its_own_generator(defaultConfig, referenceRun):
+    np.random.seed(0)
+    random.seed(0)
+    numpyState, pythonState = np.random.get_state(), random.getstate()
+    model = runEngine(defaultConfig, dict())
+    assert model.state2IdDict == referenceRun.state2IdDict
+    assert model.parameters == referenceRun.parameters
+    assert random.getstate() == pythonState
+    assert np.array_equal(np.random.get_state()[1], numpyState[1]) and np.random.get_state()[2] == numpyState[2]
+
+
+# known answers of Philox4x32-10 from the Random123 library: (counter, key, first two output words)
+PHILOX_KNOWN_ANSWERS = [
+    ((0, 0, 0, 0), (0, 0), (0x6627e8d5, 0xe169c58d)),
+    ((0xffffffff,)*4, (0xffffffff,)*2, (0x408f276d, 0x41c83b0e)),
+    ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0), (0xd16cfe09, 0x94fdcceb)),
+]
+
+
+@pytest.mark.parametrize("counter, key, words", PHILOX_KNOWN_ANSWERS)
+def test_philoxUniforms_known_answers(counter, key, words):
+    expected = ((words[0] >> 5)*67108864 + (words[1] >> 6))/9007199254740992.0
+    assert model_framework.philoxUniforms(key, counter) == expected
+
+
+def test_keyedUniforms_only_depend_on_the_key(model, monkeypatch):
+    monkeypatch.setattr(model, "commonRandomNumbers", True)
+    agentIds = np.arange(500)
+    values = model.keyedUniforms("room", agentIds)
+    assert ((values >= 0) & (values < 1)).all() and abs(values.mean() - 0.5) < 0.05
+    # the same key gives the same value in any order, alone or with other keys
+    assert (model.keyedUniforms("room", agentIds[::-1]) == values[::-1]).all()
+    assert model.keyedUniforms("room", 7) == values[7]
+    assert (model.agentUniforms("room", [3, 5]) == values[[3, 5]]).all()
+    model.rng.random(10)
+    assert (model.keyedUniforms("room", agentIds) == values).all()
+    assert not np.isin(model.keyedUniforms("hub", agentIds), values).any()
+    assert not np.isin(model.keyedUniforms("room", agentIds, draw=1), values).any()
+    model.time += 1
+    assert not np.isin(model.keyedUniforms("room", agentIds), values).any()
+
+
+def test_common_random_numbers_give_the_same_run_with_every_kernel(defaultConfig):
+    models = [runEngine(defaultConfig, {"CommonRandomNumbers": True, "InfectionKernel": kernel}) for kernel in ["loop", "vectorized"]]
+    assert models[0].state2IdDict == models[1].state2IdDict
+    assert models[0].parameters == models[1].parameters
+
+
+def legacyAdjacencyDict(room_df, directedGraph):
+    """the row loop of makeAdjacencyDict before the room graph"""
+    adjDict = dict()
+    for roomId, row in room_df.iterrows():
+        adjRoom = room_df.index[room_df["room_name"] == row["connected_to"]].tolist()[0]
+        travelTime = row["travel_time"]
+        adjDict[roomId] = adjDict.get(roomId, []) + [(adjRoom, travelTime)]
+        if not directedGraph:
+            adjDict[adjRoom] = adjDict.get(adjRoom, []) + [(roomId, travelTime)]
+    return adjDict
+
+
+def legacyObjects(df, objectClass):
+    """the iterrows loop of agentFactory, roomFactory and superStrucFactory before objectsFromDf"""
+    tempDict = dict()
+    for index, row in df.iterrows():
+        tempDict[index] = objectClass(row.values.tolist())
+    return tempDict
+
+
+@pytest.mark.parametrize("factory, tableName", [(model_framework.agentFactory, "agent_df"), (model_framework.roomFactory, "room_df"), (model_framework.superStrucFactory, "building_df")])
+def test_factories_build_the_objects_of_the_row_loop(model, factory, tableName):
+    df = getattr(model, tableName)
+    slotVal = df.columns.values.tolist()
+    objects = factory(df, slotVal)
+    expected = legacyObjects(df, type(next(iter(objects.values()))))
+    assert list(objects.keys()) == list(expected.keys())
+    for key, obj in objects.items():
+        values, expectedValues = [getattr(obj, slot) for slot in slotVal], [getattr(expected[key], slot) for slot in slotVal]
+        assert [type(value) for value in values] == [type(value) for value in expectedValues]
+        # nan is the only value that isn't equal to itself
+        assert all(value == expectedValue or (value != value and expectedValue != expectedValue) for value, expectedValue in zip(values, expectedValues))
+
+
+@pytest.mark.parametrize("directedGraph", [False, True])
+def test_makeAdjacencyDict_matches_the_row_loop(model, monkeypatch, directedGraph):
+    monkeypatch.setattr(model, "roomGraph", model.roomGraph)
+    monkeypatch.setattr(model, "directedGraph", directedGraph)
+    adjDict = model.makeAdjacencyDict()
+    assert adjDict == legacyAdjacencyDict(model.room_df, directedGraph)
+    for roomId, adjRooms in adjDict.items():
+        assert model.roomGraph.neighborsOf(roomId).tolist() == [adjRoom for adjRoom, _ in adjRooms]
+
+
+def test_makeAdjacencyDict_reports_unknown_rooms(model, monkeypatch):
+    room_df = model.room_df.copy()
+    room_df.loc[room_df.index[3], "connected_to"] = "nowhere_hub"
+    monkeypatch.setattr(model, "room_df", room_df)
+    monkeypatch.setattr(model, "roomGraph", model.roomGraph)
+    with pytest.raises(ValueError, match="nowhere_hub"):
+        model.makeAdjacencyDict()
+
+
+@pytest.mark.parametrize("kind, values", [("bool", [True, np.bool_(False)]), ("int", [3, -2, 0]), ("npint", [3, np.int64(-2), 0]), ("float", [1, 2.5, np.float32(0.5)]),
+    ("str", ["dorm", "", "transit_space_hub"]), ("set", [{3, 1}, set(), {2}]), ("list", [[4, 1, 4], [], [0]])])
+def test_decodeColumn_inverts_encodeColumn(kind, values):
+    encodedKind, arrays = model_framework.encodeColumn(values)
+    assert encodedKind == kind
+    expected = [value.item() if isinstance(value, np.generic) else value for value in values]
+    # a float column only has floats, the np.int64 values of an int column are kept
+    expected = values if kind == "npint" else ([float(value) for value in expected] if kind == "float" else expected)
+    decoded = model_framework.decodeColumn(kind, arrays)
+    assert decoded == expected and [type(value) for value in decoded] == [type(value) for value in expected]
+
+
+def test_encodeColumn_rejects_mixed_columns():
+    with pytest.raises(TypeError, match="can't save a column"):
+        model_framework.encodeColumn([1, "a"])
+    with pytest.raises(TypeError):
+        model_framework.encodeColumn([{1}, [1]])
+
+
+def test_worldCachePath_depends_on_the_world_config_and_the_seed(modelConfig):
+    seedSequence = np.random.SeedSequence(4)
+    path = model_framework.worldCachePath(modelConfig, seedSequence)
+    assert model_framework.worldCachePath(copy.deepcopy(modelConfig), np.random.SeedSequence(4)) == path
+    assert model_framework.worldCachePath(modelConfig, np.random.SeedSequence(5)) != path
+    modelConfig["World"]["complianceRatio"] = 1 - modelConfig["World"]["complianceRatio"]
+    assert model_framework.worldCachePath(modelConfig, seedSequence) != path
+
+
+def test_loaded_world_runs_like_the_saved_world(defaultConfig, tmp_path, monkeypatch):
+    config = copy.deepcopy(defaultConfig)
+    config["Engine"]["WorldCache"] = True
+    folder = str(tmp_path/"world")
+    monkeypatch.setattr(model_framework, "worldCachePath", lambda modelConfig, seedSequence: folder)
+    savedModel = model_framework.createModel(config, seed=4)
+    assert (tmp_path/"world"/"world.json").exists()
+    # the second model has to load the world instead of building it
+    def buildWorld(self):
+        raise AssertionError("the world was built again")
+    monkeypatch.setattr(model_framework.AgentBasedModel, "buildWorld", buildWorld)
+    loadedModel = model_framework.createModel(config, seed=4)
+    assert comparableSnapshot(loadedModel.snapshot()) == comparableSnapshot(savedModel.snapshot())
+    for name in ["offsets", "neighbors", "travelTimes"]:
+        assert getattr(loadedModel.roomGraph, name).tolist() == getattr(savedModel.roomGraph, name).tolist()
+    assert loadedModel.routes.hubList == savedModel.routes.hubList and loadedModel.roomNameId == savedModel.roomNameId
+    assert finalStates(loadedModel) == finalStates(savedModel)
+
+
+def exactForm(value):
+    """the value as nested tuples that keep the types, the dtypes and the order of the dictionaries and sets"""
+    typeName = type(value).__name__
+    if isinstance(value, pd.DataFrame):
+        return typeName, value.columns.tolist(), value.dtypes.astype(str).tolist(), value.index.tolist(), [exactForm(column) for column in value.to_dict("list").values()]
+    if isinstance(value, np.ndarray):
+        return typeName, str(value.dtype), value.shape, exactForm(value.tolist())
+    if isinstance(value, np.random.Generator):
+        return typeName, value.bit_generator.state
+    if isinstance(value, dict):
+        return typeName, [(exactForm(key), exactForm(item)) for key, item in value.items()]
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return typeName, [exactForm(item) for item in value]
+    if isinstance(value, float) and value != value:
+        return typeName, "nan"
+    if isinstance(value, (int, float, str, type(None), np.generic)):
+        return typeName, value
+    slots = [slot for cls in type(value).__mro__ for slot in getattr(cls, "__slots__", ()) if hasattr(value, slot)]
+    return typeName, [(slot, exactForm(getattr(value, slot))) for slot in slots], exactForm(getattr(value, "__dict__", dict()))
+
+
+@pytest.mark.parametrize("interventions", [[], ["HybridClasses", "ClosingBuildings"]])
+def test_worldCache_gives_the_model_made_without_it(defaultConfig, tmp_path, monkeypatch, interventions):
+    monkeypatch.setattr(model_framework, "worldCachePath", lambda modelConfig, seedSequence: str(tmp_path/"world"))
+    models = []
+    # built without the cache, built and saved, loaded
+    for worldCache in [False, True, True]:
+        config = copy.deepcopy(defaultConfig)
+        config["World"]["TurnedOnInterventions"] = interventions
+        config["Engine"]["WorldCache"] = worldCache
+        models.append(model_framework.createModel(config, seed=4))
+    built = models[0]
+    for name, value in vars(built).items():
+        if name not in ("config", "worldCache"):
+            for model in models[1:]:
+                assert exactForm(getattr(model, name)) == exactForm(value), name
+
+
+def test_compileSchedules_packs_the_schedules_into_the_tensor(model):
+    model = copy.deepcopy(model)
+    schedules = dict((agentId, agent.schedule.tolist()) for agentId, agent in model.agents.items())
+    for agentId, agent in model.agents.items():
+        agent.schedule = schedules[agentId]
+    model.compileSchedules()
+    assert model.scheduleTensor.dtype == np.int32 and model.scheduleTensor.shape == (len(model.agents), 3, 24)
+    for agentId, agent in model.agents.items():
+        assert np.shares_memory(agent.schedule, model.scheduleTensor) and agent.schedule.tolist() == schedules[agentId]
+
+
+def test_compileSchedules_reports_the_entries_that_are_not_rooms(model):
+    model = copy.deepcopy(model)
+    for agentId, token in [(3, "lirary"), (5, "social"), (8, "social")]:
+        schedule = model.agents[agentId].schedule.tolist()
+        schedule[1][10] = token
+        model.agents[agentId].schedule = schedule
+    with pytest.raises(ValueError) as error:
+        model.compileSchedules()
+    assert "'lirary' (1 entries, ex: agent 3)" in str(error.value) and "'social' (2 entries, ex: agent 5)" in str(error.value)
+
+
+@pytest.mark.parametrize("engine", [dict(), {"ColumnarAgents": True}])
+def test_movers_end_where_updating_every_agent_puts_them(defaultConfig, engine):
+    config = copy.deepcopy(defaultConfig)
+    config["Engine"].update(engine)
+    movers = model_framework.createModel(config, seed=4)
+    movers.initializeStoringParameter(["susceptible", "quarantined"])
+    everyone = copy.deepcopy(movers)
+    # updateAgent walks every agent through updateLoc (or columnarMoves) like it did before moverIds
+    everyone.moverIds = lambda: np.arange(len(everyone.agents))
+    quarantinedId = None
+    for _ in range(2*24):
+        if movers.time == 24 + 12:
+            # an agent away from home is quarantined in the middle of the day, it has to go home
+            quarantinedId = next(agentId for agentId, agent in movers.agents.items() 
+                if agent.state == "susceptible" and agent.currLocation != agent.initial_location)
+            for model in [movers, everyone]:
+                model.changeStateDict(quarantinedId, "susceptible", "quarantined")
+        movers.updateSteps(1)
+        everyone.updateSteps(1)
+        assert [agent.currLocation for agent in movers.agents.values()] == [agent.currLocation for agent in everyone.agents.values()]
+        assert movers.agentRoom.tolist() == everyone.agentRoom.tolist()
+    assert movers.agents[quarantinedId].state == "quarantined"
+    assert movers.agents[quarantinedId].currLocation == movers.agents[quarantinedId].initial_location
+    assert movers.state2IdDict == everyone.state2IdDict
+
+
+def test_compiledWorld_matches_the_room_names_and_types(model):
+    # the string checks the arrays replace, copied from the baseline infectionWithinPopulation, infection and infectionInRoom
+    faceMasks = model.config["FaceMasks"]
+    nonCompliantLeaf = set(faceMasks["NonCompliantLeaf"] + faceMasks["NonCompliantBuilding"])
+    compliantZone, nonCompliantZone = set(faceMasks["CompliantHub"]), set(faceMasks["NonCompliantBuilding"])
+    world = model.world
+    for roomId, room in model.rooms.items():
+        isHub = room.room_name.endswith("_hub")
+        maskAlways = room.building_type not in nonCompliantLeaf or (isHub and room.building_type in compliantZone)
+        maskCompliant = room.building_type in nonCompliantLeaf and not (isHub and room.building_type in compliantZone) and room.building_type in nonCompliantZone
+        assert world.is_hub[roomId] == isHub
+        assert world.is_social[roomId] == (room.building_type == "social")
+        assert world.is_offcampus[roomId] == (room.building_type == "offCampus")
+        assert world.mask_always[roomId] == maskAlways and world.mask_required_for_compliant[roomId] == maskCompliant
+        assert world.mask_blocks[roomId] == (room.building_type not in nonCompliantLeaf)
+        assert world.buildingTypeNames[world.building_type[roomId]] == room.building_type
+    # every kind of room is in the world, so each rule is checked both ways
+    for flags in [world.is_hub, world.is_social, world.is_offcampus, world.mask_always, world.mask_required_for_compliant]:
+        assert 0 < flags[world.roomIds].sum() < len(world.roomIds)
@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+import fileRelated as flr
+import modifyDf as mod_df
+
+# the row by row versions of the expansions, as they were before they were vectorized, the new ones have to give the same dataframes
+
+
+def legacyAssignUniqueName(df, columnName="building_name", groupingCol=""):
+    headerVal, nameCount = list(df.columns.values), dict()
+    columnName = headerVal[0] if columnName not in headerVal else columnName
+    grouping = True if groupingCol != "" else False
+    for index, rowVal in df.iterrows():
+        itemName = str(rowVal[columnName])
+        groupName = str(rowVal[groupingCol]) + "_" if grouping else ""
+        newName = (groupName + itemName).replace(" ", "_")
+        nameCount[newName] = nameCount.get(newName, 0) + 1
+        entry = newName
+        if nameCount[newName] > 1 and newName not in ["transit_space_hallway", "transit_space_hub", "transit_space"]:
+            entry += str(nameCount[entry])
+        df.loc[index, columnName] = entry
+    return df
+
+
+def legacyCreateSuperStruc(df, objCount="count"):
+    rowList, colName = [], list(df.columns.values)
+    colName.remove(objCount)
+    for _, rows in df.iterrows():
+        for _ in range(int(rows[objCount])):
+            rowList.append({key: val for key, val in zip(colName, rows[colName])})
+    return pd.DataFrame(rowList)
+
+
+def legacyCreatePartitions(df):
+    leaves = ["leaf_S", "leaf_M", "leaf_L"]
+    capacities = ["cap_S", "cap_M", "cap_L"]
+    limits = ["enroll_S", "enroll_M", "enroll_L"]
+    nameStr, rowList, hubName = "room_name", [], "_hub"
+    for index, rows in df.iterrows():
+        for leafName, capacity, limit in zip(leaves, capacities, limits):
+            for _ in range(int(rows[leafName])):
+                rowList.append({nameStr: rows[nameStr], "capacity": rows[capacity], "limit": rows[limit], "located_building": rows["building_name"],
+                    "connected_to": rows["building_name"]+hubName, "travel_time": 1, "building_type": rows["building_type"], "Kv": rows["Kv"]})
+        hubDict = {nameStr: rows[nameStr] + hubName, "capacity": rows["hubCapacity"], "limit": rows["hubCapacity"], "located_building": rows["building_name"],
+            "connected_to": "transit_space_hub", "travel_time": 1, "building_type": rows["building_type"], "Kv": rows["hubKv"]}
+        hubDict[nameStr] = dict(rowList[-1])["connected_to"]
+        rowList.append(hubDict)
+    return pd.DataFrame(rowList)
+
+
+def expand(original_df, assignUniqueName, createSuperStruc, createPartitions):
+    building_df = assignUniqueName(createSuperStruc(original_df.copy()), "building_name")
+    building_df.index += 1
+    room_df = assignUniqueName(createPartitions(building_df), "room_name")
+    room_df.index += 1
+    return building_df, room_df
+
+
+def smallBuildings():
+    """two dorms, a transit space without rooms and a classroom building with two room sizes"""
+    rows = [
+        ("dorm", "dorm", "dorm", 2, 2, 0, 1, 2, 4, 6, 3, 1.0, 0.25, 20),
+        ("transit_space", "transit", "transit", 1, 0, 0, 0, 0, 0, 0, 50, 1.0, 0.5, 100),
+        ("class", "classroom", "classroom", 1, 1, 2, 0, 30, 60, 90, 25, 0.75, 0.5, 40),
+    ]
+    columns = ["building_name", "room_name", "building_type", "count", "leaf_S", "leaf_M", "leaf_L", "cap_S", "cap_M", "cap_L", "enroll_S", "Kv", "hubKv", "hubCapacity"]
+    df = pd.DataFrame(rows, columns=columns)
+    df["enroll_M"], df["enroll_L"] = df["enroll_S"], df["enroll_S"]
+    df.index += 1
+    return df
+
+
+def test_expansions_match_the_row_loops():
+    original_df = smallBuildings()
+    expected = expand(original_df, legacyAssignUniqueName, legacyCreateSuperStruc, legacyCreatePartitions)
+    result = expand(original_df, mod_df.assignUniqueName, mod_df.createSuperStruc, mod_df.createPartitions)
+    for expectedDf, resultDf in zip(expected, result):
+        pd.testing.assert_frame_equal(resultDf, expectedDf)
+
+
+def test_expansions_of_newBuilding_match_the_row_loops():
+    original_df = flr.make_df("configuration", "newBuilding.csv", debug=False)
+    expected = expand(original_df, legacyAssignUniqueName, legacyCreateSuperStruc, legacyCreatePartitions)
+    result = expand(original_df, mod_df.assignUniqueName, mod_df.createSuperStruc, mod_df.createPartitions)
+    for expectedDf, resultDf in zip(expected, result):
+        # the rows made one by one lose the types of CSV_SCHEMAS (category, int32), the vectorized expansions keep them
+        categories = [column for column in resultDf.columns if isinstance(resultDf[column].dtype, pd.CategoricalDtype)]
+        pd.testing.assert_frame_equal(resultDf.astype(dict((column, object) for column in categories)), expectedDf, check_dtype=False)
+
+
+def test_assignUniqueName_with_a_grouping_column():
+    df = pd.DataFrame({"room_name": ["dorm", "dorm room", "dorm", "dorm"], "building_name": ["A", "A", "A", "B"]})
+    expected = legacyAssignUniqueName(df.copy(), "room_name", "building_name")
+    pd.testing.assert_frame_equal(mod_df.assignUniqueName(df.copy(), "room_name", "building_name"), expected)
+    assert expected["room_name"].tolist() == ["A_dorm", "A_dorm_room", "A_dorm2", "B_dorm"]
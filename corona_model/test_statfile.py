@@ -0,0 +1,24 @@
+import math
+
+import numpy as np
+
+import statfile
+
+
+def test_runningMeanVariance_matches_numpy():
+    values = np.random.default_rng(0).normal(3, 2, size=500) + 1e6
+    running = statfile.RunningMeanVariance()
+    for value in values:
+        running.add(value)
+    assert running.count == len(values)
+    assert math.isclose(running.mean, np.mean(values), rel_tol=1e-12)
+    assert math.isclose(running.variance(), np.var(values, ddof=1), rel_tol=1e-9)
+    assert math.isclose(running.halfWidth(0.95), 1.959964*np.std(values, ddof=1)/np.sqrt(len(values)), rel_tol=1e-6)
+    assert running.halfWidth(0.99) > running.halfWidth(0.95)
+
+
+def test_runningMeanVariance_with_less_than_two_values():
+    running = statfile.RunningMeanVariance()
+    assert running.variance() == 0 and running.halfWidth() == float("inf")
+    running.add(4)
+    assert running.mean == 4 and running.variance() == 0 and running.halfWidth() == float("inf")
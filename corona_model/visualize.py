@@ -1,15 +1,15 @@
-import networkx as nx
 import math
 import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+# networkx and matplotlib are imported by the functions that use them, so importing this file (and model_framework) doesn't load them
 
 def makeGraph(vertices, edges, vertices2Cluster, cluster2Vertices,clusterName, roomCapacity, directed=False):
     """
         get the partitions and their adjacency list to create a graph
         The graph will show the label of partitions that have more edges than the threshold 
     """
+    import networkx as nx
+    import matplotlib as mpl
+    import matplotlib.pyplot as plt
     theshold = 10 # rooms
     G = nx.DiGraph() if directed else nx.Graph()
     G.add_nodes_from(vertices) #G.nodes()
@@ -70,6 +70,7 @@ def makeGraph(vertices, edges, vertices2Cluster, cluster2Vertices,clusterName, r
     plt.show()
 
 def timeSeriesGraph(timeIntervals, xLim, yLim, data, linestyle = ["r-", "b.", "g--"], savePlt=False, saveName="defaultImage.png", animatePlt=True):
+    import matplotlib.pyplot as plt
     fig, ax= plt.subplots(figsize = (10, 5))
     plt.xlim(xLim[0], xLim[1])
     plt.ylim(yLim[0], yLim[1])
@@ -94,9 +95,12 @@ def timeSeriesGraph(timeIntervals, xLim, yLim, data, linestyle = ["r-", "b.", "g
 def get_cmap(n, name='hsv'):
     '''Returns a function that maps each index in 0, 1, ..., n-1 to a distinct 
     RGB color; the keyword argument name must be a standard mpl colormap name.'''
+    import matplotlib.pyplot as plt
     return plt.cm.get_cmap(name, n)
 
 def showAnimation(timeList, dataList, xLim, yLim, frames):   
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
     fig = plt.figure()
     ax1 = plt.axes(xlim=xLim, ylim=yLim)
     # plot parameter is dimension x dimension2 # position of plot, and linewidth